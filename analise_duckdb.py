@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Execução das 4 perguntas do Olist no DuckDB
+
+As tabelas são lidas diretamente dos CSVs (ou Parquet) do diretório de dados
+por consultas SQL, sem carregá-las no pandas. O DuckDB aplica projeção e
+filtros na leitura, usa todos os núcleos e, com limite de memória, grava
+resultados intermediários em disco, o que permite rodar as perguntas em
+datasets maiores que a RAM. Apenas os agregados finais chegam ao pandas, onde
+recebem o mesmo tratamento de OlistAnalysis; os resultados têm a mesma
+estrutura de OlistAnalysis.results.
+"""
+
+import os
+
+import numpy as np
+
+from data_loader import DATA_DIR, TABLE_SCHEMAS, OLIST_DATETIME_FORMAT, columns_for_analyses, find_partitions
+
+# Tempo de entrega em dias, truncado para baixo como Timedelta.days no pandas
+_DIAS_SQL = "floor((epoch_us({fim}) - epoch_us({inicio})) / 86400000000.0)"
+
+
+def _duckdb():
+    try:
+        import duckdb
+    except ImportError:
+        raise ImportError("O motor 'duckdb' requer o pacote duckdb (pip install duckdb)") from None
+    return duckdb
+
+
+def _expressao_coluna(nome, coluna, parquet):
+    """Expressão SQL que converte a coluna para o tipo de TABLE_SCHEMAS (valores inválidos viram NULL)"""
+    schema = TABLE_SCHEMAS[nome]
+    if coluna in schema['dates']:
+        if parquet:
+            return f"TRY_CAST({coluna} AS TIMESTAMP) AS {coluna}"
+        return f"TRY_STRPTIME({coluna}, '{OLIST_DATETIME_FORMAT}') AS {coluna}"
+    dtype = schema['dtypes'].get(coluna, 'string')
+    if dtype.startswith('float'):
+        return f"TRY_CAST({coluna} AS DOUBLE) AS {coluna}"
+    if dtype.startswith('int'):
+        return f"TRY_CAST({coluna} AS BIGINT) AS {coluna}"
+    return f"CAST({coluna} AS VARCHAR) AS {coluna}"
+
+
+def _lista_sql(caminhos):
+    return '[' + ', '.join("'" + caminho.replace("'", "''") + "'" for caminho in caminhos) + ']'
+
+
+def _registrar_tabelas(con, data_dir, colunas, partition_filter=None):
+    """
+    Cria uma view por tabela, lendo do Parquet se existir ou do CSV
+
+    Tabelas particionadas (diretório data_dir/<tabela>, como em data_loader)
+    têm precedência e são lidas das partições que sobram após partition_filter.
+    """
+    for nome, lista in colunas.items():
+        particoes = find_partitions(nome, data_dir, partition_filter)
+        caminho_csv = os.path.join(data_dir, TABLE_SCHEMAS[nome]['file'])
+        caminho_parquet = os.path.splitext(caminho_csv)[0] + '.parquet'
+        parquet = particoes is None and os.path.exists(caminho_parquet)
+        if particoes is not None:
+            if particoes:
+                origem = (f"read_csv({_lista_sql(p.path for p in particoes)}, header=true, all_varchar=true, "
+                          f"hive_partitioning=true, union_by_name=true)")
+            else:
+                # Todas as partições podadas: tabela vazia com as mesmas colunas
+                origem = f"(SELECT {', '.join(f'NULL::VARCHAR AS {coluna}' for coluna in lista)} WHERE false)"
+        elif parquet:
+            origem = f"read_parquet('{caminho_parquet}')"
+        else:
+            origem = f"read_csv('{caminho_csv}', header=true, all_varchar=true)"
+        expressoes = ', '.join(_expressao_coluna(nome, coluna, parquet) for coluna in lista)
+        con.execute(f"CREATE OR REPLACE VIEW {nome} AS SELECT {expressoes} FROM {origem}")
+
+
+def _pergunta_1(con):
+    dias = _DIAS_SQL.format(fim='order_delivered_customer_date', inicio='order_estimated_delivery_date')
+    total, atrasadas, no_prazo, antecipadas, atraso_medio = con.execute(f"""
+        WITH entregas AS (
+            SELECT {dias} AS atraso
+            FROM orders
+            WHERE order_status = 'delivered'
+              AND order_delivered_customer_date IS NOT NULL
+              AND order_estimated_delivery_date IS NOT NULL
+        )
+        SELECT count(*),
+               count(*) FILTER (WHERE atraso > 0),
+               count(*) FILTER (WHERE atraso = 0),
+               count(*) FILTER (WHERE atraso < 0),
+               avg(atraso) FILTER (WHERE atraso > 0)
+        FROM entregas
+    """).fetchone()
+    if total == 0:
+        return None
+    return {
+        'total_entregas': total,
+        'entregas_atrasadas': atrasadas,
+        'percentual_atraso': (atrasadas / total) * 100,
+        'percentual_no_prazo': (no_prazo / total) * 100,
+        'percentual_antecipado': (antecipadas / total) * 100,
+        'atraso_medio_dias': np.nan if atraso_medio is None else atraso_medio,
+    }
+
+
+def _pergunta_2(con, limiar=150.0):
+    payment_stats = con.execute("""
+        SELECT payment_type,
+               count(order_id) AS quantidade_pedidos,
+               sum(payment_value) AS valor_total,
+               avg(payment_value) AS valor_medio
+        FROM order_payments
+        WHERE payment_value > ? AND payment_type IS NOT NULL
+        GROUP BY payment_type
+        ORDER BY payment_type
+    """, [limiar]).df().set_index('payment_type').round(2)
+    if len(payment_stats) == 0:
+        return None
+    payment_stats['percentual'] = (payment_stats['quantidade_pedidos'] /
+                                   payment_stats['quantidade_pedidos'].sum()) * 100
+    # Empates pelo nome do método, como no motor pandas
+    payment_stats = payment_stats.sort_values(['quantidade_pedidos', 'payment_type'], ascending=[False, True],
+                                              kind='stable')
+    return {
+        'total_pedidos_acima_150': int(con.execute(
+            "SELECT count(*) FROM order_payments WHERE payment_value > ?", [limiar]).fetchone()[0]),
+        'metodo_mais_usado': payment_stats.index[0],
+        'percentual_metodo_principal': payment_stats.iloc[0]['percentual'],
+        'payment_stats': payment_stats,
+    }
+
+
+def _pergunta_3(con, top_n=5):
+    category_stats = con.execute("""
+        SELECT p.product_category_name,
+               count(i.order_id) AS quantidade_vendida,
+               sum(i.price) AS receita_total
+        FROM order_items i
+        JOIN products p ON i.product_id = p.product_id
+        WHERE p.product_category_name IS NOT NULL
+        GROUP BY p.product_category_name
+        ORDER BY p.product_category_name
+    """).df().set_index('product_category_name').round(2)
+    if len(category_stats) == 0:
+        return None
+    # Empates pelo nome da categoria, como em consultas.RankingCategorias
+    category_stats = category_stats.sort_values(['quantidade_vendida', 'product_category_name'],
+                                                ascending=[False, True], kind='stable')
+    top_5_categories = category_stats.head(top_n)
+    return {
+        'top_5_categories': top_5_categories,
+        'total_receita_top_5': top_5_categories['receita_total'].sum(),
+        'total_vendas_top_5': top_5_categories['quantidade_vendida'].sum(),
+    }
+
+
+def _pergunta_4(con, dias_min=0, dias_max=100):
+    dias = _DIAS_SQL.format(fim='o.order_delivered_customer_date', inicio='o.order_purchase_timestamp')
+    filtro = f"""
+        WITH avaliacoes AS (
+            SELECT r.review_score, {dias} AS tempo_entrega_dias
+            FROM orders o
+            JOIN order_reviews r ON o.order_id = r.order_id
+            WHERE o.order_status = 'delivered'
+              AND o.order_delivered_customer_date IS NOT NULL
+              AND o.order_purchase_timestamp IS NOT NULL
+              AND r.review_score IS NOT NULL
+        )
+        SELECT * FROM avaliacoes WHERE tempo_entrega_dias BETWEEN ? AND ?
+    """
+    total, correlacao, tempo_medio = con.execute(f"""
+        SELECT count(*), corr(tempo_entrega_dias, review_score), avg(tempo_entrega_dias)
+        FROM ({filtro})
+    """, [dias_min, dias_max]).fetchone()
+    if total == 0:
+        return None
+    stats_by_score = con.execute(f"""
+        SELECT review_score,
+               count(*) AS count,
+               avg(tempo_entrega_dias) AS mean,
+               median(tempo_entrega_dias) AS median,
+               stddev_samp(tempo_entrega_dias) AS std
+        FROM ({filtro})
+        GROUP BY review_score
+        ORDER BY review_score
+    """, [dias_min, dias_max]).df()
+    stats_by_score['review_score'] = stats_by_score['review_score'].astype('int8')
+    stats_by_score = stats_by_score.set_index('review_score').astype({'std': 'float64'}).round(2)
+    return {
+        'total_avaliacoes': total,
+        'correlacao': np.nan if correlacao is None else correlacao,
+        'stats_by_score': stats_by_score,
+        'tempo_medio_geral': tempo_medio,
+    }
+
+
+# Chave de resultado -> (método de OlistAnalysis, consulta)
+PERGUNTAS_SQL = {
+    'pergunta_1': ('pergunta_1_entregas_atrasadas', _pergunta_1),
+    'pergunta_2': ('pergunta_2_metodo_pagamento', _pergunta_2),
+    'pergunta_3': ('pergunta_3_top_categorias', _pergunta_3),
+    'pergunta_4': ('pergunta_4_tempo_entrega_avaliacao', _pergunta_4),
+}
+
+
+def executar_duckdb(data_dir=DATA_DIR, perguntas=None, threads=None, limite_memoria=None,
+                    diretorio_temporario=None, partition_filter=None):
+    """
+    Executa as perguntas no DuckDB, lendo direto dos arquivos em `data_dir`
+
+    Parameters:
+    data_dir (str): Diretório com os CSVs (ou Parquet de mesmo nome) do Olist
+    perguntas (list): Chaves de resultado a calcular ('pergunta_1' ... 'pergunta_4');
+        todas por padrão
+    threads (int): Número de threads; por padrão, todos os núcleos
+    limite_memoria (str): Limite de memória do DuckDB (ex.: '4GB'); acima dele
+        os operadores gravam em disco
+    diretorio_temporario (str): Onde gravar os dados que não cabem na memória
+    partition_filter (dict): Poda de partições das tabelas particionadas
+        (ver data_loader.find_partitions)
+
+    Returns:
+    dict: Resultados no mesmo formato de OlistAnalysis.results
+    """
+    duckdb = _duckdb()
+    perguntas = perguntas or list(PERGUNTAS_SQL)
+    con = duckdb.connect()
+    try:
+        con.execute("SET enable_progress_bar = false")
+        if threads:
+            con.execute(f"SET threads = {int(threads)}")
+        if limite_memoria:
+            con.execute(f"SET memory_limit = '{limite_memoria}'")
+        if diretorio_temporario:
+            con.execute(f"SET temp_directory = '{diretorio_temporario}'")
+        _registrar_tabelas(con, data_dir, columns_for_analyses(
+            [PERGUNTAS_SQL[pergunta][0] for pergunta in perguntas]), partition_filter)
+
+        results = {}
+        for pergunta in perguntas:
+            resultado = PERGUNTAS_SQL[pergunta][1](con)
+            if resultado is not None:
+                results[pergunta] = resultado
+        return results
+    finally:
+        con.close()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Atualização incremental dos resultados do Olist
+
+Mantém em disco o estado agregado de cada pergunta (estado.json) e um registro
+compacto das linhas já incorporadas. Cada lote diário é aplicado como delta:
+a contribuição antiga das chaves alteradas é retirada dos agregados e a nova
+é somada, de modo que atualizações tardias (por exemplo, um pedido que passa
+a 'delivered') são tratadas sem reprocessar o histórico.
+"""
+
+import json
+import os
+
+import pandas as pd
+
+from analise_streaming import (
+    AgregadoEntregas, AgregadoPagamentos, AgregadoCategorias, AgregadoTempoAvaliacao,
+    juntar_tempo_avaliacao
+)
+from data_loader import DATA_DIR, TABLE_SCHEMAS, read_table
+
+# Colunas guardadas no registro de cada tabela e a chave usada para upsert
+REGISTROS = {
+    'orders': {
+        'chave': ['order_id'],
+        'colunas': ['order_status', 'order_purchase_timestamp',
+                    'order_delivered_customer_date', 'order_estimated_delivery_date'],
+    },
+    'order_payments': {
+        'chave': ['order_id', 'payment_sequential'],
+        'colunas': ['payment_type', 'payment_value'],
+    },
+    'order_items': {
+        'chave': ['order_id', 'order_item_id'],
+        'colunas': ['product_category_name', 'price'],
+    },
+    'order_reviews': {
+        'chave': ['review_id', 'order_id'],
+        'colunas': ['review_score'],
+    },
+}
+
+ARQUIVO_ESTADO = 'estado.json'
+
+
+class EstadoIncremental:
+    """Agregados das 4 perguntas mais o registro necessário para retratações"""
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self.agregados = {
+            'pergunta_1': AgregadoEntregas(),
+            'pergunta_2': AgregadoPagamentos(),
+            'pergunta_3': AgregadoCategorias(),
+            'pergunta_4': AgregadoTempoAvaliacao(),
+        }
+        self.registros = {
+            nome: pd.DataFrame(columns=spec['chave'] + spec['colunas']).set_index(spec['chave'])
+            for nome, spec in REGISTROS.items()
+        }
+
+    @classmethod
+    def carregar(cls, diretorio):
+        """Lê o estado salvo em `diretorio` (ou cria um estado vazio)"""
+        estado = cls(diretorio)
+        caminho = os.path.join(diretorio, ARQUIVO_ESTADO)
+        if not os.path.exists(caminho):
+            return estado
+        with open(caminho) as f:
+            salvo = json.load(f)
+        classes = {nome: type(agregado) for nome, agregado in estado.agregados.items()}
+        estado.agregados = {nome: classes[nome].de_dict(dados) for nome, dados in salvo.items()}
+        for nome in REGISTROS:
+            estado.registros[nome] = pd.read_pickle(os.path.join(diretorio, f"registro_{nome}.pkl"))
+        return estado
+
+    def salvar(self):
+        os.makedirs(self.diretorio, exist_ok=True)
+        for nome, registro in self.registros.items():
+            registro.to_pickle(os.path.join(self.diretorio, f"registro_{nome}.pkl"))
+        caminho = os.path.join(self.diretorio, ARQUIVO_ESTADO)
+        with open(caminho + '.tmp', 'w') as f:
+            json.dump({nome: agregado.para_dict() for nome, agregado in self.agregados.items()}, f)
+        # O estado só é trocado depois que os registros foram gravados
+        os.replace(caminho + '.tmp', caminho)
+
+    def _upsert(self, nome, delta):
+        """Substitui/insere as linhas do delta no registro; devolve (antigas, novas)"""
+        spec = REGISTROS[nome]
+        novas = (delta[spec['chave'] + spec['colunas']]
+                 .drop_duplicates(subset=spec['chave'], keep='last')
+                 .set_index(spec['chave']))
+        registro = self.registros[nome]
+        if len(registro) == 0:
+            self.registros[nome] = novas
+            return registro.reset_index(), novas.reset_index()
+        antigas = registro[registro.index.isin(novas.index)]
+        self.registros[nome] = pd.concat([registro[~registro.index.isin(novas.index)], novas])
+        return antigas.reset_index(), novas.reset_index()
+
+    def _pedidos_com_avaliacoes(self, order_ids):
+        orders = self.registros['orders']
+        orders = orders[orders.index.isin(order_ids)].reset_index()
+        reviews = self.registros['order_reviews'].reset_index()
+        reviews = reviews[reviews['order_id'].isin(order_ids)]
+        return juntar_tempo_avaliacao(orders, reviews)
+
+    def aplicar_delta(self, deltas, products=None):
+        """
+        Incorpora um lote de linhas novas ou alteradas
+
+        Parameters:
+        deltas (dict): {tabela: DataFrame} com linhas de orders, order_payments,
+            order_items e/ou order_reviews
+        products (DataFrame): Catálogo usado para resolver a categoria dos itens
+        """
+        # Pedidos cuja junção com avaliações (pergunta 4) pode mudar
+        afetados = pd.Index([])
+        for nome in ('orders', 'order_reviews'):
+            if nome in deltas and len(deltas[nome]):
+                afetados = afetados.union(pd.Index(deltas[nome]['order_id'].unique()))
+        if len(afetados):
+            self.agregados['pergunta_4'].remover(
+                AgregadoTempoAvaliacao().atualizar(self._pedidos_com_avaliacoes(afetados)))
+
+        if 'orders' in deltas:
+            antigas, novas = self._upsert('orders', deltas['orders'])
+            self.agregados['pergunta_1'].remover(AgregadoEntregas().atualizar(antigas))
+            self.agregados['pergunta_1'].combinar(AgregadoEntregas().atualizar(novas))
+
+        if 'order_payments' in deltas:
+            antigas, novas = self._upsert('order_payments', deltas['order_payments'])
+            limiar = self.agregados['pergunta_2'].limiar
+            self.agregados['pergunta_2'].remover(AgregadoPagamentos(limiar).atualizar(antigas))
+            self.agregados['pergunta_2'].combinar(AgregadoPagamentos(limiar).atualizar(novas))
+
+        if 'order_items' in deltas:
+            items = deltas['order_items']
+            if 'product_category_name' not in items.columns:
+                if products is None:
+                    raise ValueError("products é necessário para resolver a categoria dos itens")
+                categorias = products.set_index('product_id')['product_category_name']
+                items = items.assign(product_category_name=items['product_id'].map(categorias))
+            antigas, novas = self._upsert('order_items', items)
+            self.agregados['pergunta_3'].remover(AgregadoCategorias().atualizar(antigas))
+            self.agregados['pergunta_3'].combinar(AgregadoCategorias().atualizar(novas))
+
+        if 'order_reviews' in deltas:
+            self._upsert('order_reviews', deltas['order_reviews'])
+
+        if len(afetados):
+            self.agregados['pergunta_4'].combinar(
+                AgregadoTempoAvaliacao().atualizar(self._pedidos_com_avaliacoes(afetados)))
+
+    def resultados(self):
+        """Resultados no mesmo formato de OlistAnalysis.results"""
+        results = {}
+        for pergunta, agregado in self.agregados.items():
+            resultado = agregado.resultado()
+            if resultado is not None:
+                results[pergunta] = resultado
+        return results
+
+
+def ler_delta(diretorio):
+    """Lê os CSVs de um lote diário (mesmos nomes de arquivo do dataset completo)"""
+    deltas = {}
+    for nome in list(REGISTROS) + ['products']:
+        if os.path.exists(os.path.join(diretorio, TABLE_SCHEMAS[nome]['file'])):
+            deltas[nome] = read_table(nome, diretorio, use_cache=False)
+    return deltas
+
+
+def atualizar(diretorio_estado, diretorio_delta, data_dir=DATA_DIR):
+    """
+    Aplica o lote em `diretorio_delta` ao estado salvo e devolve os resultados
+
+    Parameters:
+    diretorio_estado (str): Onde o estado incremental é mantido
+    diretorio_delta (str): Diretório com os CSVs novos (qualquer subconjunto das tabelas)
+    data_dir (str): Dataset base, de onde vem o catálogo de produtos; produtos
+        presentes no lote têm precedência
+    """
+    estado = EstadoIncremental.carregar(diretorio_estado)
+    deltas = ler_delta(diretorio_delta)
+    products = deltas.pop('products', None)
+    if 'order_items' in deltas and os.path.exists(os.path.join(data_dir, TABLE_SCHEMAS['products']['file'])):
+        catalogo = read_table('products', data_dir, columns=['product_id', 'product_category_name'])
+        if products is not None:
+            catalogo = pd.concat([catalogo, products[['product_id', 'product_category_name']]])
+            catalogo = catalogo.drop_duplicates(subset='product_id', keep='last')
+        products = catalogo
+    estado.aplicar_delta(deltas, products=products)
+    estado.salvar()
+    return estado.resultados()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        print("Uso: python analise_incremental.py <diretorio_estado> <diretorio_delta>")
+        sys.exit(1)
+    for pergunta, resultado in atualizar(sys.argv[1], sys.argv[2]).items():
+        print(f"\n{pergunta}:")
+        for chave, valor in resultado.items():
+            print(f"  {chave}: {valor}")
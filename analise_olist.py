@@ -9,20 +9,43 @@ Este script responde às 4 perguntas principais sobre o dataset do Olist:
 4. Qual é a relação entre o tempo de entrega e a nota de avaliação do cliente?
 """
 
+import functools
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
-# Configuração para visualizações
-plt.style.use('default')
-sns.set_palette("husl")
+from instrumentacao import Instrumentacao, instrumentar
+
+# Políticas de renderização dos gráficos:
+# 'show'     - salva em 300 dpi e chama plt.show() (comportamento original)
+# 'none'     - só calcula, nenhum gráfico é gerado
+# 'deferred' - enfileira os gráficos; renderizar_pendentes() os desenha depois, em outro processo
+# 'fast'     - backend Agg, dpi reduzido e hexbin no lugar do scatter para N grande
+RENDER_MODES = ('show', 'none', 'deferred', 'fast')
+DPI_RAPIDO = 100
+LIMITE_PONTOS_SCATTER = 20_000
+# Linhas por bloco ao alimentar os esboços do modo aproximado da pergunta 4
+TAMANHO_BLOCO_ESBOCO = 1_000_000
+
+# matplotlib e seaborn só são importados (e o estilo aplicado) no primeiro gráfico desenhado:
+# quem usa apenas os números de OlistAnalysis.results não paga por eles
+_ESTILO_APLICADO = False
+
+def _pyplot():
+    """matplotlib.pyplot com o estilo dos gráficos já aplicado"""
+    global _ESTILO_APLICADO
+    import matplotlib.pyplot as plt
+    if not _ESTILO_APLICADO:
+        import seaborn as sns
+        plt.style.use('default')
+        sns.set_palette("husl")
+        _ESTILO_APLICADO = True
+    return plt
 
 def setup_matplotlib():
     """Configurar matplotlib para visualizações"""
+    plt = _pyplot()
     plt.rcParams['figure.figsize'] = (12, 8)
     plt.rcParams['font.size'] = 10
     plt.rcParams['axes.titlesize'] = 12
@@ -30,20 +53,452 @@ def setup_matplotlib():
     plt.rcParams['xtick.labelsize'] = 8
     plt.rcParams['ytick.labelsize'] = 8
 
+# Categorias de entrega da pergunta 1, na ordem dos códigos de classificar_entregas
+STATUS_ENTREGA = ['Atrasado', 'No Prazo', 'Antecipado']
+
+def classificar_entregas(atraso_dias):
+    """
+    Classifica as entregas pelo atraso em dias, de forma vetorizada
+    
+    Parameters:
+    atraso_dias (np.ndarray): Atraso de cada entrega (positivo = atrasada)
+    
+    Returns:
+    tuple: (códigos em STATUS_ENTREGA, contagem por código, atraso médio das atrasadas)
+    """
+    atrasado = atraso_dias > 0
+    codigos = np.select([atrasado, atraso_dias == 0], [0, 1], default=2).astype(np.int8)
+    contagens = np.bincount(codigos, minlength=3)
+    atraso_medio = atraso_dias[atrasado].mean() if contagens[0] else np.nan
+    return codigos, contagens, atraso_medio
+
+# Limites (km) das faixas de distância vendedor-cliente; a última é aberta
+FAIXAS_DISTANCIA_KM = (0, 100, 300, 600, 1000, 2000, np.inf)
+
+# Níveis de agregação da pergunta 2
+NIVEIS_PAGAMENTO = ('pagamento', 'pedido')
+
+def agregar_pagamentos_por_pedido(payments):
+    """
+    Soma os pagamentos de cada pedido e identifica o método dominante
+    
+    Redução agrupada sobre códigos inteiros (bincount), sem ordenação: o método
+    dominante é o de maior valor somado no pedido (em empate, o de menor código).
+    
+    Parameters:
+    payments (DataFrame): order_payments com order_id, payment_type e payment_value
+    
+    Returns:
+    tuple: (métodos, código do método dominante por pedido, valor total por pedido)
+    """
+    categorico = isinstance(payments['order_id'].dtype, pd.CategoricalDtype)
+    if categorico:
+        pedido = payments['order_id'].cat.codes.to_numpy().astype(np.int64)
+        n_pedidos = len(payments['order_id'].cat.categories)
+    else:
+        pedido, unicos = pd.factorize(payments['order_id'], sort=False)
+        n_pedidos = len(unicos)
+    tipos = pd.Categorical(payments['payment_type'])
+    tipo = tipos.codes.astype(np.int64)
+    n_tipos = len(tipos.categories)
+    valor = payments['payment_value'].to_numpy(dtype=np.float64)
+    
+    # Linhas com order_id ou método nulo (código -1) são ignoradas
+    validos = (pedido >= 0) & (tipo >= 0)
+    if not validos.all():
+        pedido, tipo, valor = pedido[validos], tipo[validos], valor[validos]
+    por_tipo = np.bincount(pedido * n_tipos + tipo, weights=valor, minlength=n_pedidos * n_tipos)
+    por_tipo = por_tipo.reshape(n_pedidos, n_tipos)
+    dominante = por_tipo.argmax(axis=1)
+    valor_pedido = por_tipo.sum(axis=1)
+    
+    # Categorias de order_id sem pagamentos não são pedidos
+    if categorico or not validos.all():
+        presentes = np.bincount(pedido, minlength=n_pedidos) > 0
+        dominante, valor_pedido = dominante[presentes], valor_pedido[presentes]
+    return tipos.categories, dominante, valor_pedido
+
+def _grafico_pergunta_1(dados, rapido=False):
+    """Gráficos da pergunta 1: status de entrega e distribuição de atrasos"""
+    plt = _pyplot()
+    percentual_atraso, percentual_no_prazo, percentual_antecipado = dados['percentuais']
+    atraso_dias = dados['atraso_dias']
+    
+    plt.figure(figsize=(10, 6))
+    
+    # Gráfico de pizza
+    plt.subplot(1, 2, 1)
+    labels = STATUS_ENTREGA
+    sizes = [percentual_atraso, percentual_no_prazo, percentual_antecipado]
+    colors = ['#ff9999', '#66b3ff', '#99ff99']
+    
+    plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
+    plt.title('Distribuição do Status de Entrega')
+    
+    # Histograma de atrasos
+    plt.subplot(1, 2, 2)
+    plt.hist(atraso_dias, bins=30, color='skyblue', alpha=0.7, edgecolor='black')
+    plt.axvline(x=0, color='red', linestyle='--', label='Data Estimada')
+    plt.xlabel('Dias de Atraso/Antecipação')
+    plt.ylabel('Número de Pedidos')
+    plt.title('Distribuição de Atrasos/Antecipações')
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+
+def _grafico_pergunta_2(dados, rapido=False):
+    """Gráficos da pergunta 2: pedidos > R$ 150 por método de pagamento"""
+    plt = _pyplot()
+    payment_stats = dados['payment_stats']
+    
+    plt.figure(figsize=(12, 6))
+    
+    # Gráfico de barras - Quantidade de pedidos
+    plt.subplot(1, 2, 1)
+    bars1 = plt.bar(payment_stats.index, payment_stats['quantidade_pedidos'], 
+                   color='lightblue', edgecolor='black')
+    plt.title('Quantidade de Pedidos > R$ 150 por Método de Pagamento')
+    plt.xlabel('Método de Pagamento')
+    plt.ylabel('Quantidade de Pedidos')
+    plt.xticks(rotation=45)
+    
+    # Adicionar valores nas barras
+    for bar in bars1:
+        height = bar.get_height()
+        plt.text(bar.get_x() + bar.get_width()/2., height + 1,
+                f'{int(height)}', ha='center', va='bottom')
+    
+    # Gráfico de pizza - Percentual
+    plt.subplot(1, 2, 2)
+    plt.pie(payment_stats['percentual'], labels=payment_stats.index, 
+            autopct='%1.1f%%', startangle=90)
+    plt.title('Distribuição Percentual por Método de Pagamento')
+
+def _grafico_pergunta_3(dados, rapido=False):
+    """Gráficos da pergunta 3: quantidade e receita das top N categorias"""
+    plt = _pyplot()
+    top_5_categories = dados['top_5_categories']
+    posicoes = range(len(top_5_categories))
+    
+    plt.figure(figsize=(14, 10))
+    
+    # Gráfico de barras - Quantidade vendida
+    plt.subplot(2, 2, 1)
+    bars1 = plt.bar(posicoes, top_5_categories['quantidade_vendida'], 
+                   color='lightcoral', edgecolor='black')
+    plt.title(f'Top {len(top_5_categories)} Categorias - Quantidade Vendida')
+    plt.xlabel('Categoria')
+    plt.ylabel('Quantidade Vendida')
+    plt.xticks(posicoes, [cat[:15] + '...' if len(cat) > 15 else cat 
+                         for cat in top_5_categories.index], rotation=45)
+    
+    # Adicionar valores nas barras
+    for i, bar in enumerate(bars1):
+        height = bar.get_height()
+        plt.text(bar.get_x() + bar.get_width()/2., height + height*0.01,
+                f'{int(height):,}', ha='center', va='bottom', fontsize=8)
+    
+    # Gráfico de barras - Receita total
+    plt.subplot(2, 2, 2)
+    bars2 = plt.bar(posicoes, top_5_categories['receita_total'], 
+                   color='lightgreen', edgecolor='black')
+    plt.title(f'Top {len(top_5_categories)} Categorias - Receita Total')
+    plt.xlabel('Categoria')
+    plt.ylabel('Receita Total (R$)')
+    plt.xticks(posicoes, [cat[:15] + '...' if len(cat) > 15 else cat 
+                         for cat in top_5_categories.index], rotation=45)
+    
+    # Adicionar valores nas barras
+    for i, bar in enumerate(bars2):
+        height = bar.get_height()
+        plt.text(bar.get_x() + bar.get_width()/2., height + height*0.01,
+                f'R${height/1000:.0f}k', ha='center', va='bottom', fontsize=8)
+    
+    # Gráfico de pizza - Quantidade
+    plt.subplot(2, 2, 3)
+    plt.pie(top_5_categories['quantidade_vendida'], 
+            labels=[cat[:20] + '...' if len(cat) > 20 else cat 
+                   for cat in top_5_categories.index],
+            autopct='%1.1f%%', startangle=90)
+    plt.title('Distribuição de Vendas por Categoria')
+    
+    # Gráfico de pizza - Receita
+    plt.subplot(2, 2, 4)
+    plt.pie(top_5_categories['receita_total'], 
+            labels=[cat[:20] + '...' if len(cat) > 20 else cat 
+                   for cat in top_5_categories.index],
+            autopct='%1.1f%%', startangle=90)
+    plt.title('Distribuição de Receita por Categoria')
+
+def _grafico_pergunta_4(dados, rapido=False):
+    """Gráficos da pergunta 4: tempo de entrega vs nota de avaliação"""
+    plt = _pyplot()
+    delivered_reviews = dados['delivered_reviews']
+    correlation = dados['correlacao']
+    
+    plt.figure(figsize=(15, 10))
+    
+    # Scatter plot (no modo rápido, hexbin quando há muitos pontos)
+    plt.subplot(2, 3, 1)
+    if rapido and len(delivered_reviews) > LIMITE_PONTOS_SCATTER:
+        plt.hexbin(delivered_reviews['tempo_entrega_dias'], delivered_reviews['review_score'],
+                   gridsize=(50, 5), cmap='Blues', mincnt=1)
+    else:
+        plt.scatter(delivered_reviews['tempo_entrega_dias'], delivered_reviews['review_score'], 
+                   alpha=0.5, color='blue', rasterized=rapido)
+    plt.xlabel('Tempo de Entrega (dias)')
+    plt.ylabel('Nota de Avaliação')
+    plt.title(f'Relação Tempo de Entrega vs Avaliação\n(Correlação: {correlation:.3f})')
+    plt.grid(True, alpha=0.3)
+    
+    # Boxplot por nota (no modo aproximado, quartis dos esboços)
+    ax = plt.subplot(2, 3, 2)
+    if 'boxplot' in dados:
+        ax.bxp(dados['boxplot'], showfliers=False)
+    else:
+        grupos = delivered_reviews.groupby('review_score')['tempo_entrega_dias']
+        plt.boxplot([dias for _, dias in grupos], labels=list(grupos.groups))
+    plt.xlabel('Nota de Avaliação')
+    plt.ylabel('Tempo de Entrega (dias)')
+    plt.title('Distribuição do Tempo de Entrega por Nota')
+    plt.grid(True, alpha=0.3)
+    
+    # Tempo médio por nota
+    plt.subplot(2, 3, 3)
+    avg_time_by_score = dados.get('media_por_nota')
+    if avg_time_by_score is None:
+        avg_time_by_score = delivered_reviews.groupby('review_score')['tempo_entrega_dias'].mean()
+    bars = plt.bar(avg_time_by_score.index, avg_time_by_score.values, 
+                  color='lightblue', edgecolor='black')
+    plt.xlabel('Nota de Avaliação')
+    plt.ylabel('Tempo Médio de Entrega (dias)')
+    plt.title('Tempo Médio de Entrega por Nota')
+    plt.grid(True, alpha=0.3)
+    
+    # Adicionar valores nas barras
+    for bar, value in zip(bars, avg_time_by_score.values):
+        plt.text(bar.get_x() + bar.get_width()/2., bar.get_height() + 0.5,
+                f'{value:.1f}', ha='center', va='bottom')
+    
+    # Histograma de tempo de entrega
+    plt.subplot(2, 3, 4)
+    plt.hist(delivered_reviews['tempo_entrega_dias'], bins=30, 
+            color='skyblue', alpha=0.7, edgecolor='black')
+    plt.xlabel('Tempo de Entrega (dias)')
+    plt.ylabel('Frequência')
+    plt.title('Distribuição do Tempo de Entrega')
+    plt.grid(True, alpha=0.3)
+    
+    # Histograma de notas
+    plt.subplot(2, 3, 5)
+    plt.hist(delivered_reviews['review_score'], bins=5, 
+            color='lightgreen', alpha=0.7, edgecolor='black')
+    plt.xlabel('Nota de Avaliação')
+    plt.ylabel('Frequência')
+    plt.title('Distribuição das Notas de Avaliação')
+    plt.grid(True, alpha=0.3)
+    
+    # Heatmap de correlação (se houver mais variáveis)
+    plt.subplot(2, 3, 6)
+    variaveis = ['tempo_entrega_dias', 'review_score']
+    corr_data = pd.DataFrame([[1.0, correlation], [correlation, 1.0]], index=variaveis, columns=variaveis)
+    import seaborn as sns
+    sns.heatmap(corr_data, annot=True, cmap='coolwarm', center=0,
+               square=True, cbar_kws={'shrink': .8})
+    plt.title('Matriz de Correlação')
+
+# Arquivo e função de desenho de cada gráfico
+def _grafico_distancia(dados, rapido=False):
+    """Gráficos da análise de distância: atraso e tempo de entrega por faixa"""
+    plt = _pyplot()
+    atraso_por_faixa = dados['atraso_por_faixa']
+    tempo_por_faixa = dados['tempo_por_faixa']
+    
+    plt.figure(figsize=(14, 6))
+    
+    # Percentual de entregas atrasadas por faixa
+    plt.subplot(1, 2, 1)
+    plt.bar(atraso_por_faixa.index.astype(str), atraso_por_faixa['percentual_atraso'],
+            color='#ff9999', edgecolor='black')
+    plt.title('Entregas Atrasadas por Distância Vendedor-Cliente')
+    plt.xlabel('Distância')
+    plt.ylabel('Entregas Atrasadas (%)')
+    plt.xticks(rotation=45)
+    
+    # Tempo médio de entrega e nota média por faixa
+    ax = plt.subplot(1, 2, 2)
+    ax.bar(tempo_por_faixa.index.astype(str), tempo_por_faixa['tempo_medio_dias'],
+           color='lightblue', edgecolor='black')
+    ax.set_title('Tempo de Entrega e Nota por Distância')
+    ax.set_xlabel('Distância')
+    ax.set_ylabel('Tempo Médio de Entrega (dias)')
+    ax.tick_params(axis='x', rotation=45)
+    ax2 = ax.twinx()
+    ax2.plot(tempo_por_faixa.index.astype(str), tempo_por_faixa['nota_media'], color='darkred', marker='o')
+    ax2.set_ylabel('Nota Média')
+
+def _grafico_tendencias(dados, rapido=False):
+    """Gráficos das tendências: atraso, mix de pagamento e tempo/nota por período"""
+    plt = _pyplot()
+    atrasos = dados['atrasos']
+    mix = dados['pagamentos'].pivot(index='periodo', columns='payment_type', values='percentual').fillna(0)
+    avaliacoes = dados['avaliacoes']
+    
+    plt.figure(figsize=(15, 10))
+    
+    # Percentual de entregas atrasadas
+    plt.subplot(3, 1, 1)
+    plt.plot(atrasos['periodo'].astype(str), atrasos['percentual_atraso'], color='#ff9999', marker='o')
+    plt.title('Entregas Atrasadas por Período de Compra')
+    plt.ylabel('Entregas Atrasadas (%)')
+    plt.xticks(rotation=45)
+    plt.grid(True, alpha=0.3)
+    
+    # Participação de cada método de pagamento (empilhada)
+    plt.subplot(3, 1, 2)
+    plt.stackplot(mix.index.astype(str), mix.T.to_numpy(), labels=mix.columns)
+    plt.title('Métodos de Pagamento por Período (pagamentos > R$ 150)')
+    plt.ylabel('Participação (%)')
+    plt.legend(loc='upper left', fontsize=8)
+    plt.xticks(rotation=45)
+    
+    # Tempo médio de entrega e correlação tempo-nota
+    ax = plt.subplot(3, 1, 3)
+    ax.plot(avaliacoes['periodo'].astype(str), avaliacoes['tempo_medio_dias'], color='steelblue', marker='o')
+    ax.set_title('Tempo de Entrega e Correlação com a Nota por Período')
+    ax.set_ylabel('Tempo Médio de Entrega (dias)')
+    ax.tick_params(axis='x', rotation=45)
+    ax2 = ax.twinx()
+    ax2.plot(avaliacoes['periodo'].astype(str), avaliacoes['correlacao'], color='darkred', marker='s')
+    ax2.set_ylabel('Correlação Tempo-Nota')
+
+GRAFICOS = {
+    'pergunta_1': ('pergunta_1_entregas_atrasadas.png', _grafico_pergunta_1),
+    'pergunta_2': ('pergunta_2_metodos_pagamento.png', _grafico_pergunta_2),
+    'pergunta_3': ('pergunta_3_top_categorias.png', _grafico_pergunta_3),
+    'pergunta_4': ('pergunta_4_tempo_entrega_avaliacao.png', _grafico_pergunta_4),
+    'distancia': ('distancia_entregas.png', _grafico_distancia),
+    'tendencias': ('tendencias.png', _grafico_tendencias),
+}
+
+def desenhar_grafico(pergunta, dados, render='show', instrumentacao=None):
+    """
+    Desenha e salva o gráfico de uma pergunta
+    
+    Parameters:
+    pergunta (str): Chave em GRAFICOS ('pergunta_1' ... 'pergunta_4')
+    dados (dict): Dados já calculados pela pergunta
+    render (str): 'show' (300 dpi e plt.show) ou 'fast' (Agg, DPI_RAPIDO, sem janela);
+        'deferred' desenha como 'show', mas sem abrir janela
+    instrumentacao (Instrumentacao): Recebe as etapas de desenho e gravação
+    
+    Returns:
+    str: Caminho do arquivo salvo
+    """
+    rapido = render == 'fast'
+    if render != 'show':
+        # Antes do primeiro import de pyplot, evita carregar o backend interativo
+        import matplotlib
+        matplotlib.use('Agg')
+    plt = _pyplot()
+    instrumentacao = instrumentacao or Instrumentacao(ativo=False)
+    arquivo, desenhar = GRAFICOS[pergunta]
+    with instrumentacao.etapa(f'{pergunta}.desenhar'):
+        desenhar(dados, rapido=rapido)
+        plt.tight_layout()
+    with instrumentacao.etapa(f'{pergunta}.savefig'):
+        plt.savefig(arquivo, dpi=DPI_RAPIDO if rapido else 300, bbox_inches='tight')
+    if render == 'show':
+        plt.show()
+    plt.close('all')
+    return arquivo
+
+def _desenhar_pendentes(especificacoes):
+    """Desenha uma fila de gráficos adiados (executado em um processo separado)"""
+    setup_matplotlib()
+    return [desenhar_grafico(pergunta, dados, render='deferred') for pergunta, dados in especificacoes]
+
+# Chave em self.results de cada método pergunta_*
+CHAVES_RESULTADO = {
+    'pergunta_1_entregas_atrasadas': 'pergunta_1',
+    'pergunta_2_metodo_pagamento': 'pergunta_2',
+    'pergunta_3_top_categorias': 'pergunta_3',
+    'pergunta_4_tempo_entrega_avaliacao': 'pergunta_4',
+    'distancia_entregas': 'distancia',
+    'ranking_categorias': 'ranking_categorias',
+    'tendencias': 'tendencias',
+}
+
+def _com_cache(metodo):
+    """Decorador: consulta o cache de resultados antes de executar a pergunta"""
+    chave_resultado = CHAVES_RESULTADO[metodo.__name__]
+    
+    @functools.wraps(metodo)
+    def envolvido(self, *args, **kwargs):
+        if self.cache is None:
+            return metodo(self, *args, **kwargs)
+        chave = self._chave_cache(metodo.__name__, args, kwargs)
+        resultado = self.cache.obter(chave)
+        if resultado is not None:
+            print(f"\n{chave_resultado}: resultado recuperado do cache")
+            self.results[chave_resultado] = resultado
+            if self.render != 'none':
+                dados = self.cache.obter_grafico(chave)
+                if dados is not None:
+                    self._renderizar(chave_resultado, dados)
+            return resultado
+        resultado = metodo(self, *args, **kwargs)
+        if resultado is not None:
+            self.cache.guardar(chave, resultado, self._dados_graficos.get(chave_resultado))
+        return resultado
+    
+    return envolvido
+
 class OlistAnalysis:
-    def __init__(self, datasets):
+    def __init__(self, datasets, render='show', cache=None, instrumentacao=None):
         """
         Inicializa a análise com os datasets do Olist
         
         Parameters:
-        datasets (dict): Dicionário contendo todos os datasets
+        datasets (dict): Dicionário contendo todos os datasets, ou um
+            data_loader.LazyDatasets que carrega cada tabela sob demanda
+        render (str): Política de renderização dos gráficos (ver RENDER_MODES)
+        cache (CacheResultados): Cache persistente de resultados (cache_resultados);
+            None desativa o cache
+        instrumentacao (Instrumentacao): Recebe as medições de cada etapa;
+            None desativa a instrumentação
         """
+        if render not in RENDER_MODES:
+            raise ValueError(f"render deve ser um de {RENDER_MODES}, não {render!r}")
         self.datasets = datasets
+        self.render = render
         self.results = {}
+        # Gráficos enfileirados no modo 'deferred': (pergunta, dados)
+        self.graficos_pendentes = []
+        # Dados do último gráfico de cada pergunta (guardados junto com o resultado no cache)
+        self._dados_graficos = {}
+        self.cache = cache
+        self._impressoes = {}
+        self.instrumentacao = instrumentacao or Instrumentacao(ativo=False)
+        # Tabelas fato desnormalizadas, construídas na primeira pergunta que as usa
+        self._fatos = {}
         self.prepare_data()
     
-    def prepare_data(self):
-        """Preparar e limpar os dados para análise"""
+    def _tabelas_carregadas(self):
+        """Nomes das tabelas já em memória (sem forçar a leitura das preguiçosas)"""
+        if hasattr(self.datasets, 'loaded'):
+            return self.datasets.loaded()
+        return list(self.datasets)
+    
+    @instrumentar()
+    def prepare_data(self, max_workers=None):
+        """
+        Preparar e limpar os dados para análise
+        
+        Parameters:
+        max_workers (int): Threads para converter as colunas de data de uma tabela em paralelo
+        """
+        from data_loader import parse_datetime_columns
+        
         print("Preparando dados para análise...")
         
         # Converter colunas de data para datetime
@@ -55,16 +510,277 @@ class OlistAnalysis:
             'order_items': ['shipping_limit_date']
         }
         
+        # Tabelas ainda não carregadas terão as datas convertidas na leitura; colunas
+        # já convertidas pelo data_loader não são processadas de novo
+        carregadas = self._tabelas_carregadas()
         for dataset_name, cols in date_columns.items():
-            if dataset_name in self.datasets:
-                for col in cols:
-                    if col in self.datasets[dataset_name].columns:
-                        self.datasets[dataset_name][col] = pd.to_datetime(
-                            self.datasets[dataset_name][col], errors='coerce'
-                        )
+            if dataset_name in carregadas:
+                df = self.datasets[dataset_name]
+                with self.instrumentacao.etapa(f'prepare_data.{dataset_name}', linhas_entrada=len(df)):
+                    parse_datetime_columns(df, cols, max_workers=max_workers)
+        
+        for dataset_name, falhas in self.falhas_datas().items():
+            for col, quantidade in falhas.items():
+                print(f"Aviso: {quantidade:,} valores de {dataset_name}.{col} não são datas válidas "
+                      f"(convertidos para NaT)")
         
         print("Dados preparados com sucesso!")
     
+    def falhas_datas(self):
+        """
+        Valores de data que não puderam ser convertidos, por tabela e coluna
+        
+        Inclui as conversões feitas pelo data_loader na leitura e por prepare_data.
+        """
+        falhas = {}
+        for dataset_name in self._tabelas_carregadas():
+            por_coluna = {col: quantidade for col, quantidade
+                          in self.datasets[dataset_name].attrs.get('datetime_failures', {}).items() if quantidade}
+            if por_coluna:
+                falhas[dataset_name] = por_coluna
+        return falhas
+    
+    @staticmethod
+    def _chaves_categoricas(*series):
+        """Converte colunas de chave para um mesmo dtype categórico (join pelos códigos)
+        
+        Chaves já codificadas como inteiros (data_loader.IdEncoder) são mantidas.
+        """
+        if all(pd.api.types.is_integer_dtype(s) for s in series):
+            return list(series)
+        categorias = pd.Index(pd.concat([pd.Series(s.unique()) for s in series], ignore_index=True)
+                              .dropna().unique())
+        dtype = pd.CategoricalDtype(categorias)
+        return [s.astype(dtype) for s in series]
+    
+    def _reportar_memoria(self, nome, df):
+        memoria_mb = df.memory_usage(deep=True).sum() / 1024 ** 2
+        print(f"Tabela fato '{nome}': {len(df):,} linhas, {memoria_mb:.1f} MB")
+    
+    def _juntar(self, etapa, fato, outra, chave):
+        """Left join de `outra` na tabela fato, medido como uma etapa"""
+        with self.instrumentacao.etapa(etapa, linhas_entrada=len(fato)) as registro:
+            fato = fato.merge(outra, on=chave, how='left')
+            registro['linhas_saida'] = len(fato)
+        return fato
+    
+    @instrumentar()
+    def fato_pedidos(self):
+        """
+        Tabela fato no nível de pedido: orders + customers + pagamentos agregados + reviews
+        
+        Há uma linha por par pedido/avaliação (pedidos sem avaliação aparecem uma
+        vez, com review_score nulo). Construída uma única vez e reutilizada.
+        """
+        if 'pedidos' in self._fatos:
+            return self._fatos['pedidos']
+        
+        fato = self.datasets['orders'].copy()
+        
+        if 'customers' in self.datasets:
+            customers = self.datasets['customers']
+            colunas = [c for c in ['customer_id', 'customer_state'] if c in customers.columns]
+            customers = customers[colunas].copy()
+            fato['customer_id'], customers['customer_id'] = self._chaves_categoricas(
+                fato['customer_id'], customers['customer_id'])
+            fato = self._juntar('fato_pedidos.customers', fato, customers, 'customer_id')
+        
+        if 'order_payments' in self.datasets:
+            payments = self.datasets['order_payments']
+            with self.instrumentacao.etapa('fato_pedidos.pagamentos_por_pedido',
+                                           linhas_entrada=len(payments)) as etapa:
+                pagamentos = payments.groupby('order_id').agg(
+                    valor_pago=('payment_value', 'sum'),
+                    quantidade_pagamentos=('payment_value', 'size')
+                ).reset_index()
+                etapa['linhas_saida'] = len(pagamentos)
+            fato['order_id'], pagamentos['order_id'] = self._chaves_categoricas(
+                fato['order_id'], pagamentos['order_id'])
+            fato = self._juntar('fato_pedidos.pagamentos', fato, pagamentos, 'order_id')
+        
+        if 'order_reviews' in self.datasets:
+            reviews = self.datasets['order_reviews']
+            colunas = [c for c in ['order_id', 'review_id', 'review_score'] if c in reviews.columns]
+            reviews = reviews[colunas].copy()
+            fato['order_id'], reviews['order_id'] = self._chaves_categoricas(
+                fato['order_id'], reviews['order_id'])
+            fato = self._juntar('fato_pedidos.reviews', fato, reviews, 'order_id')
+        
+        self._reportar_memoria('pedidos', fato)
+        self._fatos['pedidos'] = fato
+        return fato
+    
+    @instrumentar()
+    def fato_itens(self):
+        """
+        Tabela fato no nível de item: order_items + products (+ tradução) + orders + customers
+        
+        Construída uma única vez e reutilizada.
+        """
+        if 'itens' in self._fatos:
+            return self._fatos['itens']
+        
+        fato = self.datasets['order_items'].copy()
+        
+        products = self.datasets['products']
+        colunas = [c for c in ['product_id', 'product_category_name'] if c in products.columns]
+        products = products[colunas].copy()
+        fato['product_id'], products['product_id'] = self._chaves_categoricas(
+            fato['product_id'], products['product_id'])
+        fato = self._juntar('fato_itens.products', fato, products, 'product_id')
+        
+        if 'category_translation' in self.datasets:
+            translation = self.datasets['category_translation']
+            fato['product_category_name_english'] = fato['product_category_name'].map(
+                translation.set_index('product_category_name')['product_category_name_english'])
+        
+        if 'orders' in self.datasets:
+            orders = self.datasets['orders']
+            colunas = [c for c in ['order_id', 'customer_id', 'order_status', 'order_purchase_timestamp']
+                       if c in orders.columns]
+            orders = orders[colunas].copy()
+            fato['order_id'], orders['order_id'] = self._chaves_categoricas(
+                fato['order_id'], orders['order_id'])
+            fato = self._juntar('fato_itens.orders', fato, orders, 'order_id')
+        
+            if 'customers' in self.datasets and 'customer_id' in fato.columns:
+                customers = self.datasets['customers']
+                colunas = [c for c in ['customer_id', 'customer_state'] if c in customers.columns]
+                customers = customers[colunas].copy()
+                fato['customer_id'], customers['customer_id'] = self._chaves_categoricas(
+                    fato['customer_id'], customers['customer_id'])
+                fato = self._juntar('fato_itens.customers', fato, customers, 'customer_id')
+        
+        self._reportar_memoria('itens', fato)
+        self._fatos['itens'] = fato
+        return fato
+    
+    @instrumentar()
+    def distancia_pedidos(self):
+        """
+        Distância (km) entre o cliente e o vendedor mais distante de cada pedido
+        
+        Calculada uma única vez a partir dos centroides dos prefixos de CEP
+        (geolocalizacao); alinhada às linhas de orders.
+        """
+        if 'distancia' not in self._fatos:
+            from geolocalizacao import CentroidesCep, distancia_por_pedido
+            centroides = CentroidesCep.de_geolocalizacao(self.datasets['geolocation'])
+            orders = self.datasets['orders']
+            self._fatos['distancia'] = pd.Series(distancia_por_pedido(
+                orders, self.datasets['customers'], self.datasets['order_items'],
+                self.datasets['sellers'], centroides
+            ), index=orders.index, name='distancia_km')
+            print(f"Centroides de CEP: {len(centroides):,} prefixos; "
+                  f"distância calculada para {self._fatos['distancia'].notna().sum():,} pedidos")
+        return self._fatos['distancia']
+    
+    def indice_categorias(self):
+        """
+        Quantidade e receita por categoria, pré-agregadas (consultas.RankingCategorias)
+        
+        Construído uma única vez a partir da tabela fato de itens; as matrizes
+        por mês e por estado são montadas na primeira consulta que as usa.
+        """
+        if 'categorias' not in self._fatos:
+            from consultas import RankingCategorias
+            self._fatos['categorias'] = RankingCategorias(
+                self.fato_itens(),
+                translation=self.datasets['category_translation'] if 'category_translation' in self.datasets else None
+            )
+        return self._fatos['categorias']
+    
+    def consultas(self):
+        """
+        Consultas parametrizadas (limiar, top-N, janela de datas, estado) das perguntas 2 a 4
+        
+        Os índices (consultas.IndiceConsultas) usam as tabelas fato e são
+        construídos uma única vez, na primeira consulta de cada tipo.
+        """
+        if 'consultas' not in self._fatos:
+            from consultas import IndiceConsultas
+            self._fatos['consultas'] = IndiceConsultas(
+                self.fato_pedidos(),
+                itens=self.fato_itens() if 'products' in self.datasets else None,
+                pagamentos=self.datasets['order_payments'] if 'order_payments' in self.datasets else None,
+                translation=self.datasets['category_translation'] if 'category_translation' in self.datasets else None
+            )
+        return self._fatos['consultas']
+    
+    def _impressao_tabela(self, nome):
+        """Impressão digital de uma tabela, sem forçar a leitura de tabelas preguiçosas"""
+        if hasattr(self.datasets, 'fingerprint'):
+            impressao = self.datasets.fingerprint(nome)
+            if impressao is not None:
+                return impressao
+        if nome not in self._impressoes:
+            from cache_resultados import impressao_dataframe
+            self._impressoes[nome] = impressao_dataframe(self.datasets[nome])
+        return self._impressoes[nome]
+    
+    def _chave_cache(self, metodo, args, kwargs):
+        import inspect
+        from data_loader import ANALYSIS_COLUMNS
+        
+        # Argumentos por nome e com os padrões aplicados: f(), f(5) e f(n=5) têm a mesma chave
+        argumentos = inspect.signature(getattr(type(self), metodo)).bind(self, *args, **kwargs)
+        argumentos.apply_defaults()
+        parametros = {nome: valor for nome, valor in argumentos.arguments.items() if nome != 'self'}
+        impressoes = {nome: self._impressao_tabela(nome) for nome in ANALYSIS_COLUMNS[metodo]}
+        return self.cache.chave(metodo, impressoes, parametros)
+    
+    def carregar_do_cache(self):
+        """
+        Preenche self.results com as perguntas já presentes no cache, sem recalcular
+        
+        Returns:
+        list: Chaves de resultado recuperadas
+        """
+        recuperadas = []
+        if self.cache is None:
+            return recuperadas
+        for metodo, chave_resultado in CHAVES_RESULTADO.items():
+            if chave_resultado in self.results:
+                continue
+            resultado = self.cache.obter(self._chave_cache(metodo, (), {}))
+            if resultado is not None:
+                self.results[chave_resultado] = resultado
+                recuperadas.append(chave_resultado)
+        return recuperadas
+    
+    def _renderizar(self, pergunta, dados):
+        """Desenha, enfileira ou ignora o gráfico conforme self.render"""
+        self._dados_graficos[pergunta] = dados
+        if self.render == 'none':
+            return
+        if self.render == 'deferred':
+            self.graficos_pendentes.append((pergunta, dados))
+            return
+        with self.instrumentacao.etapa(f'{pergunta}.grafico'):
+            desenhar_grafico(pergunta, dados, render=self.render, instrumentacao=self.instrumentacao)
+    
+    def renderizar_pendentes(self, em_processo=True):
+        """
+        Desenha os gráficos enfileirados no modo 'deferred'
+        
+        Parameters:
+        em_processo (bool): Desenhar em um processo separado (não bloqueia o backend
+            do processo principal)
+        
+        Returns:
+        list: Arquivos gerados
+        """
+        pendentes, self.graficos_pendentes = self.graficos_pendentes, []
+        if not pendentes:
+            return []
+        if not em_processo:
+            return _desenhar_pendentes(pendentes)
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            return pool.submit(_desenhar_pendentes, pendentes).result()
+    
+    @instrumentar()
+    @_com_cache
     def pergunta_1_entregas_atrasadas(self):
         """
         Pergunta 1: Qual o percentual de pedidos entregues após a data estimada pela Olist?
@@ -73,36 +789,34 @@ class OlistAnalysis:
         print("PERGUNTA 1: Percentual de pedidos entregues após a data estimada")
         print("="*70)
         
-        orders = self.datasets['orders'].copy()
+        orders = self.datasets['orders']
         
-        # Filtrar pedidos entregues e com datas válidas
-        delivered_orders = orders[
-            (orders['order_status'] == 'delivered') &
-            (orders['order_delivered_customer_date'].notna()) &
-            (orders['order_estimated_delivery_date'].notna())
-        ].copy()
+        # Filtrar pedidos entregues e com datas válidas (a máscara já gera uma cópia)
+        with self.instrumentacao.etapa('pergunta_1.filtro', linhas_entrada=len(orders)) as etapa:
+            delivered_orders = orders[
+                (orders['order_status'] == 'delivered') &
+                (orders['order_delivered_customer_date'].notna()) &
+                (orders['order_estimated_delivery_date'].notna())
+            ]
+            etapa['linhas_saida'] = len(delivered_orders)
         
         if len(delivered_orders) == 0:
             print("Não há dados suficientes para análise de entregas.")
             return
         
-        # Calcular atraso
-        delivered_orders['atraso_dias'] = (
-            delivered_orders['order_delivered_customer_date'] - 
-            delivered_orders['order_estimated_delivery_date']
-        ).dt.days
-        
-        # Classificar entregas
-        delivered_orders['status_entrega'] = delivered_orders['atraso_dias'].apply(
-            lambda x: 'Atrasado' if x > 0 else 'No Prazo' if x == 0 else 'Antecipado'
-        )
+        with self.instrumentacao.etapa('pergunta_1.classificacao', linhas_entrada=len(delivered_orders)):
+            # Calcular atraso
+            atraso_dias = (
+                delivered_orders['order_delivered_customer_date'] - 
+                delivered_orders['order_estimated_delivery_date']
+            ).dt.days.to_numpy()
+            
+            # Classificar e contar em uma única passada vetorizada
+            _, contagens, atraso_medio = classificar_entregas(atraso_dias)
+        entregas_atrasadas, entregas_no_prazo, entregas_antecipadas = (int(c) for c in contagens)
         
         # Calcular estatísticas
-        total_entregas = len(delivered_orders)
-        entregas_atrasadas = len(delivered_orders[delivered_orders['atraso_dias'] > 0])
-        entregas_no_prazo = len(delivered_orders[delivered_orders['atraso_dias'] == 0])
-        entregas_antecipadas = len(delivered_orders[delivered_orders['atraso_dias'] < 0])
-        
+        total_entregas = len(atraso_dias)
         percentual_atraso = (entregas_atrasadas / total_entregas) * 100
         percentual_no_prazo = (entregas_no_prazo / total_entregas) * 100
         percentual_antecipado = (entregas_antecipadas / total_entregas) * 100
@@ -114,7 +828,7 @@ class OlistAnalysis:
             'percentual_atraso': percentual_atraso,
             'percentual_no_prazo': percentual_no_prazo,
             'percentual_antecipado': percentual_antecipado,
-            'atraso_medio_dias': delivered_orders[delivered_orders['atraso_dias'] > 0]['atraso_dias'].mean()
+            'atraso_medio_dias': atraso_medio
         }
         
         # Apresentar resultados
@@ -124,156 +838,125 @@ class OlistAnalysis:
         print(f"Entregas antecipadas: {entregas_antecipadas:,} ({percentual_antecipado:.2f}%)")
         
         if entregas_atrasadas > 0:
-            atraso_medio = delivered_orders[delivered_orders['atraso_dias'] > 0]['atraso_dias'].mean()
             print(f"Atraso médio: {atraso_medio:.1f} dias")
         
-        # Criar visualização
-        plt.figure(figsize=(10, 6))
-        
-        # Gráfico de pizza
-        plt.subplot(1, 2, 1)
-        labels = ['Atrasado', 'No Prazo', 'Antecipado']
-        sizes = [percentual_atraso, percentual_no_prazo, percentual_antecipado]
-        colors = ['#ff9999', '#66b3ff', '#99ff99']
-        
-        plt.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
-        plt.title('Distribuição do Status de Entrega')
-        
-        # Histograma de atrasos
-        plt.subplot(1, 2, 2)
-        atrasos = delivered_orders['atraso_dias']
-        plt.hist(atrasos, bins=30, color='skyblue', alpha=0.7, edgecolor='black')
-        plt.axvline(x=0, color='red', linestyle='--', label='Data Estimada')
-        plt.xlabel('Dias de Atraso/Antecipação')
-        plt.ylabel('Número de Pedidos')
-        plt.title('Distribuição de Atrasos/Antecipações')
-        plt.legend()
-        plt.grid(True, alpha=0.3)
-        
-        plt.tight_layout()
-        plt.savefig('pergunta_1_entregas_atrasadas.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        # Criar visualização (conforme a política de renderização)
+        self._renderizar('pergunta_1', {
+            'percentuais': [percentual_atraso, percentual_no_prazo, percentual_antecipado],
+            'atraso_dias': atraso_dias
+        })
         
         return self.results['pergunta_1']
     
-    def pergunta_2_metodo_pagamento(self):
+    @instrumentar()
+    @_com_cache
+    def pergunta_2_metodo_pagamento(self, nivel='pagamento'):
         """
         Pergunta 2: Qual o método de pagamento mais utilizado em pedidos acima de R$ 150,00?
+        
+        Parameters:
+        nivel (str): 'pagamento' filtra cada linha de order_payments (comportamento
+            original); 'pedido' soma os pagamentos de cada pedido, filtra pelo total
+            e conta cada pedido uma vez, no seu método dominante
         """
+        if nivel not in NIVEIS_PAGAMENTO:
+            raise ValueError(f"nivel deve ser um de {NIVEIS_PAGAMENTO}, não {nivel!r}")
+        
         print("\n" + "="*70)
         print("PERGUNTA 2: Método de pagamento mais usado em pedidos > R$ 150,00")
         print("="*70)
         
-        payments = self.datasets['order_payments'].copy()
-        
-        # Filtrar pedidos acima de R$ 150,00
-        payments_above_150 = payments[payments['payment_value'] > 150.0]
-        
-        if len(payments_above_150) == 0:
-            print("Não há pedidos acima de R$ 150,00 no dataset.")
-            return
-        
-        # Agrupar por método de pagamento
-        payment_stats = payments_above_150.groupby('payment_type').agg({
-            'order_id': 'count',
-            'payment_value': ['sum', 'mean']
-        }).round(2)
+        payments = self.datasets['order_payments']
+        
+        if nivel == 'pedido':
+            with self.instrumentacao.etapa('pergunta_2.pagamentos_por_pedido', linhas_entrada=len(payments)) as etapa:
+                tipos, dominante, valor_pedido = agregar_pagamentos_por_pedido(payments)
+                etapa['linhas_saida'] = len(valor_pedido)
+            acima = valor_pedido > 150.0
+            total_acima = int(acima.sum())
+            if total_acima == 0:
+                print("Não há pedidos acima de R$ 150,00 no dataset.")
+                return
+            quantidade = np.bincount(dominante[acima], minlength=len(tipos))
+            valor_total = np.bincount(dominante[acima], weights=valor_pedido[acima], minlength=len(tipos))
+            usados = quantidade > 0
+            payment_stats = pd.DataFrame({
+                'quantidade_pedidos': quantidade[usados],
+                'valor_total': valor_total[usados],
+                'valor_medio': valor_total[usados] / quantidade[usados],
+            }, index=pd.Index(tipos[usados], name='payment_type')).round(2)
+        else:
+            # Filtrar pagamentos acima de R$ 150,00
+            with self.instrumentacao.etapa('pergunta_2.filtro', linhas_entrada=len(payments)) as etapa:
+                payments_above_150 = payments[payments['payment_value'] > 150.0]
+                etapa['linhas_saida'] = total_acima = len(payments_above_150)
+            
+            if total_acima == 0:
+                print("Não há pedidos acima de R$ 150,00 no dataset.")
+                return
+            
+            # Agrupar por método de pagamento
+            with self.instrumentacao.etapa('pergunta_2.groupby', linhas_entrada=total_acima) as etapa:
+                payment_stats = payments_above_150.groupby('payment_type', observed=True).agg({
+                    'order_id': 'count',
+                    'payment_value': ['sum', 'mean']
+                }).round(2)
+                etapa['linhas_saida'] = len(payment_stats)
+            
+            payment_stats.columns = ['quantidade_pedidos', 'valor_total', 'valor_medio']
         
-        payment_stats.columns = ['quantidade_pedidos', 'valor_total', 'valor_medio']
         payment_stats['percentual'] = (payment_stats['quantidade_pedidos'] / payment_stats['quantidade_pedidos'].sum()) * 100
-        payment_stats = payment_stats.sort_values('quantidade_pedidos', ascending=False)
+        # Estável: empates ficam na ordem dos métodos (alfabética)
+        payment_stats = payment_stats.sort_values('quantidade_pedidos', ascending=False, kind='stable')
         
         # Salvar resultados
         self.results['pergunta_2'] = {
-            'total_pedidos_acima_150': len(payments_above_150),
+            'total_pedidos_acima_150': total_acima,
             'metodo_mais_usado': payment_stats.index[0],
             'percentual_metodo_principal': payment_stats.iloc[0]['percentual'],
             'payment_stats': payment_stats
         }
         
         # Apresentar resultados
-        print(f"Total de pedidos acima de R$ 150,00: {len(payments_above_150):,}")
+        print(f"Total de pedidos acima de R$ 150,00: {total_acima:,} (nível: {nivel})")
         print(f"\nMétodo de pagamento mais utilizado: {payment_stats.index[0]}")
         print(f"Representa {payment_stats.iloc[0]['percentual']:.2f}% dos pedidos acima de R$ 150,00")
         print(f"\nEstatísticas por método de pagamento:")
         print(payment_stats)
         
-        # Criar visualização
-        plt.figure(figsize=(12, 6))
-        
-        # Gráfico de barras - Quantidade de pedidos
-        plt.subplot(1, 2, 1)
-        bars1 = plt.bar(payment_stats.index, payment_stats['quantidade_pedidos'], 
-                       color='lightblue', edgecolor='black')
-        plt.title('Quantidade de Pedidos > R$ 150 por Método de Pagamento')
-        plt.xlabel('Método de Pagamento')
-        plt.ylabel('Quantidade de Pedidos')
-        plt.xticks(rotation=45)
-        
-        # Adicionar valores nas barras
-        for bar in bars1:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height + 1,
-                    f'{int(height)}', ha='center', va='bottom')
-        
-        # Gráfico de pizza - Percentual
-        plt.subplot(1, 2, 2)
-        plt.pie(payment_stats['percentual'], labels=payment_stats.index, 
-                autopct='%1.1f%%', startangle=90)
-        plt.title('Distribuição Percentual por Método de Pagamento')
-        
-        plt.tight_layout()
-        plt.savefig('pergunta_2_metodos_pagamento.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        # Criar visualização (conforme a política de renderização)
+        self._renderizar('pergunta_2', {'payment_stats': payment_stats})
         
         return self.results['pergunta_2']
     
-    def pergunta_3_top_categorias(self):
+    @instrumentar()
+    @_com_cache
+    def pergunta_3_top_categorias(self, n=5):
         """
         Pergunta 3: Quais são as 5 categorias de produtos mais vendidas e qual a receita total gerada por cada uma?
+        
+        Parameters:
+        n (int): Quantidade de categorias do ranking
         """
         print("\n" + "="*70)
-        print("PERGUNTA 3: Top 5 categorias de produtos mais vendidas e receita")
+        print(f"PERGUNTA 3: Top {n} categorias de produtos mais vendidas e receita")
         print("="*70)
         
-        order_items = self.datasets['order_items'].copy()
-        products = self.datasets['products'].copy()
+        # Quantidade e receita pré-agregadas por código de categoria
+        ranking = self.indice_categorias()
         
-        # Merge dos dados
-        items_products = order_items.merge(products, on='product_id', how='left')
+        with self.instrumentacao.etapa('pergunta_3.top', linhas_entrada=len(ranking.categorias)) as etapa:
+            top_5_categories = ranking.top(n)
+            etapa['linhas_saida'] = len(top_5_categories)
         
-        # Remover linhas onde category é nulo
-        items_products = items_products.dropna(subset=['product_category_name'])
-        
-        if len(items_products) == 0:
+        if len(top_5_categories) == 0:
             print("Não há dados de produtos com categorias para análise.")
             return
         
-        # Agrupar por categoria
-        category_stats = items_products.groupby('product_category_name').agg({
-            'order_id': 'count',  # Quantidade vendida
-            'price': 'sum'        # Receita total
-        }).round(2)
-        
-        category_stats.columns = ['quantidade_vendida', 'receita_total']
-        category_stats = category_stats.sort_values('quantidade_vendida', ascending=False)
-        
-        # Top 5 categorias
-        top_5_categories = category_stats.head(5)
-        
-        # Traduzir nomes se disponível
-        if 'category_translation' in self.datasets:
-            translation = self.datasets['category_translation'].set_index('product_category_name')
-            top_5_categories_translated = top_5_categories.copy()
-            
-            for idx in top_5_categories.index:
-                if idx in translation.index:
-                    new_name = translation.loc[idx, 'product_category_name_english']
-                    top_5_categories_translated = top_5_categories_translated.rename(index={idx: new_name})
-        else:
-            top_5_categories_translated = top_5_categories
+        # Nomes em inglês das mesmas categorias (vetor alinhado aos códigos)
+        traducao = dict(zip(ranking.categorias, ranking.traducao))
         
-        # Salvar resultados
+        # Salvar resultados ('top_5_categories' mantém o nome para qualquer n)
         self.results['pergunta_3'] = {
             'top_5_categories': top_5_categories,
             'total_receita_top_5': top_5_categories['receita_total'].sum(),
@@ -281,92 +964,90 @@ class OlistAnalysis:
         }
         
         # Apresentar resultados
-        print("Top 5 categorias de produtos mais vendidas:")
+        print(f"Top {n} categorias de produtos mais vendidas:")
         print("-" * 50)
         for i, (categoria, dados) in enumerate(top_5_categories.iterrows(), 1):
-            print(f"{i}. {categoria}")
+            nome_en = traducao.get(categoria, categoria)
+            print(f"{i}. {categoria}" + (f" ({nome_en})" if nome_en != categoria else ""))
             print(f"   Quantidade vendida: {dados['quantidade_vendida']:,}")
             print(f"   Receita total: R$ {dados['receita_total']:,.2f}")
             print()
         
-        # Criar visualização
-        plt.figure(figsize=(14, 10))
-        
-        # Gráfico de barras - Quantidade vendida
-        plt.subplot(2, 2, 1)
-        bars1 = plt.bar(range(5), top_5_categories['quantidade_vendida'], 
-                       color='lightcoral', edgecolor='black')
-        plt.title('Top 5 Categorias - Quantidade Vendida')
-        plt.xlabel('Categoria')
-        plt.ylabel('Quantidade Vendida')
-        plt.xticks(range(5), [cat[:15] + '...' if len(cat) > 15 else cat 
-                             for cat in top_5_categories.index], rotation=45)
-        
-        # Adicionar valores nas barras
-        for i, bar in enumerate(bars1):
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height + height*0.01,
-                    f'{int(height):,}', ha='center', va='bottom', fontsize=8)
-        
-        # Gráfico de barras - Receita total
-        plt.subplot(2, 2, 2)
-        bars2 = plt.bar(range(5), top_5_categories['receita_total'], 
-                       color='lightgreen', edgecolor='black')
-        plt.title('Top 5 Categorias - Receita Total')
-        plt.xlabel('Categoria')
-        plt.ylabel('Receita Total (R$)')
-        plt.xticks(range(5), [cat[:15] + '...' if len(cat) > 15 else cat 
-                             for cat in top_5_categories.index], rotation=45)
-        
-        # Adicionar valores nas barras
-        for i, bar in enumerate(bars2):
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height + height*0.01,
-                    f'R${height/1000:.0f}k', ha='center', va='bottom', fontsize=8)
-        
-        # Gráfico de pizza - Quantidade
-        plt.subplot(2, 2, 3)
-        plt.pie(top_5_categories['quantidade_vendida'], 
-                labels=[cat[:20] + '...' if len(cat) > 20 else cat 
-                       for cat in top_5_categories.index],
-                autopct='%1.1f%%', startangle=90)
-        plt.title('Distribuição de Vendas por Categoria')
-        
-        # Gráfico de pizza - Receita
-        plt.subplot(2, 2, 4)
-        plt.pie(top_5_categories['receita_total'], 
-                labels=[cat[:20] + '...' if len(cat) > 20 else cat 
-                       for cat in top_5_categories.index],
-                autopct='%1.1f%%', startangle=90)
-        plt.title('Distribuição de Receita por Categoria')
-        
-        plt.tight_layout()
-        plt.savefig('pergunta_3_top_categorias.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        # Criar visualização (conforme a política de renderização)
+        self._renderizar('pergunta_3', {'top_5_categories': top_5_categories})
         
         return self.results['pergunta_3']
     
-    def pergunta_4_tempo_entrega_avaliacao(self):
+    @instrumentar()
+    @_com_cache
+    def ranking_categorias(self, n=10, por='mes', traduzir=True):
+        """
+        Ranking das categorias mais vendidas por mês da compra ou por estado do cliente
+        
+        Parameters:
+        n (int): Categorias por grupo
+        por (str): 'mes', 'estado' ou None (ranking geral)
+        traduzir (bool): Nomes das categorias em inglês
+        """
+        print("\n" + "="*70)
+        print(f"RANKING: Top {n} categorias" + (f" por {por}" if por else ""))
+        print("="*70)
+        
+        with self.instrumentacao.etapa('ranking_categorias.top') as etapa:
+            ranking = self.indice_categorias().top(n, por=por, traduzir=traduzir)
+            etapa['linhas_saida'] = len(ranking)
+        
+        if len(ranking) == 0:
+            print("Não há dados de produtos com categorias para análise.")
+            return
+        
+        self.results['ranking_categorias'] = {
+            'por': por,
+            'n': n,
+            'ranking': ranking,
+        }
+        
+        # Apresentar resultados: a categoria líder de cada grupo
+        if por is None:
+            print(ranking)
+        else:
+            lideres = ranking.xs(1, level='posicao')
+            print(f"Categoria líder em cada {por} ({len(lideres)} grupos):")
+            print(lideres.to_string())
+        
+        return self.results['ranking_categorias']
+    
+    @instrumentar()
+    @_com_cache
+    def pergunta_4_tempo_entrega_avaliacao(self, aproximado=False, erro_quantis=0.01,
+                                           tamanho_amostra=LIMITE_PONTOS_SCATTER):
         """
         Pergunta 4: Qual é a relação entre o tempo de entrega e a nota de avaliação do cliente?
+        
+        Parameters:
+        aproximado (bool): Usar esboços combináveis (esbocos.EsbocoTempoAvaliacao):
+            medianas aproximadas e gráficos a partir de uma amostra; média, desvio
+            e correlação continuam exatos
+        erro_quantis (float): Erro de posição tolerado nas medianas do modo aproximado
+        tamanho_amostra (int): Pares (dias, nota) amostrados para os gráficos do modo aproximado
         """
         print("\n" + "="*70)
         print("PERGUNTA 4: Relação entre tempo de entrega e avaliação do cliente")
         print("="*70)
         
-        orders = self.datasets['orders'].copy()
-        reviews = self.datasets['order_reviews'].copy()
-        
-        # Merge entre pedidos e avaliações
-        orders_reviews = orders.merge(reviews, on='order_id', how='inner')
+        # Pedidos já unidos às avaliações na tabela fato
+        orders_reviews = self.fato_pedidos()
         
-        # Filtrar apenas pedidos entregues com datas válidas
-        delivered_reviews = orders_reviews[
-            (orders_reviews['order_status'] == 'delivered') &
-            (orders_reviews['order_delivered_customer_date'].notna()) &
-            (orders_reviews['order_purchase_timestamp'].notna()) &
-            (orders_reviews['review_score'].notna())
-        ].copy()
+        # Filtrar apenas pedidos entregues e avaliados, com datas válidas
+        with self.instrumentacao.etapa('pergunta_4.filtro', linhas_entrada=len(orders_reviews)) as etapa:
+            delivered_reviews = orders_reviews[
+                (orders_reviews['order_status'] == 'delivered') &
+                (orders_reviews['order_delivered_customer_date'].notna()) &
+                (orders_reviews['order_purchase_timestamp'].notna()) &
+                (orders_reviews['review_score'].notna())
+            ].copy()
+            delivered_reviews['review_score'] = delivered_reviews['review_score'].astype('int8')
+            etapa['linhas_saida'] = len(delivered_reviews)
         
         if len(delivered_reviews) == 0:
             print("Não há dados suficientes para análise de tempo de entrega vs avaliação.")
@@ -388,28 +1069,57 @@ class OlistAnalysis:
             print("Não há dados válidos após remoção de outliers.")
             return
         
-        # Calcular estatísticas por nota de avaliação
-        stats_by_score = delivered_reviews.groupby('review_score')['tempo_entrega_dias'].agg([
-            'count', 'mean', 'median', 'std'
-        ]).round(2)
-        
-        # Calcular correlação
-        correlation = delivered_reviews['tempo_entrega_dias'].corr(delivered_reviews['review_score'])
-        
-        # Salvar resultados
-        self.results['pergunta_4'] = {
-            'total_avaliacoes': len(delivered_reviews),
-            'correlacao': correlation,
-            'stats_by_score': stats_by_score,
-            'tempo_medio_geral': delivered_reviews['tempo_entrega_dias'].mean()
-        }
+        if aproximado:
+            from esbocos import EsbocoTempoAvaliacao
+            
+            # Esboços de memória limitada, alimentados em blocos
+            with self.instrumentacao.etapa('pergunta_4.esbocos', linhas_entrada=len(delivered_reviews)):
+                esboco = EsbocoTempoAvaliacao(erro=erro_quantis, tamanho_amostra=tamanho_amostra)
+                for inicio in range(0, len(delivered_reviews), TAMANHO_BLOCO_ESBOCO):
+                    esboco.atualizar(delivered_reviews.iloc[inicio:inicio + TAMANHO_BLOCO_ESBOCO])
+                self.results['pergunta_4'] = esboco.resultado()
+            stats_by_score = self.results['pergunta_4']['stats_by_score']
+            correlation = self.results['pergunta_4']['correlacao']
+            dados_grafico = {
+                'delivered_reviews': esboco.dados_amostra(),
+                'correlacao': correlation,
+                'boxplot': esboco.estatisticas_boxplot(),
+                'media_por_nota': stats_by_score['mean'],
+            }
+        else:
+            # Calcular estatísticas por nota de avaliação
+            with self.instrumentacao.etapa('pergunta_4.groupby', linhas_entrada=len(delivered_reviews)) as etapa:
+                stats_by_score = delivered_reviews.groupby('review_score')['tempo_entrega_dias'].agg([
+                    'count', 'mean', 'median', 'std'
+                ]).round(2)
+                etapa['linhas_saida'] = len(stats_by_score)
+            
+            # Calcular correlação
+            with self.instrumentacao.etapa('pergunta_4.correlacao', linhas_entrada=len(delivered_reviews)):
+                correlation = delivered_reviews['tempo_entrega_dias'].corr(delivered_reviews['review_score'])
+            
+            # Salvar resultados
+            self.results['pergunta_4'] = {
+                'total_avaliacoes': len(delivered_reviews),
+                'correlacao': correlation,
+                'stats_by_score': stats_by_score,
+                'tempo_medio_geral': delivered_reviews['tempo_entrega_dias'].mean()
+            }
+            dados_grafico = {
+                'delivered_reviews': delivered_reviews[['tempo_entrega_dias', 'review_score']],
+                'correlacao': correlation
+            }
         
         # Apresentar resultados
-        print(f"Total de avaliações analisadas: {len(delivered_reviews):,}")
+        print(f"Total de avaliações analisadas: {self.results['pergunta_4']['total_avaliacoes']:,}")
         print(f"Correlação entre tempo de entrega e nota: {correlation:.3f}")
-        print(f"Tempo médio de entrega: {delivered_reviews['tempo_entrega_dias'].mean():.1f} dias")
+        print(f"Tempo médio de entrega: {self.results['pergunta_4']['tempo_medio_geral']:.1f} dias")
         print(f"\nEstatísticas por nota de avaliação:")
         print(stats_by_score)
+        if aproximado:
+            print(f"\nMedianas aproximadas (erro de posição de até "
+                  f"{self.results['pergunta_4']['erro_rank']:.2%}); faixa de valores possível:")
+            print(self.results['pergunta_4']['intervalo_mediana'])
         
         # Interpretação da correlação
         if correlation < -0.3:
@@ -423,73 +1133,248 @@ class OlistAnalysis:
         
         print(f"\nInterpretação: {interpretacao}")
         
-        # Criar visualização
-        plt.figure(figsize=(15, 10))
+        # Criar visualização (conforme a política de renderização)
+        self._renderizar('pergunta_4', dados_grafico)
         
-        # Scatter plot
-        plt.subplot(2, 3, 1)
-        plt.scatter(delivered_reviews['tempo_entrega_dias'], delivered_reviews['review_score'], 
-                   alpha=0.5, color='blue')
-        plt.xlabel('Tempo de Entrega (dias)')
-        plt.ylabel('Nota de Avaliação')
-        plt.title(f'Relação Tempo de Entrega vs Avaliação\n(Correlação: {correlation:.3f})')
-        plt.grid(True, alpha=0.3)
-        
-        # Boxplot por nota
-        plt.subplot(2, 3, 2)
-        box_data = [delivered_reviews[delivered_reviews['review_score'] == score]['tempo_entrega_dias'] 
-                   for score in sorted(delivered_reviews['review_score'].unique())]
-        plt.boxplot(box_data, labels=sorted(delivered_reviews['review_score'].unique()))
-        plt.xlabel('Nota de Avaliação')
-        plt.ylabel('Tempo de Entrega (dias)')
-        plt.title('Distribuição do Tempo de Entrega por Nota')
-        plt.grid(True, alpha=0.3)
-        
-        # Tempo médio por nota
-        plt.subplot(2, 3, 3)
-        avg_time_by_score = delivered_reviews.groupby('review_score')['tempo_entrega_dias'].mean()
-        bars = plt.bar(avg_time_by_score.index, avg_time_by_score.values, 
-                      color='lightblue', edgecolor='black')
-        plt.xlabel('Nota de Avaliação')
-        plt.ylabel('Tempo Médio de Entrega (dias)')
-        plt.title('Tempo Médio de Entrega por Nota')
-        plt.grid(True, alpha=0.3)
-        
-        # Adicionar valores nas barras
-        for bar, value in zip(bars, avg_time_by_score.values):
-            plt.text(bar.get_x() + bar.get_width()/2., bar.get_height() + 0.5,
-                    f'{value:.1f}', ha='center', va='bottom')
-        
-        # Histograma de tempo de entrega
-        plt.subplot(2, 3, 4)
-        plt.hist(delivered_reviews['tempo_entrega_dias'], bins=30, 
-                color='skyblue', alpha=0.7, edgecolor='black')
-        plt.xlabel('Tempo de Entrega (dias)')
-        plt.ylabel('Frequência')
-        plt.title('Distribuição do Tempo de Entrega')
-        plt.grid(True, alpha=0.3)
-        
-        # Histograma de notas
-        plt.subplot(2, 3, 5)
-        plt.hist(delivered_reviews['review_score'], bins=5, 
-                color='lightgreen', alpha=0.7, edgecolor='black')
-        plt.xlabel('Nota de Avaliação')
-        plt.ylabel('Frequência')
-        plt.title('Distribuição das Notas de Avaliação')
-        plt.grid(True, alpha=0.3)
-        
-        # Heatmap de correlação (se houver mais variáveis)
-        plt.subplot(2, 3, 6)
-        corr_data = delivered_reviews[['tempo_entrega_dias', 'review_score']].corr()
-        sns.heatmap(corr_data, annot=True, cmap='coolwarm', center=0,
-                   square=True, cbar_kws={'shrink': .8})
-        plt.title('Matriz de Correlação')
+        return self.results['pergunta_4']
+    
+    @instrumentar()
+    @_com_cache
+    def distancia_entregas(self, faixas_km=FAIXAS_DISTANCIA_KM):
+        """
+        Atraso (pergunta 1) e tempo de entrega/nota (pergunta 4) por faixa de
+        distância entre vendedor e cliente
         
-        plt.tight_layout()
-        plt.savefig('pergunta_4_tempo_entrega_avaliacao.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        Parameters:
+        faixas_km (tuple): Limites das faixas em km (intervalos [a, b))
+        """
+        print("\n" + "="*70)
+        print("DISTÂNCIA: Atraso e tempo de entrega por distância vendedor-cliente")
+        print("="*70)
         
-        return self.results['pergunta_4']
+        orders = self.datasets['orders']
+        distancia = self.distancia_pedidos()
+        
+        entregues = (
+            (orders['order_status'] == 'delivered') &
+            (orders['order_delivered_customer_date'].notna()) &
+            distancia.notna()
+        )
+        if not entregues.any():
+            print("Não há pedidos entregues com distância conhecida.")
+            return
+        
+        rotulos = [f"{a:.0f}-{b:.0f} km" if np.isfinite(b) else f"> {a:.0f} km"
+                   for a, b in zip(faixas_km[:-1], faixas_km[1:])]
+        pedidos = orders.loc[entregues, ['order_id']].copy()
+        pedidos['distancia_km'] = distancia[entregues]
+        pedidos['faixa'] = pd.cut(pedidos['distancia_km'], list(faixas_km), right=False, labels=rotulos)
+        
+        # Atraso em relação à estimativa (pergunta 1), por faixa
+        com_estimativa = orders.loc[entregues, 'order_estimated_delivery_date'].notna().to_numpy()
+        atraso_dias = (orders.loc[entregues, 'order_delivered_customer_date'] -
+                       orders.loc[entregues, 'order_estimated_delivery_date']).dt.days
+        atrasos = pd.DataFrame({'faixa': pedidos['faixa'], 'atraso_dias': atraso_dias})[com_estimativa]
+        atrasos['atrasado'] = classificar_entregas(atrasos['atraso_dias'].to_numpy())[0] == 0
+        atraso_por_faixa = atrasos.groupby('faixa', observed=True).agg(
+            total_entregas=('atrasado', 'size'),
+            percentual_atraso=('atrasado', 'mean'),
+            atraso_medio_dias=('atraso_dias', lambda dias: dias[dias > 0].mean())
+        )
+        atraso_por_faixa['percentual_atraso'] *= 100
+        
+        # Tempo de entrega e nota (pergunta 4), por faixa
+        pedidos['tempo_entrega_dias'] = (orders.loc[entregues, 'order_delivered_customer_date'] -
+                                         orders.loc[entregues, 'order_purchase_timestamp']).dt.days
+        pedidos = pedidos[(pedidos['tempo_entrega_dias'] >= 0) & (pedidos['tempo_entrega_dias'] <= 100)]
+        reviews = self.datasets['order_reviews'][['order_id', 'review_score']].dropna().copy()
+        pedidos['order_id'], reviews['order_id'] = self._chaves_categoricas(pedidos['order_id'], reviews['order_id'])
+        avaliados = pedidos.merge(reviews, on='order_id')
+        tempo_por_faixa = avaliados.groupby('faixa', observed=True).agg(
+            avaliacoes=('review_score', 'size'),
+            tempo_medio_dias=('tempo_entrega_dias', 'mean'),
+            tempo_mediano_dias=('tempo_entrega_dias', 'median'),
+            nota_media=('review_score', 'mean')
+        )
+        atraso_por_faixa, tempo_por_faixa = atraso_por_faixa.round(2), tempo_por_faixa.round(2)
+        
+        # Salvar resultados
+        self.results['distancia'] = {
+            'pedidos_com_distancia': int(distancia.notna().sum()),
+            'distancia_mediana_km': float(distancia.median()),
+            'correlacao_distancia_tempo': avaliados['distancia_km'].corr(avaliados['tempo_entrega_dias']),
+            'atraso_por_faixa': atraso_por_faixa,
+            'tempo_por_faixa': tempo_por_faixa,
+        }
+        
+        # Apresentar resultados
+        print(f"Distância mediana vendedor-cliente: {distancia.median():.0f} km")
+        print(f"Correlação entre distância e tempo de entrega: "
+              f"{self.results['distancia']['correlacao_distancia_tempo']:.3f}")
+        print(f"\nAtraso por faixa de distância:")
+        print(atraso_por_faixa)
+        print(f"\nTempo de entrega e nota por faixa de distância:")
+        print(tempo_por_faixa)
+        
+        # Criar visualização (conforme a política de renderização)
+        self._renderizar('distancia', {
+            'atraso_por_faixa': atraso_por_faixa,
+            'tempo_por_faixa': tempo_por_faixa
+        })
+        
+        return self.results['distancia']
+    
+    def _estado_dos_pedidos(self, orders):
+        """Estado do cliente de cada linha de orders, como Categorical (None sem customers)"""
+        if 'customers' not in self.datasets:
+            return None
+        customers = self.datasets['customers']
+        posicao = pd.Index(customers['customer_id']).get_indexer(orders['customer_id'])
+        estados = pd.Categorical(customers['customer_state'])
+        # Clientes desconhecidos ficam sem estado (código -1)
+        codigos = np.where(posicao >= 0, estados.codes[posicao], -1)
+        return pd.Categorical.from_codes(codigos, estados.categories)
+    
+    @instrumentar()
+    @_com_cache
+    def tendencias(self, freq='M', janela=1, deslizante=False, por_estado=True, limiar=150.0):
+        """
+        Perguntas 1, 2 e 4 como séries por período de compra (e estado do cliente)
+        
+        Parameters:
+        freq (str): Período de order_purchase_timestamp ('D', 'W', 'M', 'Q'...)
+        janela (int): Períodos por janela
+        deslizante (bool): Janelas deslizantes de `janela` períodos em vez de blocos
+        por_estado (bool): Dividir as séries por customer_state
+        limiar (float): Valor mínimo dos pagamentos da pergunta 2
+        """
+        from tendencias import tendencia_atrasos, tendencia_pagamentos, tendencia_avaliacoes
+        
+        print("\n" + "="*70)
+        print(f"TENDÊNCIAS: perguntas 1, 2 e 4 por período ({freq}, janela de {janela}"
+              f"{', deslizante' if deslizante else ''})")
+        print("="*70)
+        
+        janelas = {'freq': freq, 'janela': janela, 'deslizante': deslizante}
+        orders = self.datasets['orders']
+        estado_pedido = self._estado_dos_pedidos(orders)
+        if por_estado and estado_pedido is None:
+            raise ValueError("Tendências por estado requerem a tabela customers")
+        
+        # Pergunta 1: pedidos entregues com as duas datas
+        with self.instrumentacao.etapa('tendencias.atrasos', linhas_entrada=len(orders)) as etapa:
+            entregues = (
+                (orders['order_status'] == 'delivered') &
+                orders['order_delivered_customer_date'].notna() &
+                orders['order_estimated_delivery_date'].notna()
+            )
+            atraso_dias = (orders.loc[entregues, 'order_delivered_customer_date'] -
+                           orders.loc[entregues, 'order_estimated_delivery_date']).dt.days.to_numpy()
+            datas = orders.loc[entregues, 'order_purchase_timestamp']
+            atrasos = tendencia_atrasos(datas, atraso_dias, **janelas)
+            atrasos_estado = (tendencia_atrasos(datas, atraso_dias, estado_pedido[entregues.to_numpy()], **janelas)
+                              if por_estado else None)
+            etapa['linhas_saida'] = len(atrasos)
+        
+        # Pergunta 2: data e estado do pedido de cada pagamento
+        with self.instrumentacao.etapa('tendencias.pagamentos') as etapa:
+            payments = self.datasets['order_payments']
+            posicao = pd.Index(orders['order_id']).get_indexer(payments['order_id'])
+            encontrados = posicao >= 0
+            datas = pd.Series(orders['order_purchase_timestamp'].to_numpy()[posicao[encontrados]])
+            tipos = payments['payment_type'][encontrados].to_numpy()
+            valores = payments['payment_value'][encontrados].to_numpy()
+            pagamentos = tendencia_pagamentos(datas, tipos, valores, limiar=limiar, **janelas)
+            pagamentos_estado = (tendencia_pagamentos(datas, tipos, valores,
+                                                      estado_pedido[posicao[encontrados]],
+                                                      limiar=limiar, **janelas)
+                                 if por_estado else None)
+            etapa['linhas_saida'] = len(pagamentos)
+        
+        # Pergunta 4: mesmos filtros de pergunta_4_tempo_entrega_avaliacao
+        with self.instrumentacao.etapa('tendencias.avaliacoes') as etapa:
+            fato = self.fato_pedidos()
+            avaliados = fato[
+                (fato['order_status'] == 'delivered') &
+                fato['order_delivered_customer_date'].notna() &
+                fato['order_purchase_timestamp'].notna() &
+                fato['review_score'].notna()
+            ]
+            dias = (avaliados['order_delivered_customer_date'] - avaliados['order_purchase_timestamp']).dt.days
+            avaliados = avaliados[(dias >= 0) & (dias <= 100)]
+            dias = dias[avaliados.index]
+            avaliacoes = tendencia_avaliacoes(avaliados['order_purchase_timestamp'], dias.to_numpy(),
+                                              avaliados['review_score'].to_numpy(), **janelas)
+            avaliacoes_estado = (tendencia_avaliacoes(avaliados['order_purchase_timestamp'], dias.to_numpy(),
+                                                      avaliados['review_score'].to_numpy(),
+                                                      avaliados['customer_state'], **janelas)
+                                 if por_estado else None)
+            etapa['linhas_saida'] = len(avaliacoes)
+        
+        # Salvar resultados (tabelas longas: uma linha por período e grupo)
+        self.results['tendencias'] = {
+            'freq': freq,
+            'janela': janela,
+            'deslizante': deslizante,
+            'atrasos': atrasos,
+            'pagamentos': pagamentos,
+            'avaliacoes': avaliacoes,
+        }
+        if por_estado:
+            self.results['tendencias'].update({
+                'atrasos_por_estado': atrasos_estado,
+                'pagamentos_por_estado': pagamentos_estado,
+                'avaliacoes_por_estado': avaliacoes_estado,
+            })
+        
+        # Apresentar resultados
+        print("Entregas atrasadas por período:")
+        print(atrasos.set_index('periodo')[['total_entregas', 'percentual_atraso']].round(2).to_string())
+        print("\nMétodo de pagamento principal por período (% dos pagamentos acima do limiar):")
+        principal = pagamentos.loc[pagamentos.groupby('periodo', sort=False)['percentual'].idxmax()]
+        print(principal.set_index('periodo')[['payment_type', 'percentual']].round(2).to_string())
+        print("\nTempo de entrega e correlação com a nota por período:")
+        print(avaliacoes.set_index('periodo')[['avaliacoes', 'tempo_medio_dias', 'correlacao']]
+              .round(3).to_string())
+        if por_estado:
+            print(f"\nSéries por estado: {atrasos_estado['customer_state'].nunique()} estados, "
+                  f"{len(atrasos_estado):,} linhas (atrasos), {len(pagamentos_estado):,} (pagamentos), "
+                  f"{len(avaliacoes_estado):,} (avaliações)")
+        
+        # Criar visualização (conforme a política de renderização)
+        self._renderizar('tendencias', {
+            'atrasos': atrasos,
+            'pagamentos': pagamentos,
+            'avaliacoes': avaliacoes,
+        })
+        
+        return self.results['tendencias']
+    
+    def executar_perguntas_em_paralelo(self, perguntas=None, max_workers=None):
+        """
+        Executa as perguntas em processos separados e junta os resultados em self.results
+        
+        Parameters:
+        perguntas (list): Métodos a executar; por padrão as quatro perguntas (execucao_paralela.PERGUNTAS)
+        max_workers (int): Número de processos; por padrão um por pergunta
+        """
+        from execucao_paralela import executar_em_paralelo
+        
+        self.results.update(executar_em_paralelo(self.datasets, perguntas, max_workers))
+        return self.results
+    
+    def atualizar_incremental(self, diretorio_estado, diretorio_delta):
+        """
+        Incorpora um lote diário ao estado incremental e atualiza self.results
+        
+        Parameters:
+        diretorio_estado (str): Onde o estado agregado das perguntas é mantido
+        diretorio_delta (str): Diretório com os CSVs do lote (linhas novas ou alteradas)
+        """
+        from analise_incremental import atualizar
+        
+        self.results.update(atualizar(diretorio_estado, diretorio_delta))
+        return self.results
     
     def gerar_relatorio_completo(self):
         """Gerar relatório completo da análise"""
@@ -497,12 +1382,21 @@ class OlistAnalysis:
         print("RELATÓRIO COMPLETO - ANÁLISE DOS DADOS OLIST")
         print("="*70)
         
+        # Perguntas não executadas nesta sessão vêm do cache, se houver
+        self.carregar_do_cache()
+        
         # Resumo dos datasets
         print("\n1. RESUMO DOS DATASETS:")
         print("-" * 30)
-        for name, df in self.datasets.items():
+        for name in self._tabelas_carregadas():
+            df = self.datasets[name]
             print(f"{name}: {df.shape[0]:,} linhas, {df.shape[1]} colunas")
         
+        # Datas inválidas encontradas na conversão
+        for dataset_name, falhas in self.falhas_datas().items():
+            for col, quantidade in falhas.items():
+                print(f"  {dataset_name}.{col}: {quantidade:,} datas inválidas")
+        
         # Resumo das respostas
         print(f"\n2. RESUMO DAS RESPOSTAS:")
         print("-" * 30)
@@ -524,6 +1418,23 @@ class OlistAnalysis:
             result = self.results['pergunta_4']
             print(f"Pergunta 4: Correlação tempo-avaliação = {result['correlacao']:.3f}")
         
+        if 'ranking_categorias' in self.results and self.results['ranking_categorias']['por']:
+            result = self.results['ranking_categorias']
+            lideres = result['ranking'].xs(1, level='posicao')['product_category_name']
+            print(f"Ranking: {lideres.nunique()} categoria(s) diferentes lideram em "
+                  f"{len(lideres)} grupos por {result['por']}; mais frequente: {lideres.mode().iloc[0]}")
+        
+        if 'distancia' in self.results:
+            result = self.results['distancia']
+            print(f"Distância: mediana vendedor-cliente de {result['distancia_mediana_km']:.0f} km, "
+                  f"correlação distância-tempo = {result['correlacao_distancia_tempo']:.3f}")
+        
+        if 'tendencias' in self.results:
+            result = self.results['tendencias']
+            atrasos = result['atrasos']
+            print(f"Tendências: {len(atrasos)} períodos ({result['freq']}); atraso entre "
+                  f"{atrasos['percentual_atraso'].min():.1f}% e {atrasos['percentual_atraso'].max():.1f}%")
+        
         print(f"\n3. ARQUIVOS GERADOS:")
         print("-" * 20)
         print("- pergunta_1_entregas_atrasadas.png")
@@ -543,8 +1454,10 @@ def main():
     
     # Carregar dados
     try:
-        from data_loader import load_data
-        datasets = load_data()
+        from data_loader import load_data, ANALYSIS_COLUMNS, IdEncoder
+        from cache_resultados import CacheResultados
+        # IDs como códigos inteiros: menos memória e joins mais rápidos
+        datasets = load_data(analyses=list(ANALYSIS_COLUMNS), lazy=True, id_encoder=IdEncoder())
     except ImportError:
         print("Erro: não foi possível importar data_loader")
         return
@@ -553,8 +1466,11 @@ def main():
         print("Erro: não foi possível carregar os datasets")
         return
     
+    # Instrumentação ativada por OLIST_TRACE (ver instrumentacao.Instrumentacao.do_ambiente)
+    instrumentacao = Instrumentacao.do_ambiente()
+    
     # Criar instância da análise
-    analysis = OlistAnalysis(datasets)
+    analysis = OlistAnalysis(datasets, cache=CacheResultados(), instrumentacao=instrumentacao)
     
     # Executar todas as análises
     print("\nIniciando análise...")
@@ -564,6 +1480,8 @@ def main():
         analysis.pergunta_2_metodo_pagamento()
         analysis.pergunta_3_top_categorias()
         analysis.pergunta_4_tempo_entrega_avaliacao()
+        analysis.distancia_entregas()
+        analysis.tendencias()
         
         # Gerar relatório final
         analysis.gerar_relatorio_completo()
@@ -571,6 +1489,13 @@ def main():
         print(f"\nAnálise concluída com sucesso!")
         print("Verifique os gráficos gerados em formato PNG.")
         
+        if instrumentacao.ativo:
+            import os
+            from instrumentacao import VARIAVEL_TRACE
+            print("\nTempo por etapa:")
+            print(instrumentacao.resumo())
+            print(f"Trace gravado em {instrumentacao.salvar(os.environ[VARIAVEL_TRACE])}")
+        
     except Exception as e:
         print(f"Erro durante a análise: {e}")
         import traceback
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Execução em chunks das 4 perguntas do Olist
+
+Lê cada CSV em blocos de tamanho limitado e mantém apenas agregados parciais
+combináveis, de modo que o pico de memória não depende do tamanho da entrada.
+Os resultados têm a mesma estrutura de OlistAnalysis.results.
+"""
+
+import glob
+import math
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DATA_DIR, ANALYSIS_COLUMNS, iter_table_chunks, read_table, table_sources
+
+# Faixa de tempo de entrega considerada na pergunta 4 (mesma de OlistAnalysis)
+TEMPO_ENTREGA_MAX_DIAS = 100
+
+# Tamanho médio aproximado de uma linha de pedido no CSV, usado para escolher
+# o número de partições do join da pergunta 4
+BYTES_POR_LINHA_PEDIDO = 200
+
+
+class AgregadoEntregas:
+    """Pergunta 1: contagem por status de entrega e soma dos atrasos"""
+
+    def __init__(self):
+        # Ordem: atrasado, no prazo, antecipado
+        self.contagens = np.zeros(3, dtype=np.int64)
+        self.soma_atraso = 0
+
+    def atualizar(self, orders):
+        if len(orders) == 0:
+            return self
+        entregues = orders[
+            (orders['order_status'] == 'delivered') &
+            (orders['order_delivered_customer_date'].notna()) &
+            (orders['order_estimated_delivery_date'].notna())
+        ]
+        atraso = (entregues['order_delivered_customer_date'] -
+                  entregues['order_estimated_delivery_date']).dt.days.to_numpy()
+        self.contagens += [(atraso > 0).sum(), (atraso == 0).sum(), (atraso < 0).sum()]
+        self.soma_atraso += int(atraso[atraso > 0].sum())
+        return self
+
+    def combinar(self, outro):
+        self.contagens += outro.contagens
+        self.soma_atraso += outro.soma_atraso
+        return self
+
+    def remover(self, outro):
+        self.contagens -= outro.contagens
+        self.soma_atraso -= outro.soma_atraso
+        return self
+
+    def para_dict(self):
+        return {'contagens': self.contagens.tolist(), 'soma_atraso': self.soma_atraso}
+
+    @classmethod
+    def de_dict(cls, estado):
+        agregado = cls()
+        agregado.contagens = np.array(estado['contagens'], dtype=np.int64)
+        agregado.soma_atraso = estado['soma_atraso']
+        return agregado
+
+    def resultado(self):
+        total = int(self.contagens.sum())
+        if total == 0:
+            return None
+        atrasadas, no_prazo, antecipadas = (int(c) for c in self.contagens)
+        return {
+            'total_entregas': total,
+            'entregas_atrasadas': atrasadas,
+            'percentual_atraso': (atrasadas / total) * 100,
+            'percentual_no_prazo': (no_prazo / total) * 100,
+            'percentual_antecipado': (antecipadas / total) * 100,
+            'atraso_medio_dias': self.soma_atraso / atrasadas if atrasadas else np.nan
+        }
+
+
+class AgregadoPagamentos:
+    """Pergunta 2: contagem e soma por payment_type acima do limiar"""
+
+    def __init__(self, limiar=150.0):
+        self.limiar = limiar
+        self.contagem = pd.Series(dtype='int64')
+        self.soma = pd.Series(dtype='float64')
+
+    def atualizar(self, payments):
+        if len(payments) == 0:
+            return self
+        acima = payments[payments['payment_value'] > self.limiar]
+        grupos = acima.groupby('payment_type', observed=True)['payment_value']
+        self.contagem = self.contagem.add(grupos.count(), fill_value=0).astype('int64')
+        self.soma = self.soma.add(grupos.sum(), fill_value=0)
+        return self
+
+    def combinar(self, outro):
+        self.contagem = self.contagem.add(outro.contagem, fill_value=0).astype('int64')
+        self.soma = self.soma.add(outro.soma, fill_value=0)
+        return self
+
+    def remover(self, outro):
+        self.contagem = self.contagem.sub(outro.contagem, fill_value=0).astype('int64')
+        self.soma = self.soma.sub(outro.soma, fill_value=0)
+        return self
+
+    def para_dict(self):
+        return {'limiar': self.limiar,
+                'contagem': {str(k): int(v) for k, v in self.contagem.items()},
+                'soma': {str(k): float(v) for k, v in self.soma.items()}}
+
+    @classmethod
+    def de_dict(cls, estado):
+        agregado = cls(estado['limiar'])
+        agregado.contagem = pd.Series(estado['contagem'], dtype='int64')
+        agregado.soma = pd.Series(estado['soma'], dtype='float64')
+        return agregado
+
+    def resultado(self):
+        if self.contagem.sum() == 0:
+            return None
+        contagem = self.contagem[self.contagem > 0].sort_index()
+        soma = self.soma.reindex(contagem.index)
+        payment_stats = pd.DataFrame({
+            'quantidade_pedidos': contagem,
+            'valor_total': soma.round(2),
+            'valor_medio': (soma / contagem).round(2)
+        })
+        payment_stats.index.name = 'payment_type'
+        payment_stats['percentual'] = (payment_stats['quantidade_pedidos'] / payment_stats['quantidade_pedidos'].sum()) * 100
+        payment_stats = payment_stats.sort_values('quantidade_pedidos', ascending=False)
+        return {
+            'total_pedidos_acima_150': int(contagem.sum()),
+            'metodo_mais_usado': payment_stats.index[0],
+            'percentual_metodo_principal': payment_stats.iloc[0]['percentual'],
+            'payment_stats': payment_stats
+        }
+
+
+class AgregadoCategorias:
+    """Pergunta 3: quantidade vendida e receita por categoria"""
+
+    def __init__(self, products=None, top_n=5):
+        # Tabela de dimensão: cresce com o catálogo, não com o histórico de pedidos.
+        # Sem products, os itens precisam trazer product_category_name.
+        self.categoria_por_produto = (
+            products.set_index('product_id')['product_category_name'] if products is not None else None
+        )
+        self.top_n = top_n
+        self.quantidade = pd.Series(dtype='int64')
+        self.receita = pd.Series(dtype='float64')
+
+    def atualizar(self, order_items):
+        if len(order_items) == 0:
+            return self
+        if 'product_category_name' in order_items.columns:
+            categorias = order_items['product_category_name']
+        else:
+            categorias = order_items['product_id'].map(self.categoria_por_produto)
+        validos = categorias.notna() & order_items['order_id'].notna()
+        grupos = order_items.loc[validos, 'price'].groupby(categorias[validos].astype(str))
+        self.quantidade = self.quantidade.add(grupos.size(), fill_value=0).astype('int64')
+        self.receita = self.receita.add(grupos.sum(), fill_value=0)
+        return self
+
+    def combinar(self, outro):
+        self.quantidade = self.quantidade.add(outro.quantidade, fill_value=0).astype('int64')
+        self.receita = self.receita.add(outro.receita, fill_value=0)
+        return self
+
+    def remover(self, outro):
+        self.quantidade = self.quantidade.sub(outro.quantidade, fill_value=0).astype('int64')
+        self.receita = self.receita.sub(outro.receita, fill_value=0)
+        return self
+
+    def para_dict(self):
+        return {'top_n': self.top_n,
+                'quantidade': {str(k): int(v) for k, v in self.quantidade.items()},
+                'receita': {str(k): float(v) for k, v in self.receita.items()}}
+
+    @classmethod
+    def de_dict(cls, estado):
+        agregado = cls(top_n=estado['top_n'])
+        agregado.quantidade = pd.Series(estado['quantidade'], dtype='int64')
+        agregado.receita = pd.Series(estado['receita'], dtype='float64')
+        return agregado
+
+    def resultado(self):
+        if self.quantidade.sum() == 0:
+            return None
+        quantidade = self.quantidade[self.quantidade > 0]
+        category_stats = pd.DataFrame({
+            'quantidade_vendida': quantidade,
+            'receita_total': self.receita.reindex(quantidade.index).round(2)
+        }).sort_index()
+        category_stats.index.name = 'product_category_name'
+        category_stats = category_stats.sort_values('quantidade_vendida', ascending=False)
+        top_categories = category_stats.head(self.top_n)
+        return {
+            'top_5_categories': top_categories,
+            'total_receita_top_5': top_categories['receita_total'].sum(),
+            'total_vendas_top_5': top_categories['quantidade_vendida'].sum()
+        }
+
+
+class AgregadoTempoAvaliacao:
+    """Pergunta 4: momentos por nota e co-momentos para a correlação
+
+    O tempo de entrega é um número inteiro de dias em [0, 100], então um
+    histograma por nota permite também a mediana exata.
+    """
+
+    def __init__(self):
+        self.histograma = {}
+        # n, soma_x, soma_y, soma_xx, soma_yy, soma_xy (x = dias, y = nota)
+        self.co_momentos = np.zeros(6, dtype=np.int64)
+
+    def atualizar(self, delivered_reviews):
+        if len(delivered_reviews) == 0:
+            return self
+        dias = delivered_reviews['tempo_entrega_dias'].to_numpy(dtype=np.int64)
+        notas = delivered_reviews['review_score'].to_numpy(dtype=np.int64)
+        for nota in np.unique(notas):
+            contagem = np.bincount(dias[notas == nota], minlength=TEMPO_ENTREGA_MAX_DIAS + 1)
+            if nota in self.histograma:
+                self.histograma[nota] += contagem
+            else:
+                self.histograma[nota] = contagem
+        self.co_momentos += [len(dias), dias.sum(), notas.sum(), (dias * dias).sum(),
+                             (notas * notas).sum(), (dias * notas).sum()]
+        return self
+
+    def combinar(self, outro):
+        for nota, contagem in outro.histograma.items():
+            if nota in self.histograma:
+                self.histograma[nota] = self.histograma[nota] + contagem
+            else:
+                self.histograma[nota] = contagem.copy()
+        self.co_momentos += outro.co_momentos
+        return self
+
+    def remover(self, outro):
+        for nota, contagem in outro.histograma.items():
+            self.histograma[nota] = self.histograma[nota] - contagem
+        self.co_momentos -= outro.co_momentos
+        return self
+
+    def para_dict(self):
+        return {'histograma': {str(nota): contagem.tolist() for nota, contagem in self.histograma.items()},
+                'co_momentos': self.co_momentos.tolist()}
+
+    @classmethod
+    def de_dict(cls, estado):
+        agregado = cls()
+        agregado.histograma = {int(nota): np.array(contagem, dtype=np.int64)
+                               for nota, contagem in estado['histograma'].items()}
+        agregado.co_momentos = np.array(estado['co_momentos'], dtype=np.int64)
+        return agregado
+
+    @staticmethod
+    def _mediana(contagem):
+        n = contagem.sum()
+        acumulado = np.cumsum(contagem)
+        inferior = np.searchsorted(acumulado, (n - 1) // 2 + 1)
+        superior = np.searchsorted(acumulado, n // 2 + 1)
+        return (inferior + superior) / 2
+
+    def resultado(self):
+        n, sx, sy, sxx, syy, sxy = (int(v) for v in self.co_momentos)
+        if n == 0:
+            return None
+        dias = np.arange(TEMPO_ENTREGA_MAX_DIAS + 1)
+        linhas = {}
+        for nota in sorted(self.histograma):
+            contagem = self.histograma[nota]
+            k = int(contagem.sum())
+            if k == 0:
+                continue
+            soma = int((contagem * dias).sum())
+            soma_quadrados = int((contagem * dias * dias).sum())
+            std = math.sqrt((soma_quadrados - soma * soma / k) / (k - 1)) if k > 1 else np.nan
+            linhas[nota] = {'count': k, 'mean': soma / k, 'median': self._mediana(contagem), 'std': std}
+        stats_by_score = pd.DataFrame.from_dict(linhas, orient='index').round(2)
+        stats_by_score.index.name = 'review_score'
+        denominador = math.sqrt((n * sxx - sx * sx) * (n * syy - sy * sy))
+        return {
+            'total_avaliacoes': n,
+            'correlacao': (n * sxy - sx * sy) / denominador if denominador else np.nan,
+            'stats_by_score': stats_by_score,
+            'tempo_medio_geral': sx / n
+        }
+
+
+def juntar_tempo_avaliacao(orders, reviews):
+    """Une pedidos entregues às avaliações e calcula tempo_entrega_dias (faixa da pergunta 4)"""
+    orders = orders[
+        (orders['order_status'] == 'delivered') &
+        orders['order_delivered_customer_date'].notna() &
+        orders['order_purchase_timestamp'].notna()
+    ]
+    reviews = reviews[reviews['review_score'].notna()]
+    if len(orders) == 0 or len(reviews) == 0:
+        return orders.iloc[0:0]
+    delivered_reviews = orders.merge(reviews, on='order_id', how='inner')
+    delivered_reviews['tempo_entrega_dias'] = (
+        delivered_reviews['order_delivered_customer_date'] -
+        delivered_reviews['order_purchase_timestamp']
+    ).dt.days
+    return delivered_reviews[
+        (delivered_reviews['tempo_entrega_dias'] >= 0) &
+        (delivered_reviews['tempo_entrega_dias'] <= TEMPO_ENTREGA_MAX_DIAS)
+    ]
+
+
+def _numero_de_particoes(data_dir, chunksize, partition_filter=None):
+    tamanho = sum(os.path.getsize(particao.path)
+                  for particao in table_sources('orders', data_dir, partition_filter))
+    return max(1, math.ceil(tamanho / (chunksize * BYTES_POR_LINHA_PEDIDO)))
+
+
+def _particionar(chunks, diretorio, prefixo, n_particoes):
+    """Grava cada chunk dividido por hash de order_id em n partições (grace hash join)"""
+    for i, chunk in enumerate(chunks):
+        particao = pd.util.hash_array(chunk['order_id'].to_numpy(dtype=object)) % n_particoes
+        for p, parte in chunk.groupby(particao):
+            parte.to_pickle(os.path.join(diretorio, f"{prefixo}_{p}_{i}.pkl"))
+
+
+def _ler_particao(diretorio, prefixo, p):
+    arquivos = sorted(glob.glob(os.path.join(diretorio, f"{prefixo}_{p}_*.pkl")))
+    if not arquivos:
+        return None
+    return pd.concat([pd.read_pickle(arquivo) for arquivo in arquivos], ignore_index=True)
+
+
+def _agregar_tempo_avaliacao(data_dir, chunksize, n_particoes=None, erro_quantis=None, partition_filter=None):
+    """Pergunta 4 com join particionado em disco entre orders e order_reviews"""
+    colunas = ANALYSIS_COLUMNS['pergunta_4_tempo_entrega_avaliacao']
+    n_particoes = n_particoes or _numero_de_particoes(data_dir, chunksize, partition_filter)
+    if erro_quantis is None:
+        agregado = AgregadoTempoAvaliacao()
+    else:
+        from esbocos import EsbocoTempoAvaliacao
+        agregado = EsbocoTempoAvaliacao(erro=erro_quantis)
+    diretorio = tempfile.mkdtemp(prefix='olist_join_')
+    try:
+        # Filtros aplicados antes de particionar, para gravar só o necessário
+        pedidos = (
+            c[(c['order_status'] == 'delivered') &
+              c['order_delivered_customer_date'].notna() &
+              c['order_purchase_timestamp'].notna()]
+            for c in iter_table_chunks('orders', data_dir, colunas['orders'], chunksize, partition_filter)
+        )
+        avaliacoes = (
+            c[c['review_score'].notna()]
+            for c in iter_table_chunks('order_reviews', data_dir, colunas['order_reviews'], chunksize,
+                                       partition_filter)
+        )
+        _particionar(pedidos, diretorio, 'orders', n_particoes)
+        _particionar(avaliacoes, diretorio, 'reviews', n_particoes)
+
+        for p in range(n_particoes):
+            orders = _ler_particao(diretorio, 'orders', p)
+            reviews = _ler_particao(diretorio, 'reviews', p)
+            if orders is None or reviews is None:
+                continue
+            agregado.atualizar(juntar_tempo_avaliacao(orders, reviews))
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+    return agregado
+
+
+def executar_em_chunks(data_dir=DATA_DIR, chunksize=100_000, perguntas=None, n_particoes=None,
+                       erro_quantis=None, partition_filter=None):
+    """
+    Executa as perguntas lendo os CSVs em blocos de `chunksize` linhas
+
+    Parameters:
+    data_dir (str): Diretório com os CSVs do Olist
+    chunksize (int): Número máximo de linhas por bloco
+    perguntas (list): Chaves de resultado a calcular ('pergunta_1' ... 'pergunta_4');
+        todas por padrão
+    n_particoes (int): Partições do join da pergunta 4; estimado pelo tamanho
+        do CSV de pedidos quando omitido
+    erro_quantis (float): Com um valor, a pergunta 4 usa esbocos.EsbocoTempoAvaliacao
+        (medianas aproximadas com esse erro de posição); por padrão, o
+        histograma exato de dias inteiros
+    partition_filter (dict): Poda de partições das tabelas particionadas
+        (ver data_loader.find_partitions)
+
+    Returns:
+    dict: Resultados no mesmo formato de OlistAnalysis.results
+    """
+    perguntas = perguntas or ['pergunta_1', 'pergunta_2', 'pergunta_3', 'pergunta_4']
+    colunas = {
+        'pergunta_1': ANALYSIS_COLUMNS['pergunta_1_entregas_atrasadas'],
+        'pergunta_2': ANALYSIS_COLUMNS['pergunta_2_metodo_pagamento'],
+        'pergunta_3': ANALYSIS_COLUMNS['pergunta_3_top_categorias'],
+    }
+    agregados = {}
+
+    if 'pergunta_1' in perguntas:
+        print("Processando pergunta 1 em chunks...")
+        agregados['pergunta_1'] = AgregadoEntregas()
+        for chunk in iter_table_chunks('orders', data_dir, colunas['pergunta_1']['orders'], chunksize,
+                                       partition_filter):
+            agregados['pergunta_1'].atualizar(chunk)
+
+    if 'pergunta_2' in perguntas:
+        print("Processando pergunta 2 em chunks...")
+        agregados['pergunta_2'] = AgregadoPagamentos()
+        for chunk in iter_table_chunks('order_payments', data_dir,
+                                       colunas['pergunta_2']['order_payments'], chunksize, partition_filter):
+            agregados['pergunta_2'].atualizar(chunk)
+
+    if 'pergunta_3' in perguntas:
+        print("Processando pergunta 3 em chunks...")
+        products = read_table('products', data_dir, columns=colunas['pergunta_3']['products'],
+                              use_cache=False, partition_filter=partition_filter)
+        agregados['pergunta_3'] = AgregadoCategorias(products)
+        for chunk in iter_table_chunks('order_items', data_dir,
+                                       colunas['pergunta_3']['order_items'], chunksize, partition_filter):
+            agregados['pergunta_3'].atualizar(chunk)
+
+    if 'pergunta_4' in perguntas:
+        print("Processando pergunta 4 em chunks...")
+        agregados['pergunta_4'] = _agregar_tempo_avaliacao(data_dir, chunksize, n_particoes, erro_quantis,
+                                                            partition_filter)
+
+    results = {}
+    for pergunta, agregado in agregados.items():
+        resultado = agregado.resultado()
+        if resultado is not None:
+            results[pergunta] = resultado
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    chunksize = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    results = executar_em_chunks(chunksize=chunksize)
+    for pergunta, resultado in results.items():
+        print(f"\n{pergunta}:")
+        for chave, valor in resultado.items():
+            print(f"  {chave}: {valor}")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark do tempo de inicialização de analise_olist
+
+Cada medição roda em um interpretador novo, como um worker de curta duração:
+o tempo de `import analise_olist`, o de calcular todas as perguntas com
+render='none' sobre um dataset sintético pequeno e os módulos de gráficos
+(matplotlib, seaborn) carregados ao final. Como referência, mede também a
+importação do pandas sozinho e a da pilha de gráficos.
+
+Uso:
+    python benchmarks/bench_importacao.py --repeticoes 5 --saida importacao.json
+    python benchmarks/bench_importacao.py --importtime   # módulos mais caros (python -X importtime)
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, RAIZ)
+
+from data_loader import create_sample_data  # noqa: E402
+
+# Executado em cada interpretador novo; imprime uma linha JSON com as medições
+SCRIPT_MEDICAO = """
+import json, sys, time
+inicio = time.perf_counter()
+{importacao}
+resultado = {{'importacao_s': time.perf_counter() - inicio}}
+if {calcular}:
+    import contextlib, io
+    from data_loader import load_data, ANALYSIS_COLUMNS
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        analise = analise_olist.OlistAnalysis(load_data(analyses=list(ANALYSIS_COLUMNS), data_dir={diretorio!r},
+                                                        use_cache=False), render='none')
+        for metodo in analise_olist.CHAVES_RESULTADO:
+            getattr(analise, metodo)()
+    resultado['resultados_s'] = time.perf_counter() - inicio
+resultado['modulos_graficos'] = sorted({{nome.split('.')[0] for nome in sys.modules}}
+                                       & {{'matplotlib', 'seaborn'}})
+print(json.dumps(resultado))
+"""
+
+# (nome, importação, calcular as perguntas)
+CASOS = [
+    ('pandas', 'import pandas', False),
+    ('pilha_graficos', 'import matplotlib.pyplot, seaborn', False),
+    ('analise_olist', 'import analise_olist', False),
+    ('analise_olist_resultados', 'import analise_olist', True),
+]
+
+
+def medir(importacao, calcular, diretorio):
+    """Medições de um interpretador novo"""
+    script = SCRIPT_MEDICAO.format(importacao=importacao, calcular=calcular, diretorio=diretorio)
+    saida = subprocess.check_output([sys.executable, '-c', script], cwd=RAIZ, text=True)
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def executar(repeticoes, n_pedidos, seed=42):
+    diretorio = tempfile.mkdtemp(prefix='olist_importacao_')
+    try:
+        create_sample_data(n_orders=n_pedidos, seed=seed, output_dir=diretorio)
+        casos = []
+        print(f"{'caso':<26} {'importação (s)':>15} {'resultados (s)':>15}  gráficos carregados")
+        for nome, importacao, calcular in CASOS:
+            medicoes = [medir(importacao, calcular, diretorio) for _ in range(repeticoes)]
+            caso = {
+                'caso': nome,
+                'importacao_s': statistics.median(m['importacao_s'] for m in medicoes),
+                'resultados_s': statistics.median(m['resultados_s'] for m in medicoes) if calcular else None,
+                'modulos_graficos': medicoes[-1]['modulos_graficos'],
+            }
+            casos.append(caso)
+            resultados = '-' if caso['resultados_s'] is None else f"{caso['resultados_s']:.3f}"
+            print(f"{nome:<26} {caso['importacao_s']:>15.3f} {resultados:>15}  "
+                  f"{', '.join(caso['modulos_graficos']) or 'nenhum'}")
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+    return {'python': sys.version.split()[0], 'repeticoes': repeticoes, 'pedidos': n_pedidos, 'casos': casos}
+
+
+def importtime(limite=15):
+    """Módulos com maior tempo cumulativo de importação em `import analise_olist`"""
+    saida = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import analise_olist'],
+                           cwd=RAIZ, capture_output=True, text=True, check=True).stderr
+    linhas = []
+    for linha in saida.splitlines()[1:]:
+        _, proprio, cumulativo, modulo = [parte.strip() for parte in linha.replace('|', ':', 2).split(':', 3)]
+        linhas.append((int(cumulativo), int(proprio), modulo))
+    print(f"{'cumulativo (ms)':>16} {'próprio (ms)':>13}  módulo")
+    for cumulativo, proprio, modulo in sorted(linhas, reverse=True)[:limite]:
+        print(f"{cumulativo / 1000:>16.1f} {proprio / 1000:>13.1f}  {modulo}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticoes', type=int, default=5, help='interpretadores novos por caso (mediana)')
+    parser.add_argument('--pedidos', type=int, default=1_000, help='pedidos do dataset sintético')
+    parser.add_argument('--saida', help='arquivo JSON de resultado')
+    parser.add_argument('--importtime', action='store_true',
+                        help='mostrar os módulos mais caros de importar, em vez das medições')
+    args = parser.parse_args()
+
+    if args.importtime:
+        importtime()
+        return
+
+    resultado = executar(args.repeticoes, args.pedidos)
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(resultado, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark da classificação de entregas da pergunta 1
+
+Compara a versão original (Series.apply com lambda + três filtros booleanos)
+com classificar_entregas, em 100 mil, 1 milhão e 10 milhões de pedidos.
+
+Uso: python benchmarks/bench_pergunta_1.py [n_pedidos ...]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from analise_olist import classificar_entregas  # noqa: E402
+
+TAMANHOS = [100_000, 1_000_000, 10_000_000]
+
+
+def gerar_atrasos(n, seed=42):
+    """Atrasos em dias com distribuição parecida com a do Olist (maioria antecipada)"""
+    rng = np.random.default_rng(seed)
+    return pd.Series(np.rint(rng.normal(-11, 10, n)).astype(np.int64), name='atraso_dias')
+
+
+def versao_original(atraso_dias):
+    df = atraso_dias.to_frame()
+    df['status_entrega'] = df['atraso_dias'].apply(
+        lambda x: 'Atrasado' if x > 0 else 'No Prazo' if x == 0 else 'Antecipado'
+    )
+    atrasadas = len(df[df['atraso_dias'] > 0])
+    no_prazo = len(df[df['atraso_dias'] == 0])
+    antecipadas = len(df[df['atraso_dias'] < 0])
+    atraso_medio = df[df['atraso_dias'] > 0]['atraso_dias'].mean()
+    return (atrasadas, no_prazo, antecipadas), atraso_medio
+
+
+def versao_vetorizada(atraso_dias):
+    _, contagens, atraso_medio = classificar_entregas(atraso_dias.to_numpy())
+    return tuple(int(c) for c in contagens), atraso_medio
+
+
+def medir(funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    tamanhos = [int(n) for n in sys.argv[1:]] or TAMANHOS
+    print(f"{'pedidos':>12} {'original (s)':>14} {'vetorizada (s)':>16} {'speedup':>9}")
+    for n in tamanhos:
+        atrasos = gerar_atrasos(n)
+        t_original, r_original = medir(versao_original, atrasos)
+        t_vetorizada, r_vetorizada = medir(versao_vetorizada, atrasos)
+        assert r_original[0] == r_vetorizada[0]
+        assert np.isclose(r_original[1], r_vetorizada[1])
+        print(f"{n:>12,} {t_original:>14.3f} {t_vetorizada:>16.3f} {t_original / t_vetorizada:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmark do pipeline Olist com dados sintéticos escaláveis
+
+Gera os CSVs de um dataset sintético com data_loader.create_sample_data em um
+diretório temporário e mede cada etapa separadamente: carga, conversão de
+datas, prepare_data, cada pergunta e a renderização de cada gráfico. Para
+cada etapa registra tempo de parede, tempo de CPU e pico de RSS, e grava
+tudo em JSON para comparar entre commits.
+
+Uso:
+    python benchmarks/bench_pipeline.py --pedidos 100000 --saida bench.json
+    python benchmarks/bench_pipeline.py --pedidos 100000 --comparar bench_base.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import matplotlib  # noqa: E402
+matplotlib.use('Agg')
+
+import pandas as pd  # noqa: E402
+
+import analise_olist  # noqa: E402
+from data_loader import (  # noqa: E402
+    TABLE_SCHEMAS, create_sample_data, load_data, parse_datetime_column
+)
+
+PERGUNTAS = [
+    ('pergunta_1', 'pergunta_1_entregas_atrasadas'),
+    ('pergunta_2', 'pergunta_2_metodo_pagamento'),
+    ('pergunta_3', 'pergunta_3_top_categorias'),
+    ('pergunta_4', 'pergunta_4_tempo_entrega_avaliacao'),
+]
+
+# Etapas mais lentas que a referência por mais que este fator são marcadas
+LIMIAR_REGRESSAO = 1.10
+
+
+def pico_rss_mb():
+    """Pico de RSS do processo até agora (ru_maxrss é KB no Linux, bytes no macOS; 0 no Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024 ** 2 if sys.platform == 'darwin' else pico / 1024
+
+
+class Medidor:
+    """Acumula as medições de cada etapa"""
+
+    def __init__(self):
+        self.etapas = []
+
+    @contextlib.contextmanager
+    def etapa(self, nome):
+        inicio, cpu_inicio = time.perf_counter(), time.process_time()
+        # A saída das perguntas não entra na medição
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+        self.etapas.append({
+            'etapa': nome,
+            'segundos': time.perf_counter() - inicio,
+            'cpu_segundos': time.process_time() - cpu_inicio,
+            'pico_rss_mb': pico_rss_mb(),
+        })
+        print(f"{nome:<28} {self.etapas[-1]['segundos']:>9.3f}s {self.etapas[-1]['pico_rss_mb']:>9.1f} MB")
+
+
+def commit_atual():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar(n_pedidos, seed=42):
+    medidor = Medidor()
+    diretorio = tempfile.mkdtemp(prefix='olist_bench_')
+    anterior = os.getcwd()
+    try:
+        # Gerado direto em CSV, em blocos, para não manter o dataset sintético em memória
+        with medidor.etapa('gerar_dados'):
+            create_sample_data(n_orders=n_pedidos, seed=seed, output_dir=diretorio)
+
+        with medidor.etapa('carga'):
+            datasets = load_data(data_dir=diretorio, use_cache=False)
+        linhas = {nome: len(df) for nome, df in datasets.items()}
+
+        # Conversão de datas isolada, a partir das colunas em texto
+        orders_texto = pd.read_csv(os.path.join(diretorio, TABLE_SCHEMAS['orders']['file']),
+                                   usecols=TABLE_SCHEMAS['orders']['dates'], dtype=str)
+        with medidor.etapa('parse_datas'):
+            for coluna in orders_texto.columns:
+                parse_datetime_column(orders_texto[coluna])
+        del orders_texto
+
+        with medidor.etapa('prepare_data'):
+            analysis = analise_olist.OlistAnalysis(datasets, render='deferred')
+
+        for chave, metodo in PERGUNTAS:
+            with medidor.etapa(chave):
+                getattr(analysis, metodo)()
+
+        analise_olist.setup_matplotlib()
+        os.chdir(diretorio)
+        for pergunta, dados_grafico in analysis.graficos_pendentes:
+            with medidor.etapa(f'render_{pergunta}'):
+                analise_olist.desenhar_grafico(pergunta, dados_grafico, render='deferred')
+    finally:
+        os.chdir(anterior)
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    return {
+        'commit': commit_atual(),
+        'executado_em': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'n_pedidos': n_pedidos,
+        'seed': seed,
+        'linhas': linhas,
+        'etapas': medidor.etapas,
+    }
+
+
+def comparar(atual, referencia, limiar=LIMIAR_REGRESSAO):
+    """Imprime a razão atual/referência por etapa e devolve as etapas que regrediram"""
+    base = {e['etapa']: e for e in referencia['etapas']}
+    regressoes = []
+    print(f"\nComparação com {referencia.get('commit')} ({referencia['n_pedidos']:,} pedidos):")
+    for etapa in atual['etapas']:
+        anterior = base.get(etapa['etapa'])
+        if not anterior or anterior['segundos'] == 0:
+            continue
+        razao = etapa['segundos'] / anterior['segundos']
+        marca = '  <-- regressão' if razao > limiar else ''
+        print(f"{etapa['etapa']:<28} {razao:>6.2f}x{marca}")
+        if marca:
+            regressoes.append(etapa['etapa'])
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pedidos', type=int, default=10_000, help='número de pedidos sintéticos')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--saida', help='arquivo JSON de resultado')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior para comparação')
+    parser.add_argument('--limiar', type=float, default=LIMIAR_REGRESSAO,
+                        help='razão de tempo acima da qual uma etapa conta como regressão')
+    args = parser.parse_args()
+
+    resultado = executar(args.pedidos, args.seed)
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(resultado, f, indent=2)
+    else:
+        print(json.dumps(resultado, indent=2))
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            regressoes = comparar(resultado, json.load(f), args.limiar)
+        sys.exit(1 if regressoes else 0)
+
+
+if __name__ == "__main__":
+    main()
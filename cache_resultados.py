@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Cache persistente dos resultados das perguntas do Olist
+
+Cada entrada é identificada pela pergunta, seus parâmetros e a impressão
+digital das tabelas de entrada. Os resultados ficam em disco (pickle), com
+limite de tamanho e remoção das entradas usadas há mais tempo (LRU).
+"""
+
+import glob
+import hashlib
+import json
+import os
+import pickle
+
+import pandas as pd
+
+# Incrementar quando o formato dos resultados (ou das chaves) mudar, para ignorar entradas antigas
+VERSAO_CACHE = 2
+
+DIRETORIO_CACHE = os.path.join('.cache', 'resultados')
+TAMANHO_MAXIMO = 256 * 1024 ** 2
+
+
+def impressao_dataframe(df):
+    """Impressão digital do conteúdo de um DataFrame (colunas, dtypes e valores)"""
+    valores = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    digest = hashlib.blake2b(valores.tobytes(), digest_size=16)
+    digest.update(json.dumps([list(map(str, df.columns)), list(map(str, df.dtypes))]).encode())
+    return digest.hexdigest()
+
+
+class CacheResultados:
+    """Cache em disco com limite de tamanho e remoção LRU"""
+
+    def __init__(self, diretorio=DIRETORIO_CACHE, tamanho_maximo=TAMANHO_MAXIMO):
+        self.diretorio = diretorio
+        self.tamanho_maximo = tamanho_maximo
+        os.makedirs(diretorio, exist_ok=True)
+
+    @staticmethod
+    def chave(pergunta, impressoes, parametros=None):
+        """Chave da entrada: pergunta + impressões das tabelas + parâmetros"""
+        conteudo = json.dumps({
+            'versao': VERSAO_CACHE,
+            'pergunta': pergunta,
+            'impressoes': impressoes,
+            'parametros': parametros or {},
+        }, sort_keys=True, default=str)
+        return f"{pergunta}-{hashlib.blake2b(conteudo.encode(), digest_size=16).hexdigest()}"
+
+    def _caminho(self, chave, sufixo='resultado'):
+        return os.path.join(self.diretorio, f"{chave}.{sufixo}.pkl")
+
+    def _ler(self, caminho):
+        try:
+            with open(caminho, 'rb') as f:
+                valor = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        # O mtime marca o último uso (base da remoção LRU)
+        os.utime(caminho)
+        return valor
+
+    def obter(self, chave):
+        """Resultado guardado para a chave, ou None"""
+        return self._ler(self._caminho(chave))
+
+    def obter_grafico(self, chave):
+        """Dados do gráfico guardados para a chave, ou None"""
+        return self._ler(self._caminho(chave, 'grafico'))
+
+    def guardar(self, chave, resultado, dados_grafico=None):
+        """Guarda o resultado (e, opcionalmente, os dados do gráfico) e aplica o limite de tamanho"""
+        itens = [('resultado', resultado)]
+        if dados_grafico is not None:
+            itens.append(('grafico', dados_grafico))
+        for sufixo, valor in itens:
+            caminho = self._caminho(chave, sufixo)
+            with open(caminho + '.tmp', 'wb') as f:
+                pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(caminho + '.tmp', caminho)
+        self._aplicar_limite()
+
+    def _aplicar_limite(self):
+        arquivos = [(os.path.getmtime(c), os.path.getsize(c), c)
+                    for c in glob.glob(os.path.join(self.diretorio, '*.pkl'))]
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= self.tamanho_maximo:
+                break
+            os.remove(caminho)
+            total -= tamanho
+
+    def invalidar(self, pergunta=None):
+        """Remove todas as entradas, ou só as de uma pergunta; devolve quantas foram removidas"""
+        padrao = f"{pergunta}-*.pkl" if pergunta else '*.pkl'
+        arquivos = glob.glob(os.path.join(self.diretorio, padrao))
+        for caminho in arquivos:
+            os.remove(caminho)
+        return len(arquivos)
+
+    def tamanho(self):
+        """Bytes ocupados pelo cache"""
+        return sum(os.path.getsize(c) for c in glob.glob(os.path.join(self.diretorio, '*.pkl')))
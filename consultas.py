@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+Consultas parametrizadas sobre os dados do Olist
+
+Versões das perguntas 2, 3 e 4 com limiar, top-N, janela de datas e estado
+configuráveis. Os índices são construídos uma única vez:
+
+- valores ordenados dentro de cada grupo (método de pagamento, nota de
+  avaliação) com somas de prefixo, de modo que qualquer limiar ou faixa é
+  respondido com buscas binárias;
+- linhas ordenadas pela data de compra do pedido, de modo que uma janela de
+  datas é uma fatia contígua;
+- contagens pré-agregadas por estado e categoria para o top-N.
+
+Consultas sem janela de datas custam O(log n) por grupo; com janela, o custo é
+proporcional ao tamanho da fatia.
+
+RankingCategorias responde ao top-N de categorias (pergunta 3) no total, por
+mês ou por estado, a partir de matrizes grupo x categoria pré-agregadas.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Menor valor válido de um timestamp em ns (NaT é o menor int64)
+_TS_MINIMO = np.iinfo(np.int64).min + 1
+_TS_MAXIMO = np.iinfo(np.int64).max
+
+
+def _timestamps_ns(serie):
+    """Timestamps como int64 em ns (NaT vira o menor int64 e fica no início da ordenação)"""
+    return serie.astype('datetime64[ns]').to_numpy().view(np.int64)
+
+
+def _limite_ns(valor, padrao):
+    return padrao if valor is None else pd.Timestamp(valor).value
+
+
+# Frequências cujo ordinal de pd.Period coincide com o de datetime64 (unidades desde 1970)
+_UNIDADES_NUMPY = {'D': 'D', 'M': 'M'}
+
+
+def codigos_periodo(serie, freq='M', nome='periodo'):
+    """
+    Período (dia, semana, mês...) de cada data como código inteiro
+
+    Returns:
+    tuple: (códigos int32, com -1 para datas nulas; PeriodIndex com um rótulo
+        por código, do primeiro ao último período presente)
+    """
+    datas = pd.Series(serie)
+    if not pd.api.types.is_datetime64_dtype(datas):
+        datas = datas.astype('datetime64[ns]')
+    if freq in _UNIDADES_NUMPY:
+        # Dia e mês: o ordinal do período é o datetime64 na unidade correspondente
+        ordinais = datas.to_numpy().astype(f'datetime64[{_UNIDADES_NUMPY[freq]}]').view(np.int64)
+    else:
+        ordinais = pd.PeriodIndex(datas, freq=freq).asi8
+    # NaT vira o menor int64 nos dois casos
+    validos = ordinais != np.iinfo(np.int64).min
+    codigos = np.full(len(ordinais), -1, dtype=np.int32)
+    if not validos.any():
+        return codigos, pd.PeriodIndex([], freq=freq, name=nome)
+    primeiro = ordinais[validos].min()
+    codigos[validos] = ordinais[validos] - primeiro
+    rotulos = pd.period_range(pd.Period(ordinal=primeiro, freq=freq),
+                              periods=int(codigos.max()) + 1, freq=freq, name=nome)
+    return codigos, rotulos
+
+
+def traducao_categorias(categorias, translation):
+    """
+    Nomes em inglês alinhados a `categorias` (categorias sem tradução mantêm o nome)
+
+    Um único reindex sobre category_translation; a tradução de qualquer
+    seleção de categorias é então uma indexação pelos códigos.
+    """
+    categorias = pd.Index(categorias)
+    if translation is None:
+        return categorias
+    traducao = translation.drop_duplicates(subset='product_category_name')
+    nomes = pd.Series(traducao['product_category_name_english'].to_numpy(dtype=object),
+                      index=traducao['product_category_name'].to_numpy(dtype=object))
+    traduzidas = nomes.reindex(categorias.to_numpy(dtype=object)).to_numpy(dtype=object)
+    return pd.Index(np.where(pd.isna(traduzidas), categorias.to_numpy(dtype=object), traduzidas))
+
+
+class _GruposOrdenados:
+    """Valores ordenados dentro de cada grupo, com somas de prefixo (soma e soma dos quadrados)"""
+
+    def __init__(self, grupos, valores, n_grupos):
+        ordem = np.lexsort((valores, grupos))
+        self.valores = np.asarray(valores, dtype=np.float64)[ordem]
+        self.inicios = np.searchsorted(np.asarray(grupos)[ordem], np.arange(n_grupos + 1))
+        self.soma = np.concatenate([[0.0], np.cumsum(self.valores)])
+        self.soma_quadrados = np.concatenate([[0.0], np.cumsum(self.valores ** 2)])
+
+    def intervalo(self, grupo, minimo=-np.inf, maximo=np.inf, minimo_exclusivo=False):
+        """Posições [i, j) dos valores do grupo dentro da faixa"""
+        a, b = self.inicios[grupo], self.inicios[grupo + 1]
+        valores = self.valores[a:b]
+        i = a + np.searchsorted(valores, minimo, side='right' if minimo_exclusivo else 'left')
+        j = a + np.searchsorted(valores, maximo, side='right')
+        return i, j
+
+    def totais(self, i, j):
+        """(quantidade, soma, soma dos quadrados) das posições [i, j)"""
+        return j - i, self.soma[j] - self.soma[i], self.soma_quadrados[j] - self.soma_quadrados[i]
+
+    def mediana(self, i, j):
+        n = j - i
+        if n == 0:
+            return np.nan
+        return (self.valores[i + (n - 1) // 2] + self.valores[i + n // 2]) / 2
+
+
+class IndiceConsultas:
+    """
+    Índices para consultas parametrizadas das perguntas 2, 3 e 4
+
+    Parameters:
+    pedidos (DataFrame): Tabela fato de pedidos (OlistAnalysis.fato_pedidos)
+    itens (DataFrame): Tabela fato de itens (OlistAnalysis.fato_itens); opcional
+    pagamentos (DataFrame): order_payments; opcional
+    translation (DataFrame): category_translation; opcional
+    """
+
+    def __init__(self, pedidos, itens=None, pagamentos=None, translation=None):
+        self.pedidos = pedidos
+        self.itens = itens
+        self.pagamentos = pagamentos
+        self.translation = translation
+        self.estados = None
+        if 'customer_state' in pedidos.columns:
+            self.estados = pd.Index(pd.Categorical(pedidos['customer_state']).categories)
+        # Índices construídos na primeira consulta que os usa
+        self._indices = {}
+
+    def _codigos_estado(self, serie):
+        """Código de cada linha no índice de estados (-1 sem estado)"""
+        if self.estados is None:
+            return np.full(len(serie), -1, dtype=np.int32)
+        return self.estados.get_indexer(serie).astype(np.int32)
+
+    def _codigo_estado(self, estado):
+        """Código do estado pedido (None = todos, -2 = estado desconhecido)"""
+        if estado is None:
+            return None
+        if self.estados is None:
+            raise ValueError("Filtro por estado requer a tabela customers")
+        return self.estados.get_loc(estado) if estado in self.estados else -2
+
+    @staticmethod
+    def _por_data(ts, colunas):
+        """Ordena as colunas pela data de compra (índice de datas)"""
+        ordem = np.argsort(ts, kind='stable')
+        return ts[ordem], {nome: valores[ordem] for nome, valores in colunas.items()}
+
+    @staticmethod
+    def _fatia(ts, inicio, fim):
+        """Posições [i, j) das linhas com data de compra em [inicio, fim)"""
+        i = np.searchsorted(ts, _limite_ns(inicio, _TS_MINIMO), side='left')
+        j = np.searchsorted(ts, _limite_ns(fim, _TS_MAXIMO), side='left' if fim is not None else 'right')
+        return i, j
+
+    def _linhas(self, nome, inicio, fim, estado):
+        """Colunas do índice `nome` restritas à janela de datas e ao estado"""
+        ts, colunas = self._indices[nome]['por_data']
+        if inicio is not None or fim is not None:
+            i, j = self._fatia(ts, inicio, fim)
+            colunas = {c: v[i:j] for c, v in colunas.items()}
+        codigo = self._codigo_estado(estado)
+        if codigo is not None:
+            mascara = colunas['estado'] == codigo
+            colunas = {c: v[mascara] for c, v in colunas.items()}
+        return colunas
+
+    def _grupos(self, nome, inicio, fim, estado, n_grupos):
+        """Grupos ordenados para a consulta; sem janela de datas, reaproveitados entre chamadas"""
+        if inicio is None and fim is None:
+            cache = self._indices[nome]['grupos']
+            if estado not in cache:
+                colunas = self._linhas(nome, None, None, estado)
+                cache[estado] = _GruposOrdenados(colunas['grupo'], colunas['valor'], n_grupos)
+            return cache[estado]
+        colunas = self._linhas(nome, inicio, fim, estado)
+        return _GruposOrdenados(colunas['grupo'], colunas['valor'], n_grupos)
+
+    def _datas_dos_pedidos(self, order_ids):
+        """Data de compra e código do estado de cada order_id"""
+        pedidos = self.pedidos.drop_duplicates(subset='order_id')
+        posicao = pd.Index(pedidos['order_id']).get_indexer(order_ids)
+        encontrados = posicao >= 0
+        ts = np.full(len(order_ids), np.iinfo(np.int64).min, dtype=np.int64)
+        ts[encontrados] = _timestamps_ns(pedidos['order_purchase_timestamp'])[posicao[encontrados]]
+        estado = np.full(len(order_ids), -1, dtype=np.int32)
+        if self.estados is not None:
+            estado[encontrados] = self._codigos_estado(pedidos['customer_state'])[posicao[encontrados]]
+        return ts, estado
+
+    def _indice_pagamentos(self):
+        if 'pagamentos' not in self._indices:
+            if self.pagamentos is None:
+                raise ValueError("Consulta de pagamentos requer a tabela order_payments")
+            tipos = pd.Categorical(self.pagamentos['payment_type'])
+            ts, estado = self._datas_dos_pedidos(self.pagamentos['order_id'])
+            self._indices['pagamentos'] = {
+                'tipos': tipos.categories,
+                'por_data': self._por_data(ts, {
+                    'grupo': tipos.codes.astype(np.int32),
+                    'valor': self.pagamentos['payment_value'].to_numpy(dtype=np.float64),
+                    'estado': estado,
+                }),
+                'grupos': {},
+            }
+        return self._indices['pagamentos']
+
+    def pagamentos_por_metodo(self, limiar=150.0, inicio=None, fim=None, estado=None):
+        """
+        Pergunta 2 parametrizada: pagamentos acima de `limiar` por método
+
+        Parameters:
+        limiar (float): Valor mínimo (exclusivo) do pagamento
+        inicio, fim: Janela [inicio, fim) da data de compra do pedido
+        estado (str): Sigla do estado do cliente
+
+        Returns:
+        DataFrame: Mesmo formato de payment_stats em OlistAnalysis.pergunta_2
+        """
+        indice = self._indice_pagamentos()
+        tipos = indice['tipos']
+        grupos = self._grupos('pagamentos', inicio, fim, estado, len(tipos))
+        linhas = []
+        for codigo, tipo in enumerate(tipos):
+            quantidade, soma, _ = grupos.totais(*grupos.intervalo(codigo, minimo=limiar,
+                                                                 minimo_exclusivo=True))
+            if quantidade:
+                linhas.append((tipo, quantidade, soma, soma / quantidade))
+        payment_stats = pd.DataFrame(
+            [linha[1:] for linha in linhas],
+            index=pd.Index([linha[0] for linha in linhas], name='payment_type'),
+            columns=['quantidade_pedidos', 'valor_total', 'valor_medio']
+        ).round(2)
+        payment_stats['percentual'] = (payment_stats['quantidade_pedidos'] /
+                                       payment_stats['quantidade_pedidos'].sum()) * 100
+        # Empates pelo nome do método, como na pergunta 2
+        return payment_stats.sort_values(['quantidade_pedidos', 'payment_type'], ascending=[False, True],
+                                         kind='stable')
+
+    def _indice_categorias(self):
+        if 'categorias' not in self._indices:
+            if self.itens is None:
+                raise ValueError("Consulta de categorias requer a tabela fato de itens")
+            itens = self.itens
+            categorias = pd.Categorical(itens['product_category_name'])
+            estado = (self._codigos_estado(itens['customer_state']) if 'customer_state' in itens.columns
+                      else np.full(len(itens), -1, dtype=np.int32))
+            ts = (itens['order_purchase_timestamp'] if 'order_purchase_timestamp' in itens.columns
+                  else pd.Series(pd.NaT, index=itens.index))
+            colunas = {
+                'grupo': categorias.codes.astype(np.int32),
+                'valor': itens['price'].to_numpy(dtype=np.float64),
+                'estado': np.asarray(estado),
+            }
+            # Pré-agregados por (estado, categoria); a linha 0 acumula itens sem estado
+            n_categorias = len(categorias.categories)
+            n_estados = len(self.estados) if self.estados is not None else 0
+            validos = colunas['grupo'] >= 0
+            posicao = (colunas['estado'][validos] + 1) * n_categorias + colunas['grupo'][validos]
+            tamanho = (n_estados + 1) * n_categorias
+            self._indices['categorias'] = {
+                'categorias': categorias.categories,
+                'por_data': self._por_data(_timestamps_ns(ts), colunas),
+                'quantidade': np.bincount(posicao, minlength=tamanho).reshape(n_estados + 1, n_categorias),
+                'receita': np.bincount(posicao, weights=colunas['valor'][validos],
+                                       minlength=tamanho).reshape(n_estados + 1, n_categorias),
+            }
+        return self._indices['categorias']
+
+    def top_categorias(self, n=5, inicio=None, fim=None, estado=None, traduzir=False):
+        """
+        Pergunta 3 parametrizada: as `n` categorias com mais itens vendidos
+
+        Parameters:
+        n (int): Quantidade de categorias
+        inicio, fim: Janela [inicio, fim) da data de compra do pedido
+        estado (str): Sigla do estado do cliente
+        traduzir (bool): Usar os nomes em inglês de category_translation
+
+        Returns:
+        DataFrame: Mesmo formato de top_5_categories em OlistAnalysis.pergunta_3
+        """
+        indice = self._indice_categorias()
+        categorias = indice['categorias']
+        if inicio is None and fim is None:
+            codigo = self._codigo_estado(estado)
+            if codigo is None:
+                quantidade, receita = indice['quantidade'].sum(axis=0), indice['receita'].sum(axis=0)
+            elif codigo < 0:
+                quantidade = receita = np.zeros(len(categorias))
+            else:
+                quantidade, receita = indice['quantidade'][codigo + 1], indice['receita'][codigo + 1]
+        else:
+            colunas = self._linhas('categorias', inicio, fim, estado)
+            validos = colunas['grupo'] >= 0
+            quantidade = np.bincount(colunas['grupo'][validos], minlength=len(categorias))
+            receita = np.bincount(colunas['grupo'][validos], weights=colunas['valor'][validos],
+                                  minlength=len(categorias))
+        category_stats = pd.DataFrame({
+            'quantidade_vendida': np.asarray(quantidade, dtype=np.int64),
+            'receita_total': receita,
+        }, index=pd.Index(categorias, name='product_category_name')).round(2)
+        if traduzir:
+            category_stats.index = traducao_categorias(categorias, self.translation).rename(
+                category_stats.index.name)
+        return category_stats[category_stats['quantidade_vendida'] > 0].nlargest(n, 'quantidade_vendida')
+
+    def _indice_avaliacoes(self):
+        if 'avaliacoes' not in self._indices:
+            pedidos = self.pedidos
+            if 'review_score' not in pedidos.columns:
+                raise ValueError("Consulta de avaliações requer a tabela order_reviews")
+            avaliados = pedidos[
+                (pedidos['order_status'] == 'delivered') &
+                (pedidos['order_delivered_customer_date'].notna()) &
+                (pedidos['order_purchase_timestamp'].notna()) &
+                (pedidos['review_score'].notna())
+            ]
+            dias = (avaliados['order_delivered_customer_date'] -
+                    avaliados['order_purchase_timestamp']).dt.days
+            estado = (self._codigos_estado(avaliados['customer_state']) if self.estados is not None
+                      else np.full(len(avaliados), -1, dtype=np.int32))
+            self._indices['avaliacoes'] = {
+                'por_data': self._por_data(_timestamps_ns(avaliados['order_purchase_timestamp']), {
+                    'grupo': avaliados['review_score'].to_numpy(dtype=np.int32),
+                    'valor': dias.to_numpy(dtype=np.float64),
+                    'estado': np.asarray(estado),
+                }),
+                'grupos': {},
+            }
+        return self._indices['avaliacoes']
+
+    def tempo_entrega_por_nota(self, dias_min=0, dias_max=100, inicio=None, fim=None, estado=None):
+        """
+        Pergunta 4 parametrizada: tempo de entrega por nota dentro de [dias_min, dias_max]
+
+        Parameters:
+        dias_min, dias_max (int): Faixa de tempo de entrega considerada (fora dela são outliers)
+        inicio, fim: Janela [inicio, fim) da data de compra do pedido
+        estado (str): Sigla do estado do cliente
+
+        Returns:
+        dict: Mesmas chaves de OlistAnalysis.results['pergunta_4'], ou None se não houver dados
+        """
+        self._indice_avaliacoes()
+        # Notas de 1 a 5 são usadas diretamente como grupo
+        grupos = self._grupos('avaliacoes', inicio, fim, estado, 6)
+        linhas = {}
+        n_total = soma_x = soma_xx = soma_y = soma_yy = soma_xy = 0.0
+        for nota in range(1, 6):
+            i, j = grupos.intervalo(nota, minimo=dias_min, maximo=dias_max)
+            quantidade, soma, soma_quadrados = grupos.totais(i, j)
+            if quantidade == 0:
+                continue
+            media = soma / quantidade
+            desvio = (np.sqrt(max(soma_quadrados - soma * media, 0.0) / (quantidade - 1))
+                      if quantidade > 1 else np.nan)
+            linhas[nota] = (quantidade, media, grupos.mediana(i, j), desvio)
+            n_total += quantidade
+            soma_x += soma
+            soma_xx += soma_quadrados
+            soma_y += nota * quantidade
+            soma_yy += nota * nota * quantidade
+            soma_xy += nota * soma
+        if n_total == 0:
+            return None
+
+        stats_by_score = pd.DataFrame.from_dict(
+            linhas, orient='index', columns=['count', 'mean', 'median', 'std']).round(2)
+        stats_by_score.index.name = 'review_score'
+        stats_by_score['count'] = stats_by_score['count'].astype(np.int64)
+        variancia = (n_total * soma_xx - soma_x ** 2) * (n_total * soma_yy - soma_y ** 2)
+        correlacao = (n_total * soma_xy - soma_x * soma_y) / np.sqrt(variancia) if variancia > 0 else np.nan
+        return {
+            'total_avaliacoes': int(n_total),
+            'correlacao': correlacao,
+            'stats_by_score': stats_by_score,
+            'tempo_medio_geral': soma_x / n_total,
+        }
+
+
+class RankingCategorias:
+    """
+    Top-N de categorias por quantidade vendida, no total, por mês ou por estado
+
+    Os itens são reduzidos uma única vez a códigos de categoria. Cada
+    agrupamento vira uma matriz grupo x categoria de quantidades e receitas
+    (bincount), guardada para as consultas seguintes; o top-N de cada grupo sai
+    de argpartition sobre as linhas da matriz, sem ordenar todas as categorias.
+
+    Parameters:
+    itens (DataFrame): Tabela fato de itens (OlistAnalysis.fato_itens); 'mes'
+        requer order_purchase_timestamp e 'estado', customer_state
+    translation (DataFrame): category_translation; opcional
+    """
+
+    AGRUPAMENTOS = (None, 'mes', 'estado')
+
+    def __init__(self, itens, translation=None):
+        categorias = pd.Categorical(itens['product_category_name'])
+        # Mesmo critério do groupby da pergunta 3: categoria e order_id preenchidos
+        self._validos = (categorias.codes >= 0) & itens['order_id'].notna().to_numpy()
+        self._itens = itens
+        self.categorias = categorias.categories
+        self.traducao = traducao_categorias(self.categorias, translation)
+        self._codigos = categorias.codes[self._validos].astype(np.int64)
+        self._precos = itens['price'].to_numpy(dtype=np.float64)[self._validos]
+        # agrupamento -> (rótulos dos grupos, quantidade, receita)
+        self._agregados = {}
+
+    def _grupos(self, por):
+        """Rótulos e código do grupo de cada item válido (-1 fora de qualquer grupo)"""
+        if por is None:
+            return pd.Index(['total']), np.zeros(len(self._codigos), dtype=np.int32)
+        coluna = {'mes': 'order_purchase_timestamp', 'estado': 'customer_state'}[por]
+        if coluna not in self._itens.columns:
+            raise ValueError(f"Agrupamento por {por} requer a coluna {coluna} na tabela fato de itens")
+        serie = self._itens[coluna][self._validos]
+        if por == 'mes':
+            codigos, rotulos = codigos_periodo(serie, 'M', nome='mes')
+            return rotulos, codigos
+        estados = pd.Categorical(serie)
+        return pd.Index(estados.categories, name='estado'), estados.codes.astype(np.int32)
+
+    def agregados(self, por=None):
+        """
+        Matrizes grupo x categoria de quantidade vendida e receita
+
+        Returns:
+        tuple: (rótulos dos grupos, quantidade int64, receita float64)
+        """
+        if por not in self.AGRUPAMENTOS:
+            raise ValueError(f"por deve ser um de {self.AGRUPAMENTOS}, não {por!r}")
+        if por not in self._agregados:
+            rotulos, grupos = self._grupos(por)
+            n_grupos, n_categorias = len(rotulos), len(self.categorias)
+            com_grupo = grupos >= 0
+            posicao = grupos[com_grupo].astype(np.int64) * n_categorias + self._codigos[com_grupo]
+            tamanho = n_grupos * n_categorias
+            self._agregados[por] = (
+                rotulos,
+                np.bincount(posicao, minlength=tamanho).reshape(n_grupos, n_categorias),
+                np.bincount(posicao, weights=self._precos[com_grupo],
+                            minlength=tamanho).reshape(n_grupos, n_categorias),
+            )
+        return self._agregados[por]
+
+    @staticmethod
+    def _top_por_linha(quantidade, n):
+        """Códigos das `n` maiores quantidades de cada linha, em ordem decrescente
+
+        Empates ficam com a categoria de menor código (ordem alfabética), como
+        no nlargest: a chave quantidade * C + (C - 1 - código) é única por linha.
+        """
+        n_categorias = quantidade.shape[1]
+        chave = quantidade * n_categorias + (n_categorias - 1 - np.arange(n_categorias))
+        k = min(n, n_categorias)
+        if k < n_categorias:
+            candidatos = np.argpartition(-chave, k - 1, axis=1)[:, :k]
+        else:
+            candidatos = np.broadcast_to(np.arange(n_categorias), chave.shape)
+        ordem = np.argsort(-np.take_along_axis(chave, candidatos, axis=1), axis=1)
+        return np.take_along_axis(candidatos, ordem, axis=1)
+
+    def top(self, n=5, por=None, traduzir=False):
+        """
+        As `n` categorias mais vendidas de cada grupo
+
+        Parameters:
+        n (int): Quantidade de categorias por grupo
+        por (str): None (total), 'mes' ou 'estado'
+        traduzir (bool): Usar os nomes em inglês de category_translation
+
+        Returns:
+        DataFrame: Sem agrupamento, o formato de top_5_categories em
+            OlistAnalysis.pergunta_3 (índice product_category_name); com
+            agrupamento, uma linha por (grupo, posição) e a categoria em coluna
+        """
+        rotulos, quantidade, receita = self.agregados(por)
+        if len(rotulos) == 0 or len(self.categorias) == 0 or n <= 0:
+            top = np.empty((len(rotulos), 0), dtype=np.int64)
+        else:
+            top = self._top_por_linha(quantidade, n)
+        linhas = np.repeat(np.arange(len(rotulos)), top.shape[1])
+        colunas = top.ravel()
+        quantidades = quantidade[linhas, colunas]
+        # Categorias sem venda no grupo não entram no ranking
+        vendidas = quantidades > 0
+        linhas, colunas = linhas[vendidas], colunas[vendidas]
+        nomes = (self.traducao if traduzir else self.categorias)[colunas]
+        ranking = pd.DataFrame({
+            'quantidade_vendida': quantidades[vendidas].astype(np.int64),
+            'receita_total': receita[linhas, colunas],
+        }, index=pd.Index(nomes, name='product_category_name')).round(2)
+        if por is None:
+            return ranking
+        # Posição no ranking: contagem dentro de cada grupo (linhas já agrupadas e ordenadas)
+        inicio_grupo = np.searchsorted(linhas, linhas)
+        ranking = ranking.reset_index()
+        ranking.index = pd.MultiIndex.from_arrays(
+            [rotulos[linhas], np.arange(len(linhas)) - inicio_grupo + 1],
+            names=[rotulos.name or por, 'posicao'])
+        return ranking
@@ -3,32 +3,30 @@
 Script to download Olist Brazilian E-Commerce Public Dataset
 """
 
+import glob
+import hashlib
+import json
 import os
+import re
 import urllib.request
 import zipfile
+from collections import namedtuple
+from collections.abc import Mapping
+import numpy as np
 import pandas as pd
 
-def download_olist_data():
+DATA_DIR = "data"
+
+def download_olist_data(data_dir=DATA_DIR):
     """Download the Olist dataset if not already present"""
     
-    data_dir = "data"
     if not os.path.exists(data_dir):
         os.makedirs(data_dir)
     
-    # Check if we already have the CSV files
-    csv_files = [
-        'olist_orders_dataset.csv',
-        'olist_order_items_dataset.csv',
-        'olist_order_payments_dataset.csv',
-        'olist_order_reviews_dataset.csv',
-        'olist_products_dataset.csv',
-        'olist_customers_dataset.csv',
-        'olist_sellers_dataset.csv',
-        'olist_geolocation_dataset.csv',
-        'product_category_name_translation.csv'
-    ]
-    
-    all_files_exist = all(os.path.exists(os.path.join(data_dir, f)) for f in csv_files)
+    # Check if we already have the CSV files (or a directory of partitions per table)
+    all_files_exist = all(os.path.exists(os.path.join(data_dir, schema['file']))
+                          or os.path.isdir(os.path.join(data_dir, name))
+                          for name, schema in TABLE_SCHEMAS.items())
     
     if not all_files_exist:
         print("Downloading Olist dataset...")
@@ -41,29 +39,788 @@ def download_olist_data():
     
     return True
 
-def load_data():
-    """Load all Olist datasets into pandas DataFrames"""
+# Binary columnar cache kept next to the CSVs (requires pyarrow)
+CACHE_DIRNAME = ".cache"
+
+# Format shared by every datetime column in the Olist CSVs
+OLIST_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Datetime columns whose strided sample of DATETIME_SAMPLE_SIZE values has at most
+# this share of distinct values are parsed once per distinct value
+DATETIME_DEDUP_RATIO = 0.5
+DATETIME_SAMPLE_SIZE = 10_000
+
+# Schema registry: file, dtypes and datetime columns for each table
+TABLE_SCHEMAS = {
+    'orders': {
+        'file': 'olist_orders_dataset.csv',
+        'dtypes': {
+            'order_id': 'string',
+            'customer_id': 'string',
+            'order_status': 'category',
+        },
+        'dates': ['order_purchase_timestamp', 'order_approved_at',
+                  'order_delivered_carrier_date', 'order_delivered_customer_date',
+                  'order_estimated_delivery_date'],
+    },
+    'order_items': {
+        'file': 'olist_order_items_dataset.csv',
+        'dtypes': {
+            'order_id': 'string',
+            'order_item_id': 'int16',
+            'product_id': 'string',
+            'seller_id': 'string',
+            'price': 'float64',
+            'freight_value': 'float32',
+        },
+        'dates': ['shipping_limit_date'],
+    },
+    'order_payments': {
+        'file': 'olist_order_payments_dataset.csv',
+        'dtypes': {
+            'order_id': 'string',
+            'payment_sequential': 'int16',
+            'payment_type': 'category',
+            'payment_installments': 'int16',
+            'payment_value': 'float64',
+        },
+        'dates': [],
+    },
+    'order_reviews': {
+        'file': 'olist_order_reviews_dataset.csv',
+        'dtypes': {
+            'review_id': 'string',
+            'order_id': 'string',
+            'review_score': 'int8',
+            'review_comment_title': 'string',
+            'review_comment_message': 'string',
+        },
+        'dates': ['review_creation_date', 'review_answer_timestamp'],
+    },
+    'products': {
+        'file': 'olist_products_dataset.csv',
+        'dtypes': {
+            'product_id': 'string',
+            'product_category_name': 'category',
+            'product_name_lenght': 'float32',
+            'product_description_lenght': 'float32',
+            'product_photos_qty': 'float32',
+            'product_weight_g': 'float32',
+            'product_length_cm': 'float32',
+            'product_height_cm': 'float32',
+            'product_width_cm': 'float32',
+        },
+        'dates': [],
+    },
+    'customers': {
+        'file': 'olist_customers_dataset.csv',
+        'dtypes': {
+            'customer_id': 'string',
+            'customer_unique_id': 'string',
+            'customer_zip_code_prefix': 'int32',
+            'customer_city': 'category',
+            'customer_state': 'category',
+        },
+        'dates': [],
+    },
+    'sellers': {
+        'file': 'olist_sellers_dataset.csv',
+        'dtypes': {
+            'seller_id': 'string',
+            'seller_zip_code_prefix': 'int32',
+            'seller_city': 'category',
+            'seller_state': 'category',
+        },
+        'dates': [],
+    },
+    'geolocation': {
+        'file': 'olist_geolocation_dataset.csv',
+        'dtypes': {
+            'geolocation_zip_code_prefix': 'int32',
+            'geolocation_lat': 'float64',
+            'geolocation_lng': 'float64',
+            'geolocation_city': 'category',
+            'geolocation_state': 'category',
+        },
+        'dates': [],
+    },
+    'category_translation': {
+        'file': 'product_category_name_translation.csv',
+        'dtypes': {
+            'product_category_name': 'string',
+            'product_category_name_english': 'string',
+        },
+        'dates': [],
+    },
+}
+
+# Columns each analysis reads, per table
+ANALYSIS_COLUMNS = {
+    'pergunta_1_entregas_atrasadas': {
+        'orders': ['order_id', 'order_status', 'order_delivered_customer_date',
+                   'order_estimated_delivery_date'],
+    },
+    'pergunta_2_metodo_pagamento': {
+        'order_payments': ['order_id', 'payment_type', 'payment_value'],
+    },
+    'pergunta_3_top_categorias': {
+        'order_items': ['order_id', 'product_id', 'price'],
+        'products': ['product_id', 'product_category_name'],
+        'category_translation': ['product_category_name', 'product_category_name_english'],
+    },
+    'pergunta_4_tempo_entrega_avaliacao': {
+        'orders': ['order_id', 'order_status', 'order_purchase_timestamp',
+                   'order_delivered_customer_date'],
+        'order_reviews': ['order_id', 'review_score'],
+    },
+    'distancia_entregas': {
+        'orders': ['order_id', 'customer_id', 'order_status', 'order_purchase_timestamp',
+                   'order_delivered_customer_date', 'order_estimated_delivery_date'],
+        'customers': ['customer_id', 'customer_zip_code_prefix'],
+        'order_items': ['order_id', 'seller_id'],
+        'sellers': ['seller_id', 'seller_zip_code_prefix'],
+        'geolocation': ['geolocation_zip_code_prefix', 'geolocation_lat', 'geolocation_lng'],
+        'order_reviews': ['order_id', 'review_score'],
+    },
+    'ranking_categorias': {
+        'order_items': ['order_id', 'product_id', 'price'],
+        'products': ['product_id', 'product_category_name'],
+        'category_translation': ['product_category_name', 'product_category_name_english'],
+        'orders': ['order_id', 'customer_id', 'order_purchase_timestamp'],
+        'customers': ['customer_id', 'customer_state'],
+    },
+    'tendencias': {
+        'orders': ['order_id', 'customer_id', 'order_status', 'order_purchase_timestamp',
+                   'order_delivered_customer_date', 'order_estimated_delivery_date'],
+        'customers': ['customer_id', 'customer_state'],
+        'order_payments': ['order_id', 'payment_type', 'payment_value'],
+        'order_reviews': ['order_id', 'review_score'],
+    },
+}
+
+
+def columns_for_analyses(analyses):
+    """Merge the column requirements of several analyses into {table: [columns]}"""
+    columns = {}
+    for analysis in analyses:
+        if analysis not in ANALYSIS_COLUMNS:
+            raise ValueError(f"Unknown analysis: {analysis}")
+        for table, cols in ANALYSIS_COLUMNS[analysis].items():
+            merged = columns.setdefault(table, [])
+            merged.extend(col for col in cols if col not in merged)
+    return columns
+
+
+def _resolve_engine(engine):
+    """Return the read_csv engine to use, falling back to 'c' without pyarrow"""
+    if engine == 'pyarrow':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("pyarrow not installed, falling back to the 'c' engine")
+            return 'c'
+    return engine
+
+
+def _low_cardinality(series):
+    """Whether a strided sample of the column has few distinct values"""
+    step = max(1, len(series) // DATETIME_SAMPLE_SIZE)
+    sample = series.iloc[::step]
+    return len(sample) > 0 and sample.nunique() <= DATETIME_DEDUP_RATIO * len(sample)
+
+
+def parse_datetime_column(series):
+    """Parse an Olist datetime column using the known format
+
+    Low-cardinality columns (e.g. date-only estimates) are parsed once per
+    distinct value and mapped back. Values that do not match the Olist format
+    get a second, ISO 8601 attempt; anything else becomes NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    if not series.notna().any():
+        # Nothing to parse (e.g. delivery dates of a batch with no deliveries)
+        return pd.Series(pd.NaT, index=series.index, name=series.name, dtype='datetime64[ns]')
+    if _low_cardinality(series):
+        codes, uniques = pd.factorize(series)
+        parsed = parse_datetime_column(pd.Series(uniques))
+        return pd.Series(parsed.to_numpy().take(codes), index=series.index, name=series.name).where(codes >= 0)
+    parsed = pd.to_datetime(series, format=OLIST_DATETIME_FORMAT, errors='coerce')
+    unmatched = parsed.isna() & series.notna()
+    if unmatched.any():
+        parsed[unmatched] = pd.to_datetime(series[unmatched], format='ISO8601', errors='coerce')
+    return parsed
+
+
+def parse_datetime_columns(df, columns, max_workers=None):
+    """Parse datetime columns of `df` in place; return {column: values coerced to NaT}
+
+    Columns that are missing or already datetime are skipped. With
+    max_workers > 1 the columns are parsed concurrently in a thread pool.
+    """
+    columns = [col for col in columns
+               if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col])]
+    if max_workers and max_workers > 1 and len(columns) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(columns))) as pool:
+            parsed = dict(zip(columns, pool.map(lambda col: parse_datetime_column(df[col]), columns)))
+    else:
+        parsed = {col: parse_datetime_column(df[col]) for col in columns}
+    failures = {}
+    for col, values in parsed.items():
+        failures[col] = int((values.isna() & df[col].notna()).sum())
+        df[col] = values
+    # Kept with the table so callers can report data-quality issues later
+    df.attrs.setdefault('datetime_failures', {}).update(failures)
+    return failures
+
+
+def apply_schema(name, df):
+    """Cast a raw table to the dtypes declared in TABLE_SCHEMAS
+
+    String columns that are already categorical (e.g. dictionary-coded IDs)
+    are left as they are.
+    """
+    schema = TABLE_SCHEMAS[name]
+    dtypes = {col: dtype for col, dtype in schema['dtypes'].items()
+              if col in df.columns and df[col].dtype != dtype
+              and not (dtype == 'string' and isinstance(df[col].dtype, pd.CategoricalDtype))}
+    if dtypes:
+        df = df.astype(dtypes)
+    parse_datetime_columns(df, schema['dates'])
+    return df
+
+
+# Partitioned tables: data_dir/<table name>/ holds one CSV per partition, either
+# flat (orders/2018-01.csv) or in Hive-style key=value directories
+# (orders/marketplace=br/month=2018-01/part-0.csv). The directory takes
+# precedence over the single-file CSV of the same table.
+PARTITION_GLOB = "**/*.csv"
+# Hive keys that hold a partition's purchase period ('year' + 'month' also works);
+# without them, a path segment named like 2018, 2018-01 or 2018-01-15 is used
+PARTITION_PERIOD_KEYS = ('purchase_month', 'month', 'date', 'dt', 'period')
+PARTITION_READ_WORKERS = 8
+
+_PERIOD_NAME = re.compile(r'^\d{4}(-\d{2}){0,2}$')
+
+# One file of a table: its path, Hive keys ({'marketplace': 'br'}) and purchase
+# period (pd.Period, or None when the layout does not say)
+Partition = namedtuple('Partition', ['path', 'keys', 'period'])
+
+
+def _partition_period(keys, names):
+    """Purchase period of a partition from its Hive keys or a date-like path segment"""
+    if 'year' in keys and keys.get('month', '').isdigit():
+        value = f"{keys['year']}-{int(keys['month']):02d}"
+    else:
+        value = next((keys[key] for key in PARTITION_PERIOD_KEYS if key in keys), None)
+        if value is None:
+            value = next((name for name in reversed(names) if _PERIOD_NAME.match(name)), keys.get('year'))
+    if value is None:
+        return None
+    try:
+        return pd.Period(value)
+    except ValueError:
+        return None
+
+
+def find_partitions(name, data_dir=DATA_DIR, partition_filter=None):
+    """Partitions of a table stored as a directory of CSVs, or None for a single-file table
+
+    Parameters:
+    partition_filter (dict): Prunes whole files before anything is read.
+        'purchase_date' takes an inclusive (start, end) range, either end may be
+        None, and drops partitions whose period lies outside it. Any other key
+        names a Hive key and takes its allowed value(s), e.g.
+        {'marketplace': ['br', 'mx']}. Partitions without the key are kept.
+    """
+    root = os.path.join(data_dir, name)
+    if not os.path.isdir(root):
+        return None
+    partitions = []
+    for path in sorted(glob.glob(os.path.join(root, PARTITION_GLOB), recursive=True)):
+        segments = os.path.relpath(path, root).split(os.sep)
+        segments[-1] = os.path.splitext(segments[-1])[0]
+        keys = dict(segment.split('=', 1) for segment in segments if '=' in segment)
+        names = [segment for segment in segments if '=' not in segment]
+        partitions.append(Partition(path, keys, _partition_period(keys, names)))
+    return prune_partitions(partitions, partition_filter)
+
+
+def prune_partitions(partitions, partition_filter=None):
+    """Partitions that may hold rows matching `partition_filter` (see find_partitions)"""
+    if not partition_filter:
+        return partitions
+    filters = dict(partition_filter)
+    start, end = (pd.Timestamp(bound) if bound is not None else None
+                  for bound in filters.pop('purchase_date', (None, None)))
+    allowed = {key: {str(value) for value in ([values] if isinstance(values, str) else values)}
+               for key, values in filters.items()}
+    kept = []
+    for partition in partitions:
+        period = partition.period
+        if period is not None and ((start is not None and period.end_time < start)
+                                   or (end is not None and period.start_time > end)):
+            continue
+        if any(key in partition.keys and partition.keys[key] not in values
+               for key, values in allowed.items()):
+            continue
+        kept.append(partition)
+    return kept
+
+
+def table_sources(name, data_dir=DATA_DIR, partition_filter=None):
+    """Files a table is read from: its partitions, or its single CSV as one partition"""
+    partitions = find_partitions(name, data_dir, partition_filter)
+    if partitions is None:
+        return [Partition(os.path.join(data_dir, TABLE_SCHEMAS[name]['file']), {}, None)]
+    return partitions
+
+
+def _schema_columns(name):
+    schema = TABLE_SCHEMAS[name]
+    return list(schema['dtypes']) + schema['dates']
+
+
+def _add_partition_columns(name, df, partition, columns=None):
+    """Add the Hive keys that are not table columns (e.g. marketplace) as categorical columns"""
+    schema_columns = _schema_columns(name)
+    for key, value in partition.keys.items():
+        if key not in schema_columns and key not in df.columns and (columns is None or key in columns):
+            df[key] = pd.Categorical.from_codes(np.zeros(len(df), dtype=np.int8), [value])
+    return df
+
+
+def _file_columns(name, partition, columns):
+    """Requested columns minus those supplied by the partition path"""
+    if columns is None:
+        return None
+    schema_columns = _schema_columns(name)
+    return [col for col in columns if col in schema_columns or col not in partition.keys]
+
+
+def _read_partition(name, partition, data_dir, columns=None, engine='c', use_cache=True):
+    """One partition; without the cache its dates are left as text for a single parse after concat"""
+    file_columns = _file_columns(name, partition, columns)
+    if use_cache and _cache_available():
+        df = _read_cached(name, data_dir, columns=file_columns, engine=engine, csv_path=partition.path)
+    else:
+        df = _read_csv(name, data_dir, columns=file_columns, engine=engine, path=partition.path,
+                       parse_dates=False)
+    return _add_partition_columns(name, df, partition, columns)
+
+
+def _empty_table(name, columns=None):
+    """Zero-row table with the schema dtypes (every partition was pruned)"""
+    schema = TABLE_SCHEMAS[name]
+    selected = list(columns) if columns is not None else _schema_columns(name)
+    return pd.DataFrame({
+        col: pd.Series(dtype='datetime64[ns]' if col in schema['dates'] else schema['dtypes'].get(col, 'category'))
+        for col in selected
+    })
+
+
+def _concat_partitions(frames):
+    """Concatenate partition frames with a single copy
+
+    Categorical columns get the union of the partitions' categories first, so
+    they stay categorical instead of falling back to object. Datetime parse
+    failures are summed into the result's attrs.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    for column in frames[0].columns:
+        dtypes = [df[column].dtype if column in df.columns else None for df in frames]
+        if all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes) and len(set(dtypes)) > 1:
+            categories = dtypes[0].categories
+            for dtype in dtypes[1:]:
+                categories = categories.append(dtype.categories[~dtype.categories.isin(categories)])
+            for df in frames:
+                df[column] = df[column].cat.set_categories(categories)
+    failures = {}
+    for df in frames:
+        for col, count in df.attrs.get('datetime_failures', {}).items():
+            failures[col] = failures.get(col, 0) + count
+    df = pd.concat(frames, ignore_index=True)
+    df.attrs = {'datetime_failures': failures}
+    return df
+
+
+def _read_partitions(name, partitions, data_dir, columns=None, engine='c', use_cache=True,
+                     max_workers=PARTITION_READ_WORKERS):
+    """Read the partitions of a table concurrently and concatenate them once
+
+    Dates still in text are parsed after the concat: one pass over the whole
+    column deduplicates repeated values better than one pass per file.
+    """
+    if not partitions:
+        return _empty_table(name, columns)
+    workers = min(max_workers or 1, len(partitions))
+
+    def read(partition):
+        return _read_partition(name, partition, data_dir, columns=columns, engine=engine, use_cache=use_cache)
+
+    if workers > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(read, partitions))
+    else:
+        frames = [read(partition) for partition in partitions]
+    df = _concat_partitions(frames)
+    parse_datetime_columns(df, TABLE_SCHEMAS[name]['dates'])
+    return df
+
+
+def _read_csv(name, data_dir, columns=None, engine='c', path=None, parse_dates=True):
+    """Parse a table straight from its CSV file (or from one of its partitions)"""
+    schema = TABLE_SCHEMAS[name]
+    usecols = list(columns) if columns is not None else None
+    selected = usecols if usecols is not None else list(schema['dtypes']) + schema['dates']
+    dtype = {col: t for col, t in schema['dtypes'].items() if col in selected}
+    df = pd.read_csv(
+        path or os.path.join(data_dir, schema['file']),
+        usecols=usecols,
+        dtype=dtype,
+        engine=_resolve_engine(engine),
+    )
+    # Dates are parsed once, here, with an explicit format
+    if parse_dates:
+        parse_datetime_columns(df, schema['dates'])
+    return df
+
+
+def iter_table_chunks(name, data_dir=DATA_DIR, columns=None, chunksize=100_000, partition_filter=None):
+    """Stream a table from its CSV in chunks of at most `chunksize` rows
+
+    Each chunk gets the same dtypes and date parsing as read_table, so code
+    written against whole tables works unchanged on chunks. Partitioned tables
+    are streamed one partition after another; chunks never span two files.
+    """
+    schema = TABLE_SCHEMAS[name]
+    for partition in table_sources(name, data_dir, partition_filter):
+        usecols = _file_columns(name, partition, columns)
+        selected = usecols if usecols is not None else list(schema['dtypes']) + schema['dates']
+        dtype = {col: t for col, t in schema['dtypes'].items() if col in selected}
+        reader = pd.read_csv(partition.path, usecols=usecols, dtype=dtype, chunksize=chunksize)
+        with reader:
+            for chunk in reader:
+                parse_datetime_columns(chunk, schema['dates'])
+                yield _add_partition_columns(name, chunk, partition, columns)
+
+
+def _hash_file(path, block_size=1 << 20):
+    """Content hash of a file, read in 1 MiB blocks"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _schema_hash(name):
+    """Hash of the declared schema, so schema edits invalidate the cache"""
+    payload = json.dumps(TABLE_SCHEMAS[name], sort_keys=True).encode()
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
+def _cache_paths(name, data_dir, csv_path=None):
+    """Feather and metadata paths; a partition is cached under .cache/<table>/ by its relative path"""
+    cache_dir = os.path.join(data_dir, CACHE_DIRNAME)
+    if csv_path is not None:
+        base = os.path.join(cache_dir, name, os.path.relpath(csv_path, os.path.join(data_dir, name)))
+        return base + ".feather", base + ".meta.json"
+    return (os.path.join(cache_dir, f"{name}.feather"),
+            os.path.join(cache_dir, f"{name}.meta.json"))
+
+
+def _cache_is_valid(name, csv_path, feather_path, meta_path):
+    """Check the cached copy against the CSV's size, mtime and content hash
+
+    Size and mtime are compared first; the content hash is only computed when
+    the mtime changed but the size did not (e.g. the file was touched or
+    copied), and a matching hash refreshes the stored mtime.
+    """
+    if not (os.path.exists(feather_path) and os.path.exists(meta_path)):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    stat = os.stat(csv_path)
+    if meta.get('schema') != _schema_hash(name) or meta.get('size') != stat.st_size:
+        return False
+    if meta.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    if meta.get('hash') != _hash_file(csv_path):
+        return False
+    meta['mtime_ns'] = stat.st_mtime_ns
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    return True
+
+
+def _build_cache(name, data_dir, csv_path, feather_path, meta_path, engine):
+    """Parse the full CSV once and store it as Feather with its fingerprint"""
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    os.makedirs(os.path.dirname(feather_path), exist_ok=True)
+    stat = os.stat(csv_path)
+    df = _read_csv(name, data_dir, engine=engine, path=csv_path)
+    # Uncompressed Feather can be memory-mapped without a decode step
+    tmp_path = feather_path + '.tmp'
+    feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), tmp_path,
+                          compression='uncompressed')
+    os.replace(tmp_path, feather_path)
+    meta = {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': _hash_file(csv_path),
+        'schema': _schema_hash(name),
+    }
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+
+
+def _read_cached(name, data_dir, columns=None, engine='c', csv_path=None):
+    """Read a table (or one partition, given its csv_path) from the Feather cache,
+    rebuilding it if the CSV changed"""
+    import pyarrow.feather as feather
+
+    feather_path, meta_path = _cache_paths(name, data_dir, csv_path)
+    label = name if csv_path is None else os.path.relpath(csv_path, data_dir)
+    csv_path = csv_path or os.path.join(data_dir, TABLE_SCHEMAS[name]['file'])
+    if not _cache_is_valid(name, csv_path, feather_path, meta_path):
+        print(f"Building cache for {label}...")
+        _build_cache(name, data_dir, csv_path, feather_path, meta_path, engine)
+    table = feather.read_table(feather_path, columns=list(columns) if columns is not None else None,
+                               memory_map=True)
+    return table.to_pandas()
+
+
+def _cache_available():
+    try:
+        import pyarrow.feather  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# 32-character hex ID columns and the entity whose dictionary encodes them
+ID_COLUMNS = {
+    'order_id': 'order',
+    'customer_id': 'customer',
+    'customer_unique_id': 'customer_unique',
+    'product_id': 'product',
+    'seller_id': 'seller',
+    'review_id': 'review',
+}
+
+
+class IdDictionary:
+    """Append-only mapping between ID strings and dense int32 codes
+
+    Codes never change once assigned, so columns encoded at different times
+    (e.g. tables loaded lazily) stay joinable on the integer codes.
+    """
+
+    def __init__(self):
+        self._ids = pd.Index([], dtype=object)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def encode(self, values):
+        """Codes for a column of IDs (-1 for missing values)"""
+        values = pd.Series(values)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Only the categories need hashing
+            local, uniques = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            local, uniques = pd.factorize(values, sort=False)
+        positions = self._ids.get_indexer(uniques)
+        new = positions < 0
+        if new.any():
+            positions[new] = np.arange(len(self._ids), len(self._ids) + new.sum())
+            self._ids = self._ids.append(pd.Index(np.asarray(uniques[new], dtype=object)))
+        codes = np.full(len(local), -1, dtype=np.int32)
+        present = local >= 0
+        codes[present] = positions[local[present]]
+        return codes
+
+    def decode(self, codes):
+        """ID strings for an array of codes (None for -1)"""
+        codes = np.asarray(codes)
+        ids = np.full(len(codes), None, dtype=object)
+        present = codes >= 0
+        ids[present] = self._ids.to_numpy()[codes[present]]
+        return ids
+
+
+class IdEncoder:
+    """One IdDictionary per entity, shared by every table that holds its IDs
+
+    ID columns are replaced by int32 codes, so merges and groupbys run on
+    integers. Use decode/decode_frame to get the original strings back for output.
+    """
+
+    def __init__(self):
+        self.dictionaries = {}
+
+    def dictionary(self, column):
+        entity = ID_COLUMNS[column]
+        return self.dictionaries.setdefault(entity, IdDictionary())
+
+    def encode_frame(self, df):
+        """Replace the ID columns of `df` by their codes (in place) and return it"""
+        for column in df.columns.intersection(list(ID_COLUMNS)):
+            if not pd.api.types.is_integer_dtype(df[column]):
+                df[column] = self.dictionary(column).encode(df[column])
+        return df
+
+    def decode(self, column, codes):
+        return self.dictionary(column).decode(codes)
+
+    def decode_frame(self, df):
+        """Copy of `df` with encoded ID columns turned back into strings"""
+        df = df.copy()
+        for column in df.columns.intersection(list(ID_COLUMNS)):
+            if pd.api.types.is_integer_dtype(df[column]):
+                df[column] = self.decode(column, df[column].to_numpy())
+        return df
+
+
+def read_table(name, data_dir=DATA_DIR, columns=None, engine='c', use_cache=True, id_encoder=None,
+               partition_filter=None):
+    """Read a single Olist table with its declared dtypes and date columns
+
+    With use_cache (and pyarrow installed) the table is served from a Feather
+    copy under data/.cache, rebuilt only when the source CSV changes. With an
+    id_encoder, the ID columns are returned as int32 codes.
+
+    A table stored as a directory of partitions (see find_partitions) is read
+    file by file in a thread pool, skipping the files pruned by
+    partition_filter, and concatenated once.
+    """
+    partitions = find_partitions(name, data_dir, partition_filter)
+    if partitions is not None:
+        df = _read_partitions(name, partitions, data_dir, columns=columns, engine=engine, use_cache=use_cache)
+    elif use_cache and _cache_available():
+        df = _read_cached(name, data_dir, columns=columns, engine=engine)
+    else:
+        df = _read_csv(name, data_dir, columns=columns, engine=engine)
+    if id_encoder is not None:
+        id_encoder.encode_frame(df)
+    return df
+
+
+class LazyDatasets(Mapping):
+    """Dict-like container that reads each Olist table on first access
+
+    Tables are parsed (with their schema dtypes and dates) only when looked up,
+    so running a single analysis reads only the tables that analysis uses.
+    Membership tests and iteration never trigger a read.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, columns=None, engine='c', use_cache=True, id_encoder=None,
+                 partition_filter=None):
+        self.data_dir = data_dir
+        self.engine = engine
+        self.use_cache = use_cache
+        self.id_encoder = id_encoder
+        self.partition_filter = partition_filter
+        self._columns = columns if columns is not None else {name: None for name in TABLE_SCHEMAS}
+        self._tables = {}
+        self._assigned = set()
+
+    def __getitem__(self, name):
+        if name not in self._columns:
+            raise KeyError(name)
+        if name not in self._tables:
+            self._tables[name] = read_table(name, self.data_dir, columns=self._columns[name],
+                                            engine=self.engine, use_cache=self.use_cache,
+                                            id_encoder=self.id_encoder,
+                                            partition_filter=self.partition_filter)
+        return self._tables[name]
+
+    def __setitem__(self, name, df):
+        self._columns.setdefault(name, None)
+        self._tables[name] = df
+        self._assigned.add(name)
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def is_loaded(self, name):
+        return name in self._tables
+
+    def fingerprint(self, name):
+        """Cheap identity of a file-backed table: source size, mtime and selected columns
+
+        Partitioned tables list the size and mtime of every partition left after
+        pruning. Returns None for tables assigned directly (not read from a file).
+        """
+        if name not in self._columns or name in self._assigned:
+            return None
+        partitions = find_partitions(name, self.data_dir, self.partition_filter)
+        if partitions is None:
+            stat = os.stat(os.path.join(self.data_dir, TABLE_SCHEMAS[name]['file']))
+            return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'columns': self._columns[name]}
+        stats = [(os.path.relpath(p.path, self.data_dir), os.stat(p.path)) for p in partitions]
+        return {'partitions': [[path, stat.st_size, stat.st_mtime_ns] for path, stat in stats],
+                'columns': self._columns[name]}
+
+    def loaded(self):
+        """Names of the tables read so far"""
+        return list(self._tables)
+
+    def __repr__(self):
+        return f"LazyDatasets(loaded={self.loaded()}, available={list(self._columns)})"
+
+
+def load_data(analyses=None, engine='c', data_dir=DATA_DIR, use_cache=True, lazy=False, id_encoder=None,
+              partition_filter=None):
+    """Load Olist datasets into pandas DataFrames
+
+    Parameters:
+    analyses (list): Names of the analyses to run (keys of ANALYSIS_COLUMNS).
+        When given, only the tables and columns they need are read.
+    engine (str): read_csv engine, 'c' or 'pyarrow'
+    data_dir (str): Directory containing the CSV files
+    use_cache (bool): Serve tables from the Feather cache in data/.cache
+    lazy (bool): Return a LazyDatasets that reads each table on first access
+    id_encoder (IdEncoder): Encode the ID columns as int32 codes in its
+        per-entity dictionaries (keep it to decode IDs for output)
+    partition_filter (dict): Skip partitions of partitioned tables by purchase
+        date or Hive key, e.g. {'purchase_date': ('2018-01-01', None),
+        'marketplace': 'br'} (see find_partitions)
+    """
     
-    if not download_olist_data():
+    if not download_olist_data(data_dir):
         # For demo purposes, let's create some sample data that matches the schema
         print("Creating sample data for demonstration...")
-        return create_sample_data()
+        return _encode_all(create_sample_data(), id_encoder)
+    
+    if analyses is not None:
+        columns = columns_for_analyses(analyses)
+    else:
+        columns = {name: None for name in TABLE_SCHEMAS}
     
-    data_dir = "data"
+    if lazy:
+        return LazyDatasets(data_dir, columns=columns, engine=engine, use_cache=use_cache,
+                            id_encoder=id_encoder, partition_filter=partition_filter)
     
-    # Load all datasets
     datasets = {}
     
     try:
-        datasets['orders'] = pd.read_csv(os.path.join(data_dir, 'olist_orders_dataset.csv'))
-        datasets['order_items'] = pd.read_csv(os.path.join(data_dir, 'olist_order_items_dataset.csv'))
-        datasets['order_payments'] = pd.read_csv(os.path.join(data_dir, 'olist_order_payments_dataset.csv'))
-        datasets['order_reviews'] = pd.read_csv(os.path.join(data_dir, 'olist_order_reviews_dataset.csv'))
-        datasets['products'] = pd.read_csv(os.path.join(data_dir, 'olist_products_dataset.csv'))
-        datasets['customers'] = pd.read_csv(os.path.join(data_dir, 'olist_customers_dataset.csv'))
-        datasets['sellers'] = pd.read_csv(os.path.join(data_dir, 'olist_sellers_dataset.csv'))
-        datasets['geolocation'] = pd.read_csv(os.path.join(data_dir, 'olist_geolocation_dataset.csv'))
-        datasets['category_translation'] = pd.read_csv(os.path.join(data_dir, 'product_category_name_translation.csv'))
+        for name, cols in columns.items():
+            datasets[name] = read_table(name, data_dir, columns=cols, engine=engine,
+                                        use_cache=use_cache, id_encoder=id_encoder,
+                                        partition_filter=partition_filter)
         
         print("Data loaded successfully!")
         return datasets
@@ -71,126 +828,316 @@ def load_data():
     except FileNotFoundError as e:
         print(f"Error loading data: {e}")
         print("Creating sample data for demonstration...")
-        return create_sample_data()
+        return _encode_all(create_sample_data(), id_encoder)
 
-def create_sample_data():
-    """Create sample datasets for demonstration"""
-    import numpy as np
-    from datetime import datetime, timedelta
-    
-    np.random.seed(42)
-    
-    # Sample data creation (minimal structure for demo)
-    n_orders = 1000
-    n_customers = 800
-    n_products = 200
-    
-    # Generate sample orders
-    orders = pd.DataFrame({
-        'order_id': [f'order_{i}' for i in range(n_orders)],
-        'customer_id': [f'customer_{np.random.randint(0, n_customers)}' for _ in range(n_orders)],
-        'order_status': np.random.choice(['delivered', 'shipped', 'canceled', 'processing'], n_orders, p=[0.85, 0.10, 0.03, 0.02]),
-        'order_purchase_timestamp': [datetime.now() - timedelta(days=np.random.randint(0, 365)) for _ in range(n_orders)],
-        'order_approved_at': [datetime.now() - timedelta(days=np.random.randint(0, 365)) for _ in range(n_orders)],
-        'order_delivered_carrier_date': [datetime.now() - timedelta(days=np.random.randint(0, 30)) for _ in range(n_orders)],
-        'order_delivered_customer_date': [datetime.now() - timedelta(days=np.random.randint(0, 20)) for _ in range(n_orders)],
-        'order_estimated_delivery_date': [datetime.now() + timedelta(days=np.random.randint(5, 30)) for _ in range(n_orders)]
+
+def _encode_all(datasets, id_encoder):
+    if id_encoder is not None:
+        for df in datasets.values():
+            id_encoder.encode_frame(df)
+    return datasets
+
+# Categories and translations used by the synthetic generator
+SAMPLE_CATEGORIES = {
+    'cama_mesa_banho': 'bed_bath_table',
+    'beleza_saude': 'health_beauty',
+    'esporte_lazer': 'sports_leisure',
+    'informatica_acessorios': 'computers_accessories',
+    'moveis_decoracao': 'furniture_decor',
+    'utilidades_domesticas': 'housewares',
+    'relogios_presentes': 'watches_gifts',
+    'telefonia': 'telephony',
+    'automotivo': 'auto',
+    'fashion_bolsas_e_acessorios': 'fashion_bags_accessories',
+}
+
+# Zip-prefix ranges per state (simplified), used to place customers and sellers
+SAMPLE_STATE_ZIP_RANGES = [
+    ('SP', 1000, 19999, -23.5, -46.6),
+    ('RJ', 20000, 28999, -22.9, -43.2),
+    ('ES', 29000, 29999, -20.3, -40.3),
+    ('MG', 30000, 39999, -19.9, -43.9),
+    ('BA', 40000, 48999, -12.9, -38.5),
+    ('PE', 50000, 56999, -8.0, -34.9),
+    ('CE', 60000, 63999, -3.7, -38.5),
+    ('DF', 70000, 73699, -15.8, -47.9),
+    ('PR', 80000, 87999, -25.4, -49.3),
+    ('SC', 88000, 89999, -27.6, -48.5),
+    ('RS', 90000, 99999, -30.0, -51.2),
+]
+
+SAMPLE_START = np.datetime64('2016-09-04T00:00:00', 's')
+SAMPLE_SPAN_SECONDS = 760 * 24 * 3600
+
+
+def _id_dtype(prefix, numbers):
+    """ID dictionary ('order_17', ...) for a range of integer IDs, built without a Python loop"""
+    return pd.CategoricalDtype(np.char.add(prefix, np.asarray(numbers).astype(str)))
+
+
+def _coded(codes, labels):
+    """Categorical column whose codes point into a shared dictionary"""
+    dtype = labels if isinstance(labels, pd.CategoricalDtype) else pd.CategoricalDtype(labels)
+    return pd.Categorical.from_codes(codes, dtype=dtype)
+
+
+def _id_column(prefix, numbers):
+    """Categorical ID column holding only the IDs present in `numbers`
+
+    Used for IDs drawn at random from a large space, so a chunk never
+    materializes the labels of the whole entity.
+    """
+    uniques, codes = np.unique(numbers, return_inverse=True)
+    return _coded(codes.astype(np.int32), _id_dtype(prefix, uniques))
+
+
+def _days(rng, mean, size, shape=2.0):
+    """Gamma-distributed durations (in seconds) with the given mean in days"""
+    return (rng.gamma(shape, mean / shape, size) * 86400).astype('timedelta64[s]')
+
+
+def _sample_dimensions(rng, n_orders):
+    """Products, sellers, geolocation and category translation"""
+    n_products = max(10, n_orders // 3)
+    n_sellers = max(10, n_orders // 33)
+    n_prefixes = min(19000, max(100, n_orders // 5))
+
+    states = np.array([r[0] for r in SAMPLE_STATE_ZIP_RANGES], dtype=object)
+    state_weights = np.array([0.42, 0.13, 0.02, 0.12, 0.03, 0.02, 0.01, 0.02, 0.05, 0.04, 0.14])
+    state_code = rng.choice(len(states), n_prefixes, p=state_weights / state_weights.sum())
+    low = np.array([r[1] for r in SAMPLE_STATE_ZIP_RANGES])[state_code]
+    high = np.array([r[2] for r in SAMPLE_STATE_ZIP_RANGES])[state_code]
+    prefixes, unique_idx = np.unique(rng.integers(low, high + 1), return_index=True)
+    state_code = state_code[unique_idx]
+    centre_lat = np.array([r[3] for r in SAMPLE_STATE_ZIP_RANGES])[state_code] + rng.normal(0, 1.0, len(prefixes))
+    centre_lng = np.array([r[4] for r in SAMPLE_STATE_ZIP_RANGES])[state_code] + rng.normal(0, 1.0, len(prefixes))
+
+    # Several rows per prefix, jittered around the prefix centre (as in the real dataset)
+    geo_idx = rng.integers(0, len(prefixes), len(prefixes) * 5)
+    geolocation = pd.DataFrame({
+        'geolocation_zip_code_prefix': prefixes[geo_idx].astype(np.int32),
+        'geolocation_lat': centre_lat[geo_idx] + rng.normal(0, 0.02, len(geo_idx)),
+        'geolocation_lng': centre_lng[geo_idx] + rng.normal(0, 0.02, len(geo_idx)),
+        'geolocation_city': _coded(np.zeros(len(geo_idx), dtype=np.int8), ['São Paulo']),
+        'geolocation_state': _coded(state_code[geo_idx], states),
     })
-    
-    # Generate sample order items
-    n_items = n_orders * 2  # Average 2 items per order
-    order_items = pd.DataFrame({
-        'order_id': [f'order_{np.random.randint(0, n_orders)}' for _ in range(n_items)],
-        'order_item_id': range(1, n_items + 1),
-        'product_id': [f'product_{np.random.randint(0, n_products)}' for _ in range(n_items)],
-        'seller_id': [f'seller_{np.random.randint(0, 100)}' for _ in range(n_items)],
-        'shipping_limit_date': [datetime.now() + timedelta(days=np.random.randint(1, 10)) for _ in range(n_items)],
-        'price': np.random.uniform(10, 500, n_items),
-        'freight_value': np.random.uniform(5, 50, n_items)
+
+    categories = np.array(list(SAMPLE_CATEGORIES), dtype=object)
+    category_code = rng.integers(0, len(categories), n_products)
+    # About 2% of products have no category, as in the real dataset
+    category_code[rng.random(n_products) < 0.02] = -1
+    products = pd.DataFrame({
+        'product_id': _id_column('product_', np.arange(n_products)),
+        'product_category_name': _coded(category_code, categories),
+        'product_name_lenght': rng.integers(10, 100, n_products).astype(np.float32),
+        'product_description_lenght': rng.integers(100, 1000, n_products).astype(np.float32),
+        'product_photos_qty': rng.integers(1, 10, n_products).astype(np.float32),
+        'product_weight_g': rng.integers(100, 5000, n_products).astype(np.float32),
+        'product_length_cm': rng.integers(5, 100, n_products).astype(np.float32),
+        'product_height_cm': rng.integers(5, 50, n_products).astype(np.float32),
+        'product_width_cm': rng.integers(5, 50, n_products).astype(np.float32),
     })
-    
-    # Generate sample payments
-    order_payments = pd.DataFrame({
-        'order_id': [f'order_{i}' for i in range(n_orders)],
-        'payment_sequential': np.ones(n_orders),
-        'payment_type': np.random.choice(['credit_card', 'boleto', 'debit_card', 'voucher'], n_orders, p=[0.7, 0.2, 0.08, 0.02]),
-        'payment_installments': np.random.choice([1, 2, 3, 4, 5, 6], n_orders, p=[0.4, 0.2, 0.15, 0.1, 0.1, 0.05]),
-        'payment_value': np.random.uniform(20, 600, n_orders)
+
+    seller_prefix = rng.integers(0, len(prefixes), n_sellers)
+    sellers = pd.DataFrame({
+        'seller_id': _id_column('seller_', np.arange(n_sellers)),
+        'seller_zip_code_prefix': prefixes[seller_prefix].astype(np.int32),
+        'seller_city': _coded(np.zeros(n_sellers, dtype=np.int8), ['São Paulo']),
+        'seller_state': _coded(state_code[seller_prefix], states),
     })
-    
-    # Generate sample reviews
-    order_reviews = pd.DataFrame({
-        'review_id': [f'review_{i}' for i in range(n_orders)],
-        'order_id': [f'order_{i}' for i in range(n_orders)],
-        'review_score': np.random.choice([1, 2, 3, 4, 5], n_orders, p=[0.05, 0.05, 0.15, 0.25, 0.5]),
-        'review_comment_title': [''] * n_orders,
-        'review_comment_message': [''] * n_orders,
-        'review_creation_date': [datetime.now() - timedelta(days=np.random.randint(0, 30)) for _ in range(n_orders)],
-        'review_answer_timestamp': [datetime.now() - timedelta(days=np.random.randint(0, 25)) for _ in range(n_orders)]
+
+    category_translation = pd.DataFrame({
+        'product_category_name': list(SAMPLE_CATEGORIES),
+        'product_category_name_english': list(SAMPLE_CATEGORIES.values()),
     })
-    
-    # Generate sample products
-    categories = ['bed_bath_table', 'health_beauty', 'sports_leisure', 'computer_accessories', 
-                  'furniture_decor', 'housewares', 'watches_gifts', 'telephony', 'auto', 
-                  'fashion_bags_accessories']
-    
-    products = pd.DataFrame({
-        'product_id': [f'product_{i}' for i in range(n_products)],
-        'product_category_name': np.random.choice(categories, n_products),
-        'product_name_lenght': np.random.randint(10, 100, n_products),
-        'product_description_lenght': np.random.randint(100, 1000, n_products),
-        'product_photos_qty': np.random.randint(1, 10, n_products),
-        'product_weight_g': np.random.randint(100, 5000, n_products),
-        'product_length_cm': np.random.randint(5, 100, n_products),
-        'product_height_cm': np.random.randint(5, 50, n_products),
-        'product_width_cm': np.random.randint(5, 50, n_products)
+
+    return {
+        'products': products,
+        'sellers': sellers,
+        'geolocation': geolocation,
+        'category_translation': category_translation,
+    }, (prefixes, state_code, states)
+
+
+def _sample_orders(rng, start, stop, dimensions, zip_info, n_unique_customers):
+    """Orders [start, stop) with their customers, items, payments and reviews"""
+    n = stop - start
+    n_products = len(dimensions['products'])
+    n_sellers = len(dimensions['sellers'])
+    prefixes, state_code, states = zip_info
+    # One dictionary per entity, shared by every table of the chunk
+    order_dtype = _id_dtype('order_', np.arange(start, stop))
+    product_dtype = dimensions['products']['product_id'].dtype
+    seller_dtype = dimensions['sellers']['seller_id'].dtype
+
+    # Causally ordered timestamps: purchase <= approval <= carrier <= delivery
+    purchase = SAMPLE_START + rng.integers(0, SAMPLE_SPAN_SECONDS, n).astype('timedelta64[s]')
+    approved = purchase + (rng.exponential(10 * 3600, n)).astype('timedelta64[s]')
+    carrier = approved + _days(rng, 3, n)
+    delivered = carrier + _days(rng, 9, n)
+    estimated_days = np.clip(np.rint(rng.normal(24, 8, n)), 3, None).astype('timedelta64[D]')
+    estimated = purchase.astype('datetime64[D]') + estimated_days
+
+    status_names = np.array(['delivered', 'shipped', 'canceled', 'unavailable', 'invoiced',
+                             'processing', 'created', 'approved'], dtype=object)
+    status = rng.choice(len(status_names), n, p=[0.97, 0.011, 0.006, 0.006, 0.003, 0.003, 0.0005, 0.0005])
+    not_delivered = status != 0
+    delivered[not_delivered] = np.datetime64('NaT')
+    carrier[(status != 0) & (status != 1)] = np.datetime64('NaT')
+
+    orders = pd.DataFrame({
+        'order_id': _coded(np.arange(n), order_dtype),
+        'customer_id': _coded(np.arange(n), _id_dtype('customer_', np.arange(start, stop))),
+        'order_status': _coded(status, status_names),
+        'order_purchase_timestamp': purchase,
+        'order_approved_at': approved,
+        'order_delivered_carrier_date': carrier,
+        'order_delivered_customer_date': delivered,
+        'order_estimated_delivery_date': estimated.astype('datetime64[s]'),
     })
-    
-    # Generate other datasets (minimal)
+
+    # One customer_id per order, as in Olist; customer_unique_id repeats
+    customer_prefix = rng.integers(0, len(prefixes), n)
     customers = pd.DataFrame({
-        'customer_id': [f'customer_{i}' for i in range(n_customers)],
-        'customer_unique_id': [f'unique_customer_{i}' for i in range(n_customers)],
-        'customer_zip_code_prefix': np.random.randint(10000, 99999, n_customers),
-        'customer_city': ['São Paulo'] * n_customers,
-        'customer_state': ['SP'] * n_customers
+        'customer_id': orders['customer_id'],
+        'customer_unique_id': _id_column('unique_customer_', rng.integers(0, n_unique_customers, n)),
+        'customer_zip_code_prefix': prefixes[customer_prefix].astype(np.int32),
+        'customer_city': _coded(np.zeros(n, dtype=np.int8), ['São Paulo']),
+        'customer_state': _coded(state_code[customer_prefix], states),
     })
-    
-    sellers = pd.DataFrame({
-        'seller_id': [f'seller_{i}' for i in range(100)],
-        'seller_zip_code_prefix': np.random.randint(10000, 99999, 100),
-        'seller_city': ['São Paulo'] * 100,
-        'seller_state': ['SP'] * 100
+
+    # Items: geometric number of items per order (at least one), numbered within the order
+    items_per_order = rng.geometric(0.87, n)
+    item_order = np.repeat(np.arange(n), items_per_order)
+    first_row = np.cumsum(items_per_order) - items_per_order
+    n_items = len(item_order)
+    price = np.round(rng.lognormal(np.log(80), 0.9, n_items), 2)
+    freight = np.round(rng.lognormal(np.log(17), 0.5, n_items), 2)
+    order_items = pd.DataFrame({
+        'order_id': _coded(item_order, order_dtype),
+        'order_item_id': (np.arange(n_items) - first_row[item_order] + 1).astype(np.int16),
+        'product_id': _coded(rng.integers(0, n_products, n_items), product_dtype),
+        'seller_id': _coded(rng.integers(0, n_sellers, n_items), seller_dtype),
+        'shipping_limit_date': purchase[item_order] + np.timedelta64(6, 'D'),
+        'price': price,
+        'freight_value': freight.astype(np.float32),
     })
-    
-    geolocation = pd.DataFrame({
-        'geolocation_zip_code_prefix': np.random.randint(10000, 99999, 1000),
-        'geolocation_lat': np.random.uniform(-30, -10, 1000),
-        'geolocation_lng': np.random.uniform(-60, -40, 1000),
-        'geolocation_city': ['São Paulo'] * 1000,
-        'geolocation_state': ['SP'] * 1000
+
+    # Payments: the order total, split across vouchers for ~3% of orders
+    order_total = np.bincount(item_order, weights=price + freight, minlength=n)
+    payments_per_order = 1 + (rng.random(n) < 0.03) * rng.integers(1, 3, n)
+    pay_order = np.repeat(np.arange(n), payments_per_order)
+    pay_first = np.cumsum(payments_per_order) - payments_per_order
+    sequential = np.arange(len(pay_order)) - pay_first[pay_order] + 1
+    weights = rng.random(len(pay_order)) + 0.1
+    share = weights / np.bincount(pay_order, weights=weights, minlength=n)[pay_order]
+    payment_types = np.array(['credit_card', 'boleto', 'voucher', 'debit_card'], dtype=object)
+    type_code = rng.choice(4, len(pay_order), p=[0.74, 0.19, 0.055, 0.015])
+    type_code[sequential > 1] = 2
+    installments = np.where(type_code == 0, rng.integers(1, 11, len(pay_order)), 1)
+    order_payments = pd.DataFrame({
+        'order_id': _coded(pay_order, order_dtype),
+        'payment_sequential': sequential.astype(np.int16),
+        'payment_type': _coded(type_code, payment_types),
+        'payment_installments': installments.astype(np.int16),
+        'payment_value': np.round(order_total[pay_order] * share, 2),
     })
-    
-    category_translation = pd.DataFrame({
-        'product_category_name': categories,
-        'product_category_name_english': [
-            'bed_bath_table', 'health_beauty', 'sports_leisure', 'computer_accessories',
-            'furniture_decor', 'housewares', 'watches_gifts', 'telephony', 'auto',
-            'fashion_bags_accessories'
-        ]
+
+    # Reviews: ~99% of orders; late deliveries get lower scores
+    reviewed = np.flatnonzero(rng.random(n) < 0.99)
+    score = rng.choice([1, 2, 3, 4, 5], len(reviewed), p=[0.1, 0.03, 0.08, 0.19, 0.6])
+    late = (delivered[reviewed] > estimated[reviewed].astype('datetime64[s]'))
+    score[late] = np.maximum(1, score[late] - rng.integers(1, 4, late.sum()))
+    reference = np.where(np.isnat(delivered[reviewed]), estimated[reviewed].astype('datetime64[s]'),
+                         delivered[reviewed])
+    creation = reference.astype('datetime64[D]').astype('datetime64[s]') + np.timedelta64(1, 'D')
+    order_reviews = pd.DataFrame({
+        'review_id': _coded(np.arange(len(reviewed)), _id_dtype('review_', start + reviewed)),
+        'order_id': _coded(reviewed, order_dtype),
+        'review_score': score.astype(np.int8),
+        'review_comment_title': pd.Series([pd.NA] * len(reviewed), dtype='string'),
+        'review_comment_message': pd.Series([pd.NA] * len(reviewed), dtype='string'),
+        'review_creation_date': creation,
+        'review_answer_timestamp': creation + _days(rng, 2, len(reviewed), shape=1.0),
     })
-    
+
     return {
         'orders': orders,
         'order_items': order_items,
         'order_payments': order_payments,
         'order_reviews': order_reviews,
-        'products': products,
         'customers': customers,
-        'sellers': sellers,
-        'geolocation': geolocation,
-        'category_translation': category_translation
     }
 
+
+def _write_sample_chunk(name, df, output_dir, fmt, writers):
+    """Append one chunk of a table to its CSV or Parquet file"""
+    base = os.path.splitext(TABLE_SCHEMAS[name]['file'])[0]
+    path = os.path.join(output_dir, f"{base}.{fmt}")
+    if fmt == 'csv':
+        df.to_csv(path, mode='a' if name in writers else 'w', header=name not in writers,
+                  index=False, date_format=OLIST_DATETIME_FORMAT)
+        writers[name] = path
+        return
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Plain strings keep the Parquet schema identical across chunks
+    df = df.astype({col: object for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if name not in writers:
+        writers[name] = pq.ParquetWriter(path, table.schema)
+    writers[name].write_table(table)
+
+
+def create_sample_data(n_orders=1000, seed=42, output_dir=None, fmt='csv', chunk_size=1_000_000):
+    """Create synthetic Olist datasets
+
+    The generator is fully vectorized and seeded through np.random.Generator.
+    Cardinalities follow the real dataset (one customer_id per order, about a
+    third as many products, 1/33 as many sellers), timestamps are causally
+    ordered datetime64 columns, and ID columns are categoricals over shared
+    per-entity ID dictionaries.
+
+    Parameters:
+    n_orders (int): Number of orders
+    seed (int): Random seed
+    output_dir (str): When given, write the tables there chunk by chunk
+        instead of returning them, so memory stays bounded by chunk_size
+    fmt (str): 'csv' or 'parquet' (parquet requires pyarrow)
+    chunk_size (int): Orders generated per chunk when writing to output_dir
+
+    Returns:
+    dict: {table: DataFrame}, or {table: path} when output_dir is given
+    """
+    rng = np.random.default_rng(seed)
+    dimensions, zip_info = _sample_dimensions(rng, n_orders)
+    n_unique_customers = max(1, int(n_orders * 0.97))
+
+    if output_dir is None:
+        datasets = _sample_orders(rng, 0, n_orders, dimensions, zip_info, n_unique_customers)
+        datasets.update(dimensions)
+        return {name: apply_schema(name, datasets[name]) for name in TABLE_SCHEMAS}
+
+    if fmt not in ('csv', 'parquet'):
+        raise ValueError(f"Unsupported format: {fmt}")
+    os.makedirs(output_dir, exist_ok=True)
+    writers = {}
+    try:
+        for name, df in dimensions.items():
+            _write_sample_chunk(name, df, output_dir, fmt, writers)
+        for start in range(0, n_orders, chunk_size):
+            stop = min(start + chunk_size, n_orders)
+            chunk = _sample_orders(rng, start, stop, dimensions, zip_info, n_unique_customers)
+            for name, df in chunk.items():
+                _write_sample_chunk(name, df, output_dir, fmt, writers)
+    finally:
+        if fmt == 'parquet':
+            for writer in writers.values():
+                writer.close()
+    base = {name: os.path.splitext(TABLE_SCHEMAS[name]['file'])[0] for name in TABLE_SCHEMAS}
+    return {name: os.path.join(output_dir, f"{base[name]}.{fmt}") for name in TABLE_SCHEMAS}
+
 if __name__ == "__main__":
     datasets = load_data()
     print("Available datasets:", list(datasets.keys()))
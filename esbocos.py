@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Esboços combináveis para a pergunta 4 em volumes muito grandes
+
+Cada esboço ocupa memória limitada, independente do número de avaliações,
+e dois esboços construídos em partes diferentes dos dados (arquivos, processos,
+janelas de tempo) são combinados em um esboço do conjunto:
+
+- EsbocoQuantis: quantis aproximados (KLL) com erro de posição configurável;
+- Momentos e Comomentos: média, variância e correlação exatas (Welford,
+  combinadas pela fórmula de Chan);
+- Reservatorio: amostra aleatória uniforme de tamanho fixo para os gráficos.
+
+EsbocoTempoAvaliacao reúne os três por nota de avaliação e segue a interface
+dos agregados de analise_streaming (atualizar, combinar, para_dict, de_dict,
+resultado). Como os esboços de quantis não admitem remoção, não há remover().
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+# Erro de posição normalizado do KLL (confiança de 99%) ≈ COEF / k ** EXP,
+# ajuste empírico da biblioteca DataSketches para consultas de um único quantil
+_KLL_COEF = 2.296
+_KLL_EXP = 0.9723
+# Capacidade dos níveis: decai por _KLL_DECAIMENTO a cada nível abaixo do topo
+_KLL_DECAIMENTO = 2 / 3
+_KLL_CAPACIDADE_MINIMA = 8
+
+
+def k_para_erro(erro):
+    """Menor k do EsbocoQuantis cujo erro de posição não passa de `erro` (ex.: 0.01 = 1%)"""
+    if not 0 < erro < 1:
+        raise ValueError(f"erro deve estar em (0, 1), não {erro!r}")
+    return max(_KLL_CAPACIDADE_MINIMA, math.ceil((_KLL_COEF / erro) ** (1 / _KLL_EXP)))
+
+
+class EsbocoQuantis:
+    """
+    Esboço KLL de quantis
+
+    Os valores entram no nível 0; quando um nível excede sua capacidade, é
+    ordenado e metade dos itens (posições pares ou ímpares, ao acaso) sobe para
+    o nível seguinte com o dobro do peso. O erro de posição de um quantil é
+    limitado por erro_rank com alta probabilidade.
+
+    Parameters:
+    k (int): Capacidade do nível mais alto (ver k_para_erro)
+    semente (int): Semente do gerador aleatório das compactações
+    """
+
+    def __init__(self, k=200, semente=None):
+        self.k = k
+        self.n = 0
+        self.minimo = np.inf
+        self.maximo = -np.inf
+        # niveis[h]: itens com peso 2 ** h
+        self.niveis = [np.empty(0)]
+        self._rng = np.random.default_rng(semente)
+
+    @property
+    def erro_rank(self):
+        """Erro de posição normalizado (fração de n) de um quantil"""
+        return _KLL_COEF / self.k ** _KLL_EXP
+
+    def _capacidade(self, nivel):
+        profundidade = len(self.niveis) - 1 - nivel
+        return max(_KLL_CAPACIDADE_MINIMA, math.ceil(self.k * _KLL_DECAIMENTO ** profundidade))
+
+    def _compactar(self):
+        while True:
+            acima = [h for h, itens in enumerate(self.niveis) if len(itens) > self._capacidade(h)]
+            if not acima:
+                return
+            nivel = acima[0]
+            if nivel + 1 == len(self.niveis):
+                self.niveis.append(np.empty(0))
+            itens = np.sort(self.niveis[nivel])
+            # Com quantidade ímpar, um item fica no nível para preservar o peso total
+            resto, itens = (itens[:1], itens[1:]) if len(itens) % 2 else (itens[:0], itens)
+            self.niveis[nivel] = resto
+            self.niveis[nivel + 1] = np.concatenate([self.niveis[nivel + 1],
+                                                     itens[self._rng.integers(2)::2]])
+
+    def atualizar(self, valores):
+        valores = np.asarray(valores, dtype=np.float64).ravel()
+        valores = valores[~np.isnan(valores)]
+        if len(valores) == 0:
+            return self
+        self.n += len(valores)
+        self.minimo = min(self.minimo, valores.min())
+        self.maximo = max(self.maximo, valores.max())
+        self.niveis[0] = np.concatenate([self.niveis[0], valores])
+        self._compactar()
+        return self
+
+    def combinar(self, outro):
+        """Junta os níveis de `outro` (de mesmo peso) e recompacta; o k menor prevalece"""
+        self.k = min(self.k, outro.k)
+        self.n += outro.n
+        self.minimo = min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+        while len(self.niveis) < len(outro.niveis):
+            self.niveis.append(np.empty(0))
+        for nivel, itens in enumerate(outro.niveis):
+            self.niveis[nivel] = np.concatenate([self.niveis[nivel], itens])
+        self._compactar()
+        return self
+
+    def quantis(self, qs):
+        """Quantis aproximados (primeiro valor cuja posição acumulada atinge q * n)"""
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+        valores = np.concatenate(self.niveis)
+        pesos = np.concatenate([np.full(len(itens), 2.0 ** h) for h, itens in enumerate(self.niveis)])
+        ordem = np.argsort(valores, kind='stable')
+        valores, acumulado = valores[ordem], np.cumsum(pesos[ordem])
+        posicao = np.searchsorted(acumulado, qs * acumulado[-1], side='left').clip(max=len(valores) - 1)
+        resultado = valores[posicao]
+        # Extremos conhecidos exatamente
+        resultado[qs <= 0] = self.minimo
+        resultado[qs >= 1] = self.maximo
+        return resultado
+
+    def quantil(self, q):
+        return float(self.quantis([q])[0])
+
+    def para_dict(self):
+        return {'k': self.k, 'n': self.n, 'minimo': float(self.minimo), 'maximo': float(self.maximo),
+                'niveis': [itens.tolist() for itens in self.niveis]}
+
+    @classmethod
+    def de_dict(cls, estado):
+        esboco = cls(k=estado['k'])
+        esboco.n = estado['n']
+        esboco.minimo, esboco.maximo = estado['minimo'], estado['maximo']
+        esboco.niveis = [np.array(itens, dtype=np.float64) for itens in estado['niveis']]
+        return esboco
+
+
+class Momentos:
+    """Quantidade, média e soma dos quadrados dos desvios (Welford/Chan), combináveis"""
+
+    def __init__(self):
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+
+    def _juntar(self, n, media, m2):
+        if n == 0:
+            return self
+        total = self.n + n
+        delta = media - self.media
+        self.media += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+        return self
+
+    def atualizar(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        if len(valores) == 0:
+            return self
+        media = valores.mean()
+        return self._juntar(len(valores), media, ((valores - media) ** 2).sum())
+
+    def combinar(self, outro):
+        return self._juntar(outro.n, outro.media, outro.m2)
+
+    @property
+    def desvio(self):
+        """Desvio padrão amostral (ddof=1), como no pandas"""
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else np.nan
+
+    def para_dict(self):
+        return {'n': self.n, 'media': self.media, 'm2': self.m2}
+
+    @classmethod
+    def de_dict(cls, estado):
+        return cls()._juntar(estado['n'], estado['media'], estado['m2'])
+
+
+class Comomentos:
+    """Momentos conjuntos de (x, y) para a correlação de Pearson, combináveis"""
+
+    def __init__(self):
+        self.x = Momentos()
+        self.y = Momentos()
+        self.cxy = 0.0
+
+    def _juntar(self, x, y, cxy):
+        n_a, n_b = self.x.n, x.n
+        if n_b == 0:
+            return self
+        self.cxy += cxy + (x.media - self.x.media) * (y.media - self.y.media) * n_a * n_b / (n_a + n_b)
+        self.x.combinar(x)
+        self.y.combinar(y)
+        return self
+
+    def atualizar(self, x, y):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if len(x) == 0:
+            return self
+        lote_x, lote_y = Momentos().atualizar(x), Momentos().atualizar(y)
+        return self._juntar(lote_x, lote_y, ((x - lote_x.media) * (y - lote_y.media)).sum())
+
+    def combinar(self, outro):
+        return self._juntar(outro.x, outro.y, outro.cxy)
+
+    @property
+    def correlacao(self):
+        denominador = math.sqrt(self.x.m2 * self.y.m2)
+        return self.cxy / denominador if denominador > 0 else np.nan
+
+    def para_dict(self):
+        return {'x': self.x.para_dict(), 'y': self.y.para_dict(), 'cxy': self.cxy}
+
+    @classmethod
+    def de_dict(cls, estado):
+        comomentos = cls()
+        comomentos.x, comomentos.y = Momentos.de_dict(estado['x']), Momentos.de_dict(estado['y'])
+        comomentos.cxy = estado['cxy']
+        return comomentos
+
+
+class Reservatorio:
+    """
+    Amostra aleatória uniforme de até `tamanho` linhas de um fluxo (algoritmo R)
+
+    Parameters:
+    tamanho (int): Linhas mantidas na amostra
+    semente (int): Semente do gerador aleatório
+    """
+
+    def __init__(self, tamanho=10_000, semente=None):
+        self.tamanho = tamanho
+        self.n = 0
+        self.amostra = None
+        self._rng = np.random.default_rng(semente)
+
+    def atualizar(self, linhas):
+        linhas = np.asarray(linhas, dtype=np.float64)
+        if linhas.ndim == 1:
+            linhas = linhas.reshape(-1, 1)
+        if self.amostra is None:
+            self.amostra = np.empty((0, linhas.shape[1]))
+        # Enquanto a amostra não está cheia, todas as linhas entram
+        livres = self.tamanho - len(self.amostra)
+        if livres > 0:
+            self.amostra = np.concatenate([self.amostra, linhas[:livres]])
+            self.n += len(linhas[:livres])
+            linhas = linhas[livres:]
+        if len(linhas):
+            # A i-ésima linha do fluxo (1-based) substitui uma posição ao acaso com probabilidade tamanho / i
+            posicoes = self.n + 1 + np.arange(len(linhas))
+            sorteio = (self._rng.random(len(linhas)) * posicoes).astype(np.int64)
+            aceitas = sorteio < self.tamanho
+            # Entre substituições da mesma posição, vale a última
+            destino, origem = sorteio[aceitas][::-1], linhas[aceitas][::-1]
+            destino, primeira = np.unique(destino, return_index=True)
+            self.amostra[destino] = origem[primeira]
+            self.n += len(linhas)
+        return self
+
+    def combinar(self, outro):
+        """Amostra uniforme da união: quantas linhas vêm de cada lado segue a hipergeométrica"""
+        if outro.n == 0:
+            return self
+        if self.n == 0:
+            self.amostra, self.n = outro.amostra[:self.tamanho].copy(), outro.n
+            return self
+        tamanho = min(self.tamanho, len(self.amostra) + len(outro.amostra))
+        deste = self._rng.hypergeometric(self.n, outro.n, tamanho)
+        deste = min(max(deste, tamanho - len(outro.amostra)), len(self.amostra))
+        self.amostra = np.concatenate([
+            self.amostra[self._rng.choice(len(self.amostra), deste, replace=False)],
+            outro.amostra[self._rng.choice(len(outro.amostra), tamanho - deste, replace=False)],
+        ])
+        self.n += outro.n
+        return self
+
+    def para_dict(self):
+        return {'tamanho': self.tamanho, 'n': self.n,
+                'colunas': None if self.amostra is None else self.amostra.shape[1],
+                'amostra': None if self.amostra is None else self.amostra.tolist()}
+
+    @classmethod
+    def de_dict(cls, estado):
+        reservatorio = cls(tamanho=estado['tamanho'])
+        reservatorio.n = estado['n']
+        if estado['amostra'] is not None:
+            reservatorio.amostra = np.array(estado['amostra'], dtype=np.float64).reshape(-1, estado['colunas'])
+        return reservatorio
+
+
+class EsbocoTempoAvaliacao:
+    """
+    Pergunta 4 aproximada: quantis (KLL) e momentos por nota, correlação e amostra
+
+    Média, desvio padrão e correlação são exatos; apenas as medianas (e os
+    quartis do boxplot) são aproximados, com erro de posição de até `erro`.
+
+    Parameters:
+    erro (float): Erro de posição tolerado nos quantis (0.01 = 1% das avaliações da nota)
+    tamanho_amostra (int): Pares (dias, nota) mantidos para o gráfico de dispersão
+    semente (int): Semente dos geradores aleatórios
+    """
+
+    def __init__(self, erro=0.01, tamanho_amostra=10_000, semente=None):
+        self.erro = erro
+        self.semente = semente
+        self.k = k_para_erro(erro)
+        self.quantis = {}
+        self.momentos = {}
+        self.comomentos = Comomentos()
+        self.amostra = Reservatorio(tamanho_amostra, semente)
+
+    def atualizar(self, delivered_reviews):
+        if len(delivered_reviews) == 0:
+            return self
+        dias = delivered_reviews['tempo_entrega_dias'].to_numpy(dtype=np.float64)
+        notas = delivered_reviews['review_score'].to_numpy(dtype=np.int64)
+        # Uma ordenação pela nota, em vez de um filtro por nota
+        ordem = np.argsort(notas, kind='stable')
+        unicas, inicios = np.unique(notas[ordem], return_index=True)
+        for nota, bloco in zip(unicas.tolist(), np.split(dias[ordem], inicios[1:])):
+            if nota not in self.quantis:
+                self.quantis[nota] = EsbocoQuantis(self.k, self.semente)
+                self.momentos[nota] = Momentos()
+            self.quantis[nota].atualizar(bloco)
+            self.momentos[nota].atualizar(bloco)
+        self.comomentos.atualizar(dias, notas)
+        self.amostra.atualizar(np.column_stack([dias, notas]))
+        return self
+
+    def combinar(self, outro):
+        for nota, esboco in outro.quantis.items():
+            if nota in self.quantis:
+                self.quantis[nota].combinar(esboco)
+                self.momentos[nota].combinar(outro.momentos[nota])
+            else:
+                self.quantis[nota] = EsbocoQuantis(esboco.k, self.semente).combinar(esboco)
+                self.momentos[nota] = Momentos().combinar(outro.momentos[nota])
+        self.comomentos.combinar(outro.comomentos)
+        self.amostra.combinar(outro.amostra)
+        return self
+
+    def para_dict(self):
+        return {'erro': self.erro,
+                'quantis': {str(nota): esboco.para_dict() for nota, esboco in self.quantis.items()},
+                'momentos': {str(nota): m.para_dict() for nota, m in self.momentos.items()},
+                'comomentos': self.comomentos.para_dict(),
+                'amostra': self.amostra.para_dict()}
+
+    @classmethod
+    def de_dict(cls, estado):
+        esboco = cls(erro=estado['erro'], tamanho_amostra=estado['amostra']['tamanho'])
+        esboco.quantis = {int(nota): EsbocoQuantis.de_dict(q) for nota, q in estado['quantis'].items()}
+        esboco.momentos = {int(nota): Momentos.de_dict(m) for nota, m in estado['momentos'].items()}
+        esboco.comomentos = Comomentos.de_dict(estado['comomentos'])
+        esboco.amostra = Reservatorio.de_dict(estado['amostra'])
+        return esboco
+
+    def dados_amostra(self):
+        """Amostra como DataFrame (tempo_entrega_dias, review_score) para os gráficos"""
+        amostra = self.amostra.amostra if self.amostra.amostra is not None else np.empty((0, 2))
+        return pd.DataFrame({'tempo_entrega_dias': amostra[:, 0].astype(np.int64),
+                             'review_score': amostra[:, 1].astype(np.int8)})
+
+    def estatisticas_boxplot(self):
+        """Estatísticas por nota no formato de matplotlib.axes.Axes.bxp (sem outliers)"""
+        caixas = []
+        for nota in sorted(self.quantis):
+            esboco = self.quantis[nota]
+            if esboco.n == 0:
+                continue
+            q1, mediana, q3 = esboco.quantis([0.25, 0.5, 0.75])
+            alcance = 1.5 * (q3 - q1)
+            caixas.append({'label': nota, 'med': mediana, 'q1': q1, 'q3': q3,
+                           'whislo': max(esboco.minimo, q1 - alcance),
+                           'whishi': min(esboco.maximo, q3 + alcance), 'fliers': []})
+        return caixas
+
+    def resultado(self):
+        n = self.comomentos.x.n
+        if n == 0:
+            return None
+        linhas, intervalos = {}, {}
+        for nota in sorted(self.quantis):
+            esboco, momentos = self.quantis[nota], self.momentos[nota]
+            if momentos.n == 0:
+                continue
+            erro = esboco.erro_rank
+            inferior, mediana, superior = esboco.quantis([max(0.5 - erro, 0.0), 0.5, min(0.5 + erro, 1.0)])
+            linhas[nota] = {'count': momentos.n, 'mean': momentos.media,
+                            'median': mediana, 'std': momentos.desvio}
+            intervalos[nota] = {'inferior': inferior, 'superior': superior}
+        stats_by_score = pd.DataFrame.from_dict(linhas, orient='index').round(2)
+        stats_by_score.index.name = 'review_score'
+        intervalo_mediana = pd.DataFrame.from_dict(intervalos, orient='index')
+        intervalo_mediana.index.name = 'review_score'
+        return {
+            'total_avaliacoes': n,
+            'correlacao': self.comomentos.correlacao,
+            'stats_by_score': stats_by_score,
+            'tempo_medio_geral': self.comomentos.x.media,
+            # Limites do erro: posição do quantil e faixa de valores da mediana
+            'erro_rank': max((q.erro_rank for q in self.quantis.values()), default=np.nan),
+            'intervalo_mediana': intervalo_mediana,
+        }
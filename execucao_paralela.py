@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Execução paralela das perguntas do Olist
+
+Cada pergunta (cálculo e gráfico) roda em um processo separado. As tabelas
+compartilhadas são gravadas uma única vez em arquivos Feather sem compressão,
+que os processos abrem com memory-mapping em vez de recebê-las via pickle.
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from data_loader import ANALYSIS_COLUMNS
+
+# Perguntas executadas por padrão; as demais análises de ANALYSIS_COLUMNS
+# (distancia_entregas, ranking_categorias, tendencias) entram via `perguntas`
+PERGUNTAS = (
+    'pergunta_1_entregas_atrasadas',
+    'pergunta_2_metodo_pagamento',
+    'pergunta_3_top_categorias',
+    'pergunta_4_tempo_entrega_avaliacao',
+)
+
+
+def _feather_disponivel():
+    try:
+        import pyarrow.feather  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _gravar_tabelas(datasets, tabelas, diretorio):
+    """Grava as tabelas necessárias em Feather e devolve {tabela: caminho}"""
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    caminhos = {}
+    for nome, colunas in tabelas.items():
+        df = datasets[nome]
+        colunas = [c for c in colunas if c in df.columns]
+        caminho = os.path.join(diretorio, f"{nome}.feather")
+        feather.write_feather(pa.Table.from_pandas(df[colunas], preserve_index=False), caminho,
+                              compression='uncompressed')
+        caminhos[nome] = caminho
+    return caminhos
+
+
+def _abrir_tabelas(tabelas):
+    """Abre as tabelas de um processo: caminhos Feather ou DataFrames já prontos"""
+    import pyarrow.feather as feather
+
+    return {
+        nome: feather.read_table(origem, memory_map=True).to_pandas() if isinstance(origem, str) else origem
+        for nome, origem in tabelas.items()
+    }
+
+
+def _executar_pergunta(metodo, tabelas):
+    """Roda uma pergunta em um processo do pool e devolve (resultados, saída)"""
+    import matplotlib
+    matplotlib.use('Agg')
+    from analise_olist import OlistAnalysis, setup_matplotlib
+
+    setup_matplotlib()
+    saida = io.StringIO()
+    with contextlib.redirect_stdout(saida):
+        analysis = OlistAnalysis(_abrir_tabelas(tabelas))
+        getattr(analysis, metodo)()
+    return analysis.results, saida.getvalue()
+
+
+def executar_em_paralelo(datasets, perguntas=None, max_workers=None):
+    """
+    Executa as perguntas em um pool de processos e junta os resultados
+
+    Parameters:
+    datasets (dict): Datasets do Olist (dict ou LazyDatasets)
+    perguntas (list): Métodos a executar (chaves de ANALYSIS_COLUMNS); por padrão PERGUNTAS
+    max_workers (int): Número de processos; por padrão um por pergunta
+
+    Returns:
+    dict: Resultados no mesmo formato de OlistAnalysis.results
+    """
+    perguntas = perguntas or PERGUNTAS
+    max_workers = max_workers or min(len(perguntas), os.cpu_count() or 1)
+    diretorio = tempfile.mkdtemp(prefix='olist_paralelo_')
+    try:
+        tabelas_por_pergunta = {}
+        if _feather_disponivel():
+            necessarias = {}
+            for pergunta in perguntas:
+                for nome, colunas in ANALYSIS_COLUMNS[pergunta].items():
+                    lista = necessarias.setdefault(nome, [])
+                    lista.extend(c for c in colunas if c not in lista)
+            caminhos = _gravar_tabelas(datasets, necessarias, diretorio)
+            for pergunta in perguntas:
+                tabelas_por_pergunta[pergunta] = {nome: caminhos[nome] for nome in ANALYSIS_COLUMNS[pergunta]}
+        else:
+            # Sem pyarrow as tabelas seguem por pickle
+            for pergunta in perguntas:
+                tabelas_por_pergunta[pergunta] = {
+                    nome: datasets[nome][[c for c in colunas if c in datasets[nome].columns]]
+                    for nome, colunas in ANALYSIS_COLUMNS[pergunta].items()
+                }
+
+        results = {}
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futuros = [pool.submit(_executar_pergunta, pergunta, tabelas_por_pergunta[pergunta])
+                       for pergunta in perguntas]
+            # A saída de cada pergunta é impressa na ordem original
+            for futuro in futuros:
+                resultado, saida = futuro.result()
+                print(saida, end='')
+                results.update(resultado)
+        return results
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+def main():
+    """Gera o relatório completo executando as perguntas em paralelo"""
+    from analise_olist import OlistAnalysis
+    from data_loader import load_data
+
+    datasets = load_data(analyses=list(PERGUNTAS), lazy=True)
+    analysis = OlistAnalysis(datasets)
+    analysis.executar_perguntas_em_paralelo()
+    analysis.gerar_relatorio_completo()
+
+
+if __name__ == "__main__":
+    main()
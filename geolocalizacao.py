@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Distância entre vendedor e cliente a partir dos prefixos de CEP do Olist
+
+olist_geolocation_dataset.csv tem muitas linhas por prefixo de CEP. Elas são
+reduzidas uma única vez a uma tabela de centroides (prefixos ordenados e
+latitude/longitude em float32), consultada por busca binária. Prefixos
+ausentes da tabela usam o prefixo conhecido numericamente mais próximo, o que
+no Brasil corresponde a uma região vizinha. As distâncias são calculadas pela
+fórmula de haversine, vetorizada sobre todos os pares pedido/vendedor.
+"""
+
+import numpy as np
+import pandas as pd
+
+RAIO_TERRA_KM = 6371.0
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Distância em km entre pares de pontos (graus), elemento a elemento"""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class CentroidesCep:
+    """Centroide (lat, lng) de cada prefixo de CEP, com busca pelo prefixo mais próximo"""
+
+    def __init__(self, prefixos, lat, lng):
+        ordem = np.argsort(prefixos, kind='stable')
+        self.prefixos = np.asarray(prefixos, dtype=np.int32)[ordem]
+        self.lat = np.asarray(lat, dtype=np.float32)[ordem]
+        self.lng = np.asarray(lng, dtype=np.float32)[ordem]
+
+    @classmethod
+    def de_geolocalizacao(cls, geolocation):
+        """Agrega as linhas de geolocation por prefixo (média de lat e lng)"""
+        geolocation = geolocation.dropna(subset=['geolocation_zip_code_prefix',
+                                                 'geolocation_lat', 'geolocation_lng'])
+        prefixos, posicao = np.unique(geolocation['geolocation_zip_code_prefix'].to_numpy(dtype=np.int64),
+                                      return_inverse=True)
+        contagem = np.bincount(posicao, minlength=len(prefixos))
+        lat = np.bincount(posicao, weights=geolocation['geolocation_lat'].to_numpy(), minlength=len(prefixos))
+        lng = np.bincount(posicao, weights=geolocation['geolocation_lng'].to_numpy(), minlength=len(prefixos))
+        return cls(prefixos, lat / contagem, lng / contagem)
+
+    def __len__(self):
+        return len(self.prefixos)
+
+    def localizar(self, prefixos):
+        """
+        Coordenadas dos prefixos informados
+
+        Prefixos sem centroide usam o prefixo conhecido mais próximo; prefixos
+        nulos (ou tabela vazia) resultam em NaN.
+
+        Returns:
+        tuple: (lat, lng, exato), onde exato indica se o prefixo estava na tabela
+        """
+        prefixos = pd.Series(prefixos)
+        validos = prefixos.notna().to_numpy()
+        valores = prefixos.to_numpy(dtype=np.float64, na_value=np.nan)
+        lat = np.full(len(prefixos), np.nan, dtype=np.float32)
+        lng = np.full(len(prefixos), np.nan, dtype=np.float32)
+        exato = np.zeros(len(prefixos), dtype=bool)
+        if len(self) == 0 or not validos.any():
+            return lat, lng, exato
+
+        alvo = valores[validos].astype(np.int64)
+        direita = np.searchsorted(self.prefixos, alvo).clip(max=len(self) - 1)
+        esquerda = (direita - 1).clip(min=0)
+        # Entre os vizinhos da posição de inserção, o numericamente mais próximo
+        mais_proximo = np.where(np.abs(self.prefixos[esquerda] - alvo) < np.abs(self.prefixos[direita] - alvo),
+                                esquerda, direita)
+        lat[validos] = self.lat[mais_proximo]
+        lng[validos] = self.lng[mais_proximo]
+        exato[validos] = self.prefixos[mais_proximo] == alvo
+        return lat, lng, exato
+
+
+def distancia_por_pedido(orders, customers, order_items, sellers, centroides):
+    """
+    Distância em km entre o cliente e o vendedor mais distante de cada pedido
+
+    Returns:
+    np.ndarray: float32 alinhado às linhas de `orders` (NaN sem cliente, itens ou vendedor)
+    """
+    # Coordenadas de cada cliente e vendedor, uma única vez por tabela
+    lat_cliente, lng_cliente, _ = centroides.localizar(customers['customer_zip_code_prefix'])
+    lat_vendedor, lng_vendedor, _ = centroides.localizar(sellers['seller_zip_code_prefix'])
+
+    cliente = pd.Index(customers['customer_id']).get_indexer(orders['customer_id'])
+    pares = order_items[['order_id', 'seller_id']].drop_duplicates()
+    pedido = pd.Index(orders['order_id']).get_indexer(pares['order_id'])
+    vendedor = pd.Index(sellers['seller_id']).get_indexer(pares['seller_id'])
+    validos = (pedido >= 0) & (vendedor >= 0)
+    pedido, vendedor = pedido[validos], vendedor[validos]
+    cliente_do_par = cliente[pedido]
+    com_cliente = cliente_do_par >= 0
+    pedido, vendedor, cliente_do_par = pedido[com_cliente], vendedor[com_cliente], cliente_do_par[com_cliente]
+
+    distancia_par = haversine_km(lat_cliente[cliente_do_par], lng_cliente[cliente_do_par],
+                                 lat_vendedor[vendedor], lng_vendedor[vendedor])
+    distancia = np.full(len(orders), -np.inf)
+    np.fmax.at(distancia, pedido, distancia_par)
+    distancia[np.isneginf(distancia)] = np.nan
+    return distancia.astype(np.float32)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Instrumentação por etapa das análises do Olist
+
+OlistAnalysis informa cada etapa (prepare_data, junções, filtros, groupbys,
+desenho e gravação dos gráficos) a um objeto Instrumentacao, que registra
+tempo de parede, tempo de CPU, linhas de entrada e saída e variação de
+memória. O trace sai em JSON ou no formato do Chrome (chrome://tracing,
+Perfetto). cProfile e tracemalloc são opcionais.
+
+Desativada (o padrão), cada etapa custa apenas a criação de um dicionário.
+"""
+
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+# Variáveis de ambiente lidas por Instrumentacao.do_ambiente
+VARIAVEL_TRACE = 'OLIST_TRACE'
+VARIAVEL_PERFIL = 'OLIST_PERFIL'
+VARIAVEL_MEMORIA = 'OLIST_MEMORIA'
+
+
+def _rss_mb():
+    """RSS atual do processo (Linux); o pico de RSS nos demais Unix; 0 no Windows"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        # Windows: sem /proc nem resource, a variação de memória fica em zero
+        return 0.0
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024 ** 2 if sys.platform == 'darwin' else pico / 1024
+
+
+class _EtapaNula:
+    """Contexto usado com a instrumentação desativada"""
+
+    def __enter__(self):
+        return {}
+
+    def __exit__(self, *erro):
+        return False
+
+
+_ETAPA_NULA = _EtapaNula()
+
+
+class _Etapa:
+    def __init__(self, instrumentacao, nome, linhas_entrada):
+        self.instrumentacao = instrumentacao
+        self.registro = {'nome': nome, 'linhas_entrada': linhas_entrada, 'linhas_saida': None}
+
+    def __enter__(self):
+        self.instrumentacao._entrar(self)
+        return self.registro
+
+    def __exit__(self, *erro):
+        self.instrumentacao._sair(self)
+        return False
+
+
+class Instrumentacao:
+    """
+    Registro das etapas de uma execução
+
+    Parameters:
+    ativo (bool): Com False, etapa() não mede nada
+    perfil (bool): Rodar o cProfile enquanto houver uma etapa aberta
+    memoria (bool): Medir alocações com tracemalloc (variação e pico por etapa);
+        sem ele, a variação de memória é a do RSS
+    """
+
+    def __init__(self, ativo=True, perfil=False, memoria=False):
+        self.ativo = ativo
+        self.etapas = []
+        self.perfil = cProfile.Profile() if ativo and perfil else None
+        self.memoria = ativo and memoria
+        self._pilha = []
+        self._origem = time.perf_counter()
+        self._iniciado_em = datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+    @classmethod
+    def do_ambiente(cls):
+        """
+        Instrumentação configurada por variáveis de ambiente
+
+        OLIST_TRACE=<arquivo> ativa o registro (formato Chrome se o nome
+        terminar em .trace.json); OLIST_PERFIL=1 liga o cProfile e
+        OLIST_MEMORIA=1 o tracemalloc. Sem OLIST_TRACE, fica desativada.
+        """
+        if not os.environ.get(VARIAVEL_TRACE):
+            return cls(ativo=False)
+        return cls(perfil=os.environ.get(VARIAVEL_PERFIL) == '1',
+                   memoria=os.environ.get(VARIAVEL_MEMORIA) == '1')
+
+    def etapa(self, nome, linhas_entrada=None):
+        """
+        Contexto que mede uma etapa; o dicionário devolvido aceita 'linhas_saida'
+
+        Exemplo:
+            with instrumentacao.etapa('pergunta_2.filtro', linhas_entrada=len(df)) as etapa:
+                filtrado = df[df['payment_value'] > 150]
+                etapa['linhas_saida'] = len(filtrado)
+        """
+        if not self.ativo:
+            return _ETAPA_NULA
+        return _Etapa(self, nome, linhas_entrada)
+
+    def _entrar(self, etapa):
+        if not self._pilha:
+            if self.memoria and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            if self.perfil is not None:
+                self.perfil.enable()
+        etapa.pai = self._pilha[-1].registro['nome'] if self._pilha else None
+        etapa.rss_inicio = _rss_mb()
+        if self.memoria:
+            etapa.alocado_inicio = tracemalloc.get_traced_memory()[0]
+            etapa.pico_filhas = 0
+            tracemalloc.reset_peak()
+        self._pilha.append(etapa)
+        etapa.cpu_inicio = time.process_time()
+        etapa.inicio = time.perf_counter()
+
+    def _sair(self, etapa):
+        fim = time.perf_counter()
+        cpu_fim = time.process_time()
+        self._pilha.pop()
+        registro = etapa.registro
+        registro.update({
+            'pai': etapa.pai,
+            'profundidade': len(self._pilha),
+            'inicio_s': etapa.inicio - self._origem,
+            'segundos': fim - etapa.inicio,
+            'cpu_segundos': cpu_fim - etapa.cpu_inicio,
+            'memoria_delta_mb': _rss_mb() - etapa.rss_inicio,
+        })
+        if self.memoria:
+            alocado, pico = tracemalloc.get_traced_memory()
+            # reset_peak das etapas filhas zera o pico da mãe; o maior deles é repassado
+            pico = max(pico, etapa.pico_filhas)
+            registro['memoria_delta_mb'] = (alocado - etapa.alocado_inicio) / 1024 ** 2
+            registro['memoria_pico_mb'] = (pico - etapa.alocado_inicio) / 1024 ** 2
+            if self._pilha:
+                self._pilha[-1].pico_filhas = max(self._pilha[-1].pico_filhas, pico)
+        self.etapas.append(registro)
+        if not self._pilha and self.perfil is not None:
+            self.perfil.disable()
+
+    def para_dict(self):
+        """Trace estruturado: metadados da execução e as etapas na ordem em que terminaram"""
+        return {
+            'iniciado_em': self._iniciado_em,
+            'pid': os.getpid(),
+            'python': sys.version.split()[0],
+            'tracemalloc': self.memoria,
+            'etapas': self.etapas,
+        }
+
+    def para_chrome_trace(self):
+        """Etapas como eventos completos ('X') do formato Trace Event do Chrome"""
+        pid, tid = os.getpid(), threading.get_ident()
+        eventos = []
+        for registro in self.etapas:
+            argumentos = {chave: valor for chave, valor in registro.items()
+                          if chave not in ('nome', 'inicio_s', 'segundos') and valor is not None}
+            eventos.append({
+                'name': registro['nome'],
+                'cat': 'olist',
+                'ph': 'X',
+                'ts': registro['inicio_s'] * 1e6,
+                'dur': registro['segundos'] * 1e6,
+                'pid': pid,
+                'tid': tid,
+                'args': argumentos,
+            })
+        return {'traceEvents': eventos, 'displayTimeUnit': 'ms'}
+
+    def salvar(self, caminho, formato=None):
+        """
+        Grava o trace em `caminho`
+
+        Parameters:
+        formato (str): 'json' ou 'chrome'; por padrão 'chrome' para arquivos
+            terminados em .trace.json e 'json' para os demais
+        """
+        formato = formato or ('chrome' if caminho.endswith('.trace.json') else 'json')
+        conteudo = self.para_chrome_trace() if formato == 'chrome' else self.para_dict()
+        with open(caminho, 'w') as f:
+            json.dump(conteudo, f, indent=2, default=str)
+        if self.perfil is not None:
+            self.perfil.dump_stats(os.path.splitext(caminho)[0] + '.prof')
+        return caminho
+
+    def estatisticas_perfil(self, limite=20, ordem='cumulative'):
+        """Resumo do cProfile (funções mais caras), ou None se o perfil estiver desligado"""
+        if self.perfil is None:
+            return None
+        saida = io.StringIO()
+        pstats.Stats(self.perfil, stream=saida).sort_stats(ordem).print_stats(limite)
+        return saida.getvalue()
+
+    def resumo(self):
+        """Tabela das etapas, indentadas pela profundidade"""
+        linhas = [f"{'etapa':<44} {'tempo':>9} {'cpu':>9} {'linhas':>21} {'mem MB':>9}"]
+        # Ordem de início, para que as etapas filhas apareçam sob a mãe
+        for registro in sorted(self.etapas, key=lambda r: r['inicio_s']):
+            nome = '  ' * registro['profundidade'] + registro['nome']
+            entrada, saida = registro['linhas_entrada'], registro['linhas_saida']
+            linhas_texto = '' if entrada is None and saida is None else \
+                f"{'-' if entrada is None else f'{entrada:,}'} -> {'-' if saida is None else f'{saida:,}'}"
+            linhas.append(f"{nome:<44} {registro['segundos']:>8.3f}s {registro['cpu_segundos']:>8.3f}s "
+                          f"{linhas_texto:>21} {registro['memoria_delta_mb']:>+9.1f}")
+        return '\n'.join(linhas)
+
+
+def instrumentar(nome=None):
+    """Decorador de métodos: mede a chamada como uma etapa de self.instrumentacao"""
+    def decorador(metodo):
+        etapa = nome or metodo.__name__
+
+        @functools.wraps(metodo)
+        def envolvido(self, *args, **kwargs):
+            with self.instrumentacao.etapa(etapa):
+                return metodo(self, *args, **kwargs)
+        return envolvido
+    return decorador
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Motores de execução das 4 perguntas do Olist
+
+Todos recebem o diretório de dados e devolvem resultados com a estrutura de
+OlistAnalysis.results:
+
+- 'pandas': OlistAnalysis em memória (referência)
+- 'chunks': agregados em blocos (analise_streaming)
+- 'duckdb': SQL sobre os arquivos, fora da memória (analise_duckdb)
+
+verificar_paridade roda o mesmo dataset em vários motores e lista as diferenças.
+"""
+
+import contextlib
+import io
+import math
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DATA_DIR
+
+# Chave de resultado -> método de OlistAnalysis
+PERGUNTAS = {
+    'pergunta_1': 'pergunta_1_entregas_atrasadas',
+    'pergunta_2': 'pergunta_2_metodo_pagamento',
+    'pergunta_3': 'pergunta_3_top_categorias',
+    'pergunta_4': 'pergunta_4_tempo_entrega_avaliacao',
+}
+
+
+def _executar_pandas(data_dir, perguntas, partition_filter=None, **opcoes):
+    from analise_olist import OlistAnalysis
+    from data_loader import load_data
+
+    metodos = [PERGUNTAS[pergunta] for pergunta in perguntas]
+    analysis = OlistAnalysis(load_data(analyses=metodos, data_dir=data_dir, lazy=True,
+                                       partition_filter=partition_filter),
+                             render='none', **opcoes)
+    for metodo in metodos:
+        getattr(analysis, metodo)()
+    return analysis.results
+
+
+def _executar_chunks(data_dir, perguntas, **opcoes):
+    from analise_streaming import executar_em_chunks
+    return executar_em_chunks(data_dir, perguntas=perguntas, **opcoes)
+
+
+def _executar_duckdb(data_dir, perguntas, **opcoes):
+    from analise_duckdb import executar_duckdb
+    return executar_duckdb(data_dir, perguntas=perguntas, **opcoes)
+
+
+MOTORES = {
+    'pandas': _executar_pandas,
+    'chunks': _executar_chunks,
+    'duckdb': _executar_duckdb,
+}
+
+
+def executar(motor='pandas', data_dir=DATA_DIR, perguntas=None, **opcoes):
+    """
+    Executa as perguntas no motor escolhido
+
+    Parameters:
+    motor (str): Um de MOTORES
+    data_dir (str): Diretório com os arquivos do Olist
+    perguntas (list): Chaves de resultado ('pergunta_1' ... 'pergunta_4'); todas por padrão
+    **opcoes: Repassadas ao motor (ex.: chunksize, threads, limite_memoria);
+        partition_filter (data_loader.find_partitions) vale para todos os motores
+
+    Returns:
+    dict: Resultados no mesmo formato de OlistAnalysis.results
+    """
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconhecido: {motor} (opções: {', '.join(MOTORES)})")
+    return MOTORES[motor](data_dir, perguntas or list(PERGUNTAS), **opcoes)
+
+
+def _comparar_valores(caminho, a, b, tolerancia):
+    if isinstance(a, pd.DataFrame) or isinstance(b, pd.DataFrame):
+        if not (isinstance(a, pd.DataFrame) and isinstance(b, pd.DataFrame)):
+            return [f"{caminho}: tipos diferentes ({type(a).__name__} x {type(b).__name__})"]
+        # Índices categóricos e de string são equivalentes para a comparação
+        a, b = a.copy(), b.copy()
+        a.index, b.index = a.index.astype(str), b.index.astype(str)
+        try:
+            pd.testing.assert_frame_equal(a, b, check_dtype=False, check_names=False,
+                                          check_exact=False, rtol=tolerancia, atol=tolerancia)
+        except AssertionError as erro:
+            return [f"{caminho}: {erro}"]
+        return []
+    if isinstance(a, (int, float, np.number)) and isinstance(b, (int, float, np.number)):
+        if math.isnan(a) and math.isnan(b):
+            return []
+        if math.isclose(a, b, rel_tol=tolerancia, abs_tol=tolerancia):
+            return []
+        return [f"{caminho}: {a} != {b}"]
+    if str(a) != str(b):
+        return [f"{caminho}: {a} != {b}"]
+    return []
+
+
+def comparar_resultados(a, b, tolerancia=1e-6):
+    """
+    Compara dois dicionários de resultados
+
+    Returns:
+    list: Descrição de cada diferença (vazia se forem equivalentes)
+    """
+    diferencas = []
+    for pergunta in sorted(set(a) | set(b)):
+        if pergunta not in a or pergunta not in b:
+            diferencas.append(f"{pergunta}: presente em apenas um dos motores")
+            continue
+        for chave in sorted(set(a[pergunta]) | set(b[pergunta])):
+            caminho = f"{pergunta}.{chave}"
+            if chave not in a[pergunta] or chave not in b[pergunta]:
+                diferencas.append(f"{caminho}: presente em apenas um dos motores")
+                continue
+            diferencas.extend(_comparar_valores(caminho, a[pergunta][chave], b[pergunta][chave], tolerancia))
+    return diferencas
+
+
+def verificar_paridade(data_dir=DATA_DIR, motores=('pandas', 'duckdb'), perguntas=None, tolerancia=1e-6,
+                       partition_filter=None):
+    """
+    Roda as perguntas em cada motor e compara com o primeiro
+
+    Returns:
+    dict: {motor: lista de diferenças em relação ao motor de referência}
+    """
+    resultados = {}
+    for motor in motores:
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultados[motor] = executar(motor, data_dir, perguntas, partition_filter=partition_filter)
+    referencia = resultados[motores[0]]
+    return {motor: comparar_resultados(referencia, resultados[motor], tolerancia)
+            for motor in motores[1:]}
+
+
+def main():
+    """Verifica a paridade dos motores no diretório de dados (argumentos: motores)"""
+    import sys
+
+    motores = tuple(sys.argv[1:]) or tuple(MOTORES)
+    falhou = False
+    for motor, diferencas in verificar_paridade(motores=motores).items():
+        print(f"{motores[0]} x {motor}: {'OK' if not diferencas else f'{len(diferencas)} diferença(s)'}")
+        for diferenca in diferencas:
+            print(f"  {diferenca}")
+        falhou = falhou or bool(diferencas)
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
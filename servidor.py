@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Servidor local das análises do Olist com os datasets mantidos em memória
+
+Um processo de longa duração (asyncio, HTTP sobre TCP ou socket Unix) responde
+às perguntas sem pagar a cada consulta a inicialização do interpretador, as
+importações, a leitura dos CSVs e o prepare_data:
+
+- cada processo do pool carrega os dados uma única vez (load_data) e mantém
+  uma OlistAnalysis quente, com as tabelas fato e os índices já construídos;
+- as perguntas rodam no pool, fora do laço de eventos, de modo que várias
+  consultas são atendidas ao mesmo tempo;
+- respostas já calculadas para a mesma versão dos dados voltam da memória;
+- mudanças nos arquivos do diretório de dados (tamanho ou mtime) criam um novo
+  pool com os dados recarregados; consultas em andamento terminam no antigo.
+
+Rotas (GET, respostas em JSON):
+    /saude                       versão dos dados, processos e consultas atendidas
+    /perguntas                   métodos disponíveis
+    /perguntas/<metodo>?a=1&b=x  executa OlistAnalysis.<metodo>(a=1, b='x')
+
+Uso:
+    python servidor.py [--porta 8765] [--unix /tmp/olist.sock] [--processos 2]
+    curl localhost:8765/perguntas/pergunta_3_top_categorias?n=10
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import parse_qsl, urlsplit
+
+from data_loader import CACHE_DIRNAME, DATA_DIR
+
+# Métodos de OlistAnalysis expostos (os mesmos que têm chave de resultado)
+METODOS = (
+    'pergunta_1_entregas_atrasadas',
+    'pergunta_2_metodo_pagamento',
+    'pergunta_3_top_categorias',
+    'pergunta_4_tempo_entrega_avaliacao',
+    'distancia_entregas',
+    'ranking_categorias',
+    'tendencias',
+)
+
+# Respostas guardadas por versão dos dados
+LIMITE_RESPOSTAS = 256
+
+# Análise quente de cada processo do pool (criada pelo inicializador)
+_ANALISE = None
+
+
+def _para_json(valor):
+    """Converte resultados (DataFrames, escalares numpy, períodos) em tipos JSON"""
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(valor, dict):
+        return {str(chave): _para_json(v) for chave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_para_json(v) for v in valor]
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return json.loads(valor.to_json(orient='split', date_format='iso', default_handler=str))
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return None
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return valor
+    return str(valor)
+
+
+def _iniciar_processo(data_dir):
+    """Inicializador do pool: carrega os datasets e prepara a análise uma vez por processo"""
+    global _ANALISE
+    from analise_olist import OlistAnalysis
+    from data_loader import load_data, ANALYSIS_COLUMNS
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        datasets = load_data(analyses=list(ANALYSIS_COLUMNS), data_dir=data_dir)
+        _ANALISE = OlistAnalysis(datasets, render='none')
+
+
+def _aquecer():
+    """Constrói as tabelas fato, usadas pela maioria das perguntas, antes da primeira consulta"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        _ANALISE.fato_pedidos()
+        _ANALISE.fato_itens()
+    return os.getpid()
+
+
+def _executar(metodo, parametros):
+    """Executa uma pergunta na análise quente do processo"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        resultado = getattr(_ANALISE, metodo)(**parametros)
+    return _para_json(resultado)
+
+
+def _assinatura_dados(data_dir):
+    """Tamanho e mtime dos arquivos do diretório de dados (muda quando um CSV é trocado)
+
+    Inclui os subdiretórios das tabelas particionadas; o cache Feather fica de fora.
+    """
+    arquivos = []
+    for raiz, diretorios, nomes in os.walk(data_dir):
+        diretorios[:] = sorted(d for d in diretorios if d != CACHE_DIRNAME)
+        for nome in sorted(nomes):
+            if nome.endswith(('.csv', '.parquet')):
+                caminho = os.path.join(raiz, nome)
+                stat = os.stat(caminho)
+                arquivos.append((os.path.relpath(caminho, data_dir), stat.st_size, stat.st_mtime_ns))
+    return tuple(arquivos)
+
+
+def _valor_parametro(texto):
+    """Parâmetros da URL: JSON quando possível (10, 0.5, true, null), senão texto"""
+    try:
+        return json.loads(texto)
+    except ValueError:
+        return texto
+
+
+class ServidorAnalises:
+    """
+    Pool de análises quentes atrás de um servidor HTTP asyncio
+
+    Parameters:
+    data_dir (str): Diretório com os CSVs do Olist
+    processos (int): Processos do pool (cada um com uma cópia dos dados)
+    intervalo_recarga (float): Segundos entre verificações do diretório de dados;
+        None desativa a recarga automática
+    """
+
+    def __init__(self, data_dir=DATA_DIR, processos=2, intervalo_recarga=2.0):
+        self.data_dir = data_dir
+        self.processos = processos
+        self.intervalo_recarga = intervalo_recarga
+        self.versao = 0
+        self.carregado_em = None
+        self.consultas = 0
+        self._pool = None
+        self._assinatura = None
+        self._respostas = OrderedDict()
+
+    async def carregar(self):
+        """Cria um novo pool com os dados atuais e só então substitui o anterior"""
+        assinatura = _assinatura_dados(self.data_dir)
+        pool = ProcessPoolExecutor(max_workers=self.processos, initializer=_iniciar_processo,
+                                   initargs=(self.data_dir,))
+        loop = asyncio.get_running_loop()
+        inicio = time.perf_counter()
+        try:
+            await asyncio.gather(*(loop.run_in_executor(pool, _aquecer) for _ in range(self.processos)))
+        except BaseException:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        antigo, self._pool = self._pool, pool
+        self._assinatura = assinatura
+        self.versao += 1
+        self.carregado_em = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self._respostas.clear()
+        if antigo is not None:
+            # Consultas ainda em andamento no pool antigo terminam normalmente
+            antigo.shutdown(wait=False)
+        print(f"Dados carregados (versão {self.versao}) em {time.perf_counter() - inicio:.1f}s "
+              f"por {self.processos} processo(s)")
+
+    async def _vigiar_dados(self):
+        while True:
+            await asyncio.sleep(self.intervalo_recarga)
+            if _assinatura_dados(self.data_dir) != self._assinatura:
+                print("Arquivos de dados alterados; recarregando...")
+                try:
+                    await self.carregar()
+                except Exception as erro:
+                    # Mantém o pool atual; nova tentativa na próxima verificação
+                    print(f"Falha ao recarregar os dados: {erro}")
+
+    async def consultar(self, metodo, parametros):
+        """Resultado de OlistAnalysis.<metodo>(**parametros), calculado no pool ou da memória"""
+        if metodo not in METODOS:
+            raise ValueError(f"Pergunta desconhecida: {metodo}")
+        self.consultas += 1
+        chave = (self.versao, metodo, json.dumps(parametros, sort_keys=True))
+        if chave in self._respostas:
+            self._respostas.move_to_end(chave)
+            return self._respostas[chave]
+        resultado = await asyncio.get_running_loop().run_in_executor(
+            self._pool, _executar, metodo, parametros)
+        # Só guarda se os dados não mudaram durante o cálculo
+        if chave[0] == self.versao:
+            self._respostas[chave] = resultado
+            if len(self._respostas) > LIMITE_RESPOSTAS:
+                self._respostas.popitem(last=False)
+        return resultado
+
+    async def _responder(self, caminho):
+        """(status, corpo) de uma requisição GET"""
+        url = urlsplit(caminho)
+        partes = [parte for parte in url.path.split('/') if parte]
+        if partes == ['saude']:
+            return 200, {'versao': self.versao, 'carregado_em': self.carregado_em,
+                         'processos': self.processos, 'consultas': self.consultas,
+                         'respostas_em_memoria': len(self._respostas)}
+        if partes == ['perguntas']:
+            return 200, {'perguntas': list(METODOS)}
+        if len(partes) == 2 and partes[0] == 'perguntas':
+            parametros = {nome: _valor_parametro(valor) for nome, valor in parse_qsl(url.query)}
+            if partes[1] not in METODOS:
+                return 404, {'erro': f"Pergunta desconhecida: {partes[1]}"}
+            inicio = time.perf_counter()
+            try:
+                resultado = await self.consultar(partes[1], parametros)
+            except (TypeError, ValueError) as erro:
+                return 400, {'erro': str(erro)}
+            return 200, {'pergunta': partes[1], 'parametros': parametros, 'versao': self.versao,
+                         'segundos': round(time.perf_counter() - inicio, 6), 'resultado': resultado}
+        return 404, {'erro': f"Rota desconhecida: {url.path}"}
+
+    async def _atender(self, leitor, escritor):
+        try:
+            linha = await leitor.readline()
+            # Cabeçalhos são lidos e ignorados; as rotas não usam corpo
+            while (await leitor.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            try:
+                metodo_http, caminho, _ = linha.decode('latin-1').split(' ', 2)
+            except ValueError:
+                status, corpo = 400, {'erro': 'Requisição inválida'}
+            else:
+                if metodo_http != 'GET':
+                    status, corpo = 405, {'erro': 'Apenas GET'}
+                else:
+                    try:
+                        status, corpo = await self._responder(caminho)
+                    except Exception as erro:
+                        status, corpo = 500, {'erro': f"{type(erro).__name__}: {erro}"}
+            dados = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+            escritor.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Erro'}\r\n"
+                           f"Content-Type: application/json; charset=utf-8\r\n"
+                           f"Content-Length: {len(dados)}\r\n"
+                           f"Connection: close\r\n\r\n".encode('latin-1') + dados)
+            await escritor.drain()
+        finally:
+            escritor.close()
+
+    async def servir(self, host='127.0.0.1', porta=8765, unix=None):
+        """Carrega os dados e atende até ser interrompido"""
+        await self.carregar()
+        if unix:
+            servidor = await asyncio.start_unix_server(self._atender, path=unix)
+            print(f"Atendendo em {unix}")
+        else:
+            servidor = await asyncio.start_server(self._atender, host, porta)
+            print(f"Atendendo em http://{host}:{porta}")
+        vigia = asyncio.create_task(self._vigiar_dados()) if self.intervalo_recarga else None
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            if vigia is not None:
+                vigia.cancel()
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--unix', help='Caminho de um socket Unix (em vez de TCP)')
+    parser.add_argument('--processos', type=int, default=2)
+    parser.add_argument('--intervalo-recarga', type=float, default=2.0,
+                        help='Segundos entre verificações dos arquivos de dados (0 desativa)')
+    args = parser.parse_args()
+
+    servidor = ServidorAnalises(args.data_dir, processos=args.processos,
+                                intervalo_recarga=args.intervalo_recarga or None)
+    try:
+        asyncio.run(servidor.servir(args.host, args.porta, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Séries temporais das perguntas 1, 2 e 4 por período de compra e estado
+
+Cada linha (pedido, pagamento, avaliação) recebe o código do seu período em
+order_purchase_timestamp (consultas.codigos_periodo) e o código do grupo
+(estado, método de pagamento). Uma única passada de bincount produz, para cada
+soma necessária, uma matriz grupo x período; janelas fixas (tumbling) somam
+blocos de colunas e janelas deslizantes (rolling) são diferenças de somas
+acumuladas. As taxas e médias saem dessas somas, sem voltar aos dados.
+
+O resultado é uma tabela longa (uma linha por período e grupo) pronta para
+pivotar ou desenhar; períodos vazios não aparecem.
+"""
+
+import numpy as np
+import pandas as pd
+
+from consultas import codigos_periodo
+
+
+def somar_por_janela(datas, somas, grupos=None, rotulos_grupos=None, freq='M', janela=1,
+                     deslizante=False):
+    """
+    Somas por período (ou janela de períodos) e grupo
+
+    Parameters:
+    datas (Series): Data de cada linha (linhas sem data são ignoradas)
+    somas (dict): {nome: valores por linha}; None conta as linhas
+    grupos (ndarray): Código do grupo de cada linha (-1 ignora a linha); None = um só grupo
+    rotulos_grupos (Index): Rótulo de cada código de grupo (MultiIndex para vários níveis)
+    freq (str): Frequência dos períodos ('D', 'W', 'M', 'Q'...)
+    janela (int): Períodos por janela
+    deslizante (bool): Janelas deslizantes (uma por período, terminando nele, apenas
+        as completas) em vez de blocos consecutivos de `janela` períodos
+
+    Returns:
+    DataFrame: Colunas 'periodo' (início do bloco ou fim da janela deslizante),
+        os níveis dos grupos e uma coluna por soma
+    """
+    codigos, periodos = codigos_periodo(datas, freq)
+    if grupos is None:
+        grupos, rotulos_grupos = np.zeros(len(codigos), dtype=np.int64), None
+    n_grupos = 1 if rotulos_grupos is None else len(rotulos_grupos)
+    n_periodos = len(periodos)
+
+    validos = (codigos >= 0) & (np.asarray(grupos) >= 0)
+    posicao = np.asarray(grupos)[validos].astype(np.int64) * n_periodos + codigos[validos]
+    matrizes = {}
+    for nome, valores in somas.items():
+        pesos = None if valores is None else np.asarray(valores, dtype=np.float64)[validos]
+        matrizes[nome] = np.bincount(posicao, weights=pesos,
+                                     minlength=n_grupos * n_periodos).reshape(n_grupos, n_periodos)
+
+    if deslizante and janela > 1:
+        for nome, matriz in matrizes.items():
+            acumulado = np.concatenate([np.zeros((n_grupos, 1), dtype=matriz.dtype),
+                                        np.cumsum(matriz, axis=1)], axis=1)
+            matrizes[nome] = acumulado[:, janela:] - acumulado[:, :-janela]
+        periodos = periodos[janela - 1:]
+    elif janela > 1 and n_periodos:
+        inicios = np.arange(0, n_periodos, janela)
+        for nome, matriz in matrizes.items():
+            matrizes[nome] = np.add.reduceat(matriz, inicios, axis=1)
+        periodos = periodos[inicios]
+
+    # Tabela longa ordenada por período e, dentro dele, por grupo
+    n_janelas = len(periodos)
+    tabela = pd.DataFrame({'periodo': np.repeat(periodos.to_numpy(), n_grupos)})
+    if rotulos_grupos is not None:
+        rotulos = pd.MultiIndex.from_arrays([rotulos_grupos]) if not isinstance(
+            rotulos_grupos, pd.MultiIndex) else rotulos_grupos
+        for nivel, nome in enumerate(rotulos.names):
+            tabela[nome] = np.tile(rotulos.get_level_values(nivel).to_numpy(), n_janelas)
+    for nome, matriz in matrizes.items():
+        tabela[nome] = matriz.T.ravel()
+    return tabela
+
+
+def _codigos(serie, nome):
+    """Códigos e rótulos de uma coluna categórica (-1 para nulos)"""
+    categorias = pd.Categorical(serie)
+    return categorias.codes.astype(np.int64), pd.Index(categorias.categories, name=nome)
+
+
+def _com_linhas(tabela, coluna):
+    """Remove as combinações de período e grupo sem nenhuma linha"""
+    return tabela[tabela[coluna] > 0].reset_index(drop=True)
+
+
+def tendencia_atrasos(datas, atraso_dias, estados=None, **janelas):
+    """
+    Pergunta 1 por período: entregas, percentual de atraso e atraso médio
+
+    Parameters:
+    datas (Series): Data de compra de cada pedido entregue
+    atraso_dias (ndarray): Entrega real menos estimada, em dias
+    estados (Series): Estado do cliente de cada pedido; None = sem divisão por estado
+    **janelas: freq, janela e deslizante de somar_por_janela
+    """
+    atraso_dias = np.asarray(atraso_dias, dtype=np.float64)
+    atrasado = atraso_dias > 0
+    grupos, rotulos = _codigos(estados, 'customer_state') if estados is not None else (None, None)
+    tabela = somar_por_janela(datas, {
+        'total_entregas': None,
+        'entregas_atrasadas': atrasado,
+        'soma_atraso': np.where(atrasado, atraso_dias, 0.0),
+    }, grupos, rotulos, **janelas)
+    tabela = _com_linhas(tabela, 'total_entregas')
+    tabela['entregas_atrasadas'] = tabela['entregas_atrasadas'].astype(np.int64)
+    tabela['percentual_atraso'] = tabela['entregas_atrasadas'] / tabela['total_entregas'] * 100
+    tabela['atraso_medio_dias'] = tabela['soma_atraso'] / tabela['entregas_atrasadas'].where(
+        tabela['entregas_atrasadas'] > 0)
+    return tabela.drop(columns='soma_atraso')
+
+
+def tendencia_pagamentos(datas, tipos, valores, estados=None, limiar=150.0, **janelas):
+    """
+    Pergunta 2 por período: participação de cada método nos pagamentos acima de `limiar`
+
+    Parameters:
+    datas (Series): Data de compra do pedido de cada pagamento
+    tipos (Series): payment_type de cada pagamento
+    valores (ndarray): payment_value de cada pagamento
+    estados (Series): Estado do cliente de cada pagamento; None = sem divisão por estado
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    tipo, rotulos_tipo = _codigos(tipos, 'payment_type')
+    # Pagamentos abaixo do limiar ficam fora de qualquer grupo
+    tipo = np.where(valores > limiar, tipo, -1)
+    if estados is not None:
+        estado, rotulos_estado = _codigos(estados, 'customer_state')
+        grupos = np.where((estado >= 0) & (tipo >= 0), estado * len(rotulos_tipo) + tipo, -1)
+        rotulos = pd.MultiIndex.from_product([rotulos_estado, rotulos_tipo])
+    else:
+        grupos, rotulos = tipo, pd.MultiIndex.from_arrays([rotulos_tipo])
+    tabela = somar_por_janela(datas, {'quantidade_pedidos': None, 'valor_total': valores},
+                              grupos, rotulos, **janelas)
+    tabela['quantidade_pedidos'] = tabela['quantidade_pedidos'].astype(np.int64)
+    tabela = _com_linhas(tabela, 'quantidade_pedidos')
+    # Participação dentro do período (e estado)
+    chaves = ['periodo'] + (['customer_state'] if estados is not None else [])
+    total = tabela.groupby(chaves, sort=False)['quantidade_pedidos'].transform('sum')
+    tabela['percentual'] = tabela['quantidade_pedidos'] / total * 100
+    tabela['valor_medio'] = tabela['valor_total'] / tabela['quantidade_pedidos']
+    return tabela
+
+
+def tendencia_avaliacoes(datas, tempo_entrega_dias, notas, estados=None, **janelas):
+    """
+    Pergunta 4 por período: tempo médio de entrega, nota média e correlação entre eles
+
+    A correlação de Pearson sai das somas de x, y, x², y² e xy de cada janela.
+
+    Parameters:
+    datas (Series): Data de compra de cada par pedido/avaliação
+    tempo_entrega_dias (ndarray): Tempo de entrega em dias
+    notas (ndarray): review_score
+    estados (Series): Estado do cliente; None = sem divisão por estado
+    """
+    x = np.asarray(tempo_entrega_dias, dtype=np.float64)
+    y = np.asarray(notas, dtype=np.float64)
+    grupos, rotulos = _codigos(estados, 'customer_state') if estados is not None else (None, None)
+    tabela = somar_por_janela(datas, {
+        'avaliacoes': None, 'sx': x, 'sy': y, 'sxx': x * x, 'syy': y * y, 'sxy': x * y,
+    }, grupos, rotulos, **janelas)
+    tabela = _com_linhas(tabela, 'avaliacoes')
+    n = tabela['avaliacoes']
+    tabela['tempo_medio_dias'] = tabela['sx'] / n
+    tabela['nota_media'] = tabela['sy'] / n
+    covariancia = n * tabela['sxy'] - tabela['sx'] * tabela['sy']
+    variancia = (n * tabela['sxx'] - tabela['sx'] ** 2) * (n * tabela['syy'] - tabela['sy'] ** 2)
+    tabela['correlacao'] = covariancia / np.sqrt(variancia.where(variancia > 0))
+    return tabela.drop(columns=['sx', 'sy', 'sxx', 'syy', 'sxy'])
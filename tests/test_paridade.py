@@ -0,0 +1,65 @@
+"""
+Paridade entre os motores (pandas, chunks e duckdb) sobre o dataset sintético,
+com cada tabela em um único CSV e com as tabelas de fatos particionadas
+"""
+
+import importlib.util
+import os
+
+import pandas as pd
+import pytest
+
+from data_loader import TABLE_SCHEMAS, create_sample_data
+from motores import verificar_paridade
+
+MOTORES = ('pandas', 'chunks') + (('duckdb',) if importlib.util.find_spec('duckdb') else ())
+
+
+def _particionar(data_dir):
+    """Troca orders por partições mensais por marketplace (Hive) e order_items por partes sem chave"""
+    caminho = os.path.join(data_dir, TABLE_SCHEMAS['orders']['file'])
+    orders = pd.read_csv(caminho, dtype=str)
+    meses = orders['order_purchase_timestamp'].str[:7]
+    marketplaces = pd.Series(['br', 'mx'])[orders.index % 2].to_numpy()
+    for (mes, marketplace), parte in orders.groupby([meses, marketplaces]):
+        diretorio = os.path.join(data_dir, 'orders', f'marketplace={marketplace}')
+        os.makedirs(diretorio, exist_ok=True)
+        parte.to_csv(os.path.join(diretorio, f'{mes}.csv'), index=False)
+    # O CSV único que sobrar é ignorado: o diretório de partições tem precedência
+    orders.head(10).to_csv(caminho, index=False)
+
+    caminho = os.path.join(data_dir, TABLE_SCHEMAS['order_items']['file'])
+    itens = pd.read_csv(caminho, dtype=str)
+    os.makedirs(os.path.join(data_dir, 'order_items'))
+    for i in range(3):
+        itens.iloc[i::3].to_csv(os.path.join(data_dir, 'order_items', f'parte-{i}.csv'), index=False)
+    os.remove(caminho)
+
+
+@pytest.fixture(scope='module')
+def dados_planos(tmp_path_factory):
+    data_dir = str(tmp_path_factory.mktemp('planos'))
+    create_sample_data(n_orders=3000, seed=7, output_dir=data_dir)
+    return data_dir
+
+
+@pytest.fixture(scope='module')
+def dados_particionados(tmp_path_factory):
+    data_dir = str(tmp_path_factory.mktemp('particionados'))
+    create_sample_data(n_orders=3000, seed=7, output_dir=data_dir)
+    _particionar(data_dir)
+    return data_dir
+
+
+def test_paridade_csv_unico(dados_planos):
+    assert verificar_paridade(dados_planos, motores=MOTORES) == {motor: [] for motor in MOTORES[1:]}
+
+
+def test_paridade_particionado(dados_particionados):
+    assert verificar_paridade(dados_particionados, motores=MOTORES) == {motor: [] for motor in MOTORES[1:]}
+
+
+def test_paridade_particionado_com_poda(dados_particionados):
+    filtro = {'purchase_date': ('2017-03-01', '2017-08-31'), 'marketplace': 'br'}
+    assert verificar_paridade(dados_particionados, motores=MOTORES, partition_filter=filtro) == \
+        {motor: [] for motor in MOTORES[1:]}